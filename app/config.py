@@ -4,6 +4,18 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     DATABASE_URL: str
     SHAREPRO_WIZZER_API_KEY: str
+    DB_RUNNER_WORKERS: int = 4
+    DB_RUNNER_SUMMARY_FLUSH_SIZE: int = 100
+    CASHFLOW_INCREMENTAL_SYNC: bool = True
+    PROGRESSION_INCREMENTAL_SYNC: bool = True
+    REPORT_RENDER_WORKERS: int = 4
+    S3_UPLOAD_WORKERS: int = 16
+    HOLDINGS_SNAPSHOT_FORMAT: str = "xlsx"
+    S3_CACHE_MAX_BYTES: int = 5 * 1024 ** 3
+    KEYNOTE_LEDGER_CACHE_GRACE_DAYS: int = 90
+    STORAGE_BACKEND: str = "s3"
+    S3_BUCKET_NAME: str = "plus91backoffice"
+    LOCAL_STORAGE_ROOT: str = "/home/admin/Plus91Backoffice/Plus91_Backend/data/storage"
 
     class Config:
         env_file = "/home/admin/Plus91Backoffice/Plus91_Backend/.env"
@@ -1,14 +1,59 @@
+import os
 import logging
-import watchtower
-import boto3
+import threading
 from functools import wraps
 
-boto3.setup_default_session(region_name='ap-south-1')
+# Region for every boto3 client in the process, without importing boto3 here.
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-south-1")
+
+
+class LazyCloudWatchHandler(logging.Handler):
+    """
+    Forwards records to a watchtower CloudWatchLogHandler that is only created when the
+    first record is emitted, so importing app.logger does not import boto3/watchtower or
+    open a CloudWatch session.
+    """
+
+    def __init__(self, log_group: str, stream_name: str):
+        super().__init__()
+        self.log_group = log_group
+        self.stream_name = stream_name
+        self._handler = None
+        self._handler_lock = threading.Lock()
+
+    def _get_handler(self) -> logging.Handler:
+        if self._handler is None:
+            with self._handler_lock:
+                if self._handler is None:
+                    import watchtower
+                    handler = watchtower.CloudWatchLogHandler(
+                        log_group=self.log_group,
+                        stream_name=self.stream_name
+                    )
+                    handler.setFormatter(self.formatter)
+                    self._handler = handler
+        return self._handler
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self._get_handler().handle(record)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        if self._handler is not None:
+            self._handler.flush()
+
+    def close(self):
+        if self._handler is not None:
+            self._handler.close()
+        super().close()
+
 
 logger = logging.getLogger("plus91_backend_ops")
 logger.setLevel(logging.DEBUG)
 
-handler = watchtower.CloudWatchLogHandler(
+handler = LazyCloudWatchHandler(
     log_group='PortfolioManagerLogs',
     stream_name='BackendStream'
 )
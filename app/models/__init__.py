@@ -6,6 +6,7 @@ from .accounts import (
     AccountCashflowProgression,
     AccountIdealPortfolio,
     AccountPerformance,
+    AccountSyncState,
     AccountTimePeriods,
     JointAccount,
     JointAccountMapping,
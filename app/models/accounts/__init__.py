@@ -5,6 +5,7 @@ from .account_cashflow_details import AccountCashflow
 from .account_cashflow_progression import AccountCashflowProgression
 from .account_ideal_portfolio import AccountIdealPortfolio
 from .account_performance import AccountPerformance
+from .account_sync_state import AccountSyncState
 from .account_time_periods import AccountTimePeriods
 from .joint_account import JointAccount
 from .joint_account_mapping import JointAccountMapping
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Text, Date, TIMESTAMP, JSON, func
+from app.models.base import Base
+
+class AccountSyncState(Base):
+    """Per-owner watermark of the last incremental sync of a derived table (e.g. component='cashflow')."""
+    __tablename__ = "account_sync_state"
+
+    owner_id = Column(String, primary_key=True)
+    owner_type = Column(String, primary_key=True)
+    component = Column(String, primary_key=True)
+    source_version = Column(Text, nullable=True)
+    content_hash = Column(Text, nullable=True)
+    last_event_date = Column(Date, nullable=True)
+    state = Column(JSON, nullable=True)
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    updated_at = Column(TIMESTAMP, nullable=True, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<AccountSyncState(owner_id={self.owner_id}, component={self.component}, last_event_date={self.last_event_date})>"
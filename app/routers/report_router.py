@@ -1,10 +1,10 @@
-import boto3
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any
 from app.database import get_db
 from app.services.report_service import ReportService
+from app.scripts.data_fetchers.storage import get_storage
 from app.models.report import RequestData
 from app.models.accounts.joint_account_mapping import JointAccountMapping
 from app.models.clients.client_details import Client
@@ -15,7 +15,7 @@ report_router = APIRouter(prefix="/reports", tags=["Reports"])
 @report_router.post("/send-report")
 async def send_report(data: RequestData, db: AsyncSession = Depends(get_db)):
     """API endpoint to send reports based on broker_code and pan_no."""
-    service = ReportService(db, boto3.client('s3'))
+    service = ReportService(db, get_storage())
     try:
         client = await service.verify_user(data.broker_code, data.pan_no)
         accounts = await service.get_accounts(client)
@@ -61,7 +61,7 @@ async def send_report(data: RequestData, db: AsyncSession = Depends(get_db)):
 @report_router.post("/dummy-report")
 async def dummy_report(data: RequestData, db: AsyncSession = Depends(get_db)):
     """API endpoint to send reports based on broker_code and pan_no."""
-    service = ReportService(db, boto3.client('s3'))
+    service = ReportService(db, get_storage())
     try:
         client = await service.verify_user(data.broker_code, data.pan_no)
         accounts = await service.get_accounts(client)
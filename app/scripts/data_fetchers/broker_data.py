@@ -1,60 +1,114 @@
-import json
-import requests
-from typing import List, Dict
+import time
+import asyncio
+import httpx
+from typing import List, Dict, Optional
+from app.logger import logger
+
+BROKER_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+BROKER_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0)
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 0.5
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+LTP_CHUNK_SIZE = 500
+LTP_CONCURRENCY = 8
+
+
+def _chunks(items: List, size: int) -> List[List]:
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _merge_ltp_responses(responses: List[Dict]) -> Dict:
+    """Combine the responses of chunked LTP requests into one response with all quotes."""
+    merged = {"status": "success", "data": {}}
+    for response in responses:
+        if response.get("status") != "success":
+            return response
+        merged["data"].update(response.get("data") or {})
+    return merged
+
 
 class BrokerData:
-    """Class containing static methods to interact with the Upstox API."""
-    
+    """
+    Class containing static methods to interact with the Upstox API.
+
+    This is the blocking facade for scripts and sync code. Calls share one pooled
+    keep-alive httpx.Client and retry connection errors and 429/5xx responses with
+    exponential backoff. Async code should use AsyncBrokerData instead.
+    """
+
     BASE_URL = "http://0.0.0.0:8001/api/v1/"
-    
+    _client: Optional[httpx.Client] = None
+
+    @staticmethod
+    def _get_client() -> httpx.Client:
+        if BrokerData._client is None:
+            BrokerData._client = httpx.Client(
+                base_url=BrokerData.BASE_URL, timeout=BROKER_TIMEOUT, limits=BROKER_LIMITS
+            )
+        return BrokerData._client
+
+    @staticmethod
+    def _request(method: str, path: str, error_message: str, **kwargs) -> Dict:
+        client = BrokerData._get_client()
+        for attempt in range(RETRY_ATTEMPTS):
+            last_attempt = attempt == RETRY_ATTEMPTS - 1
+            try:
+                response = client.request(method, path, headers={"Content-Type": "application/json"}, **kwargs)
+            except httpx.TransportError as e:
+                if last_attempt:
+                    raise Exception(f"{error_message}: {e}")
+                logger.warning(f"{error_message} on attempt {attempt + 1}: {e}, retrying")
+            else:
+                if response.status_code == 200:
+                    return response.json()
+                if last_attempt or response.status_code not in RETRY_STATUS_CODES:
+                    raise Exception(f"{error_message}: {response.status_code} - {response.text}")
+                logger.warning(f"{error_message} on attempt {attempt + 1}: {response.status_code}, retrying")
+            time.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
     @staticmethod
     def get_master_data(broker_type: str) -> Dict:
         """
         Fetches the master data from the broker API.
-        
+
         Args:
             broker_type (str): The broker type (e.g., 'upstox').
-        
+
         Returns:
             The JSON response from the API as a Python dictionary.
-        
+
         Raises:
             Exception: If the API call fails, with the status code and error message.
         """
-        url = f"{BrokerData.BASE_URL}master-data"
-        headers = {"Content-Type": "application/json"}
-        response = requests.get(url, params={"broker_type": broker_type}, headers=headers)
-        if response.status_code != 200:
-            raise Exception(f"Failed to get master data: {response.status_code} - {response.text}")
-        return response.json()
-    
+        return BrokerData._request(
+            "GET", "master-data", "Failed to get master data", params={"broker_type": broker_type}
+        )
+
     @staticmethod
     def get_ltp_quote(broker_type: str, instruments: List[Dict[str, str]]) -> Dict:
         """
-        Fetches the Last Traded Price (LTP) quote for the given instruments.
-        
+        Fetches the Last Traded Price (LTP) quote for the given instruments, LTP_CHUNK_SIZE
+        instruments per request.
+
         Args:
             broker_type (str): The broker type (e.g., 'upstox').
             instruments: A list of dictionaries, each with 'exchange_token' and 'exchange' keys.
-        
+
         Returns:
-            The JSON response from the API as a Python dictionary.
-        
+            The JSON response from the API as a Python dictionary, with the quotes of all chunks.
+
         Raises:
             Exception: If the API call fails, with the status code and error message.
         """
-        url = f"{BrokerData.BASE_URL}ltp-quote"
-        headers = {"Content-Type": "application/json"}
-        response = requests.post(
-            url, 
-            json=instruments, 
-            headers=headers,
-            params={"broker_type": broker_type}
-        )
-        if response.status_code != 200:
-            raise Exception(f"Failed to get LTP quote: {response.status_code} - {response.text}")
-        return response.json()
-    
+        responses = [
+            BrokerData._request(
+                "POST", "ltp-quote", "Failed to get LTP quote",
+                json=chunk, params={"broker_type": broker_type}
+            )
+            for chunk in _chunks(instruments, LTP_CHUNK_SIZE)
+        ]
+        return _merge_ltp_responses(responses)
+
     @staticmethod
     def historical_data(broker_type: str, instrument: Dict) -> Dict:
         """
@@ -78,15 +132,90 @@ class BrokerData:
         Raises:
             Exception: If the API call fails.
         """
-        url = f"{BrokerData.BASE_URL}historical-data?broker_type={broker_type}"
-        headers = {"Content-Type": "application/json"}
-        payload = {
-            "instrument": json.dumps(instrument)
-        }
-        response = requests.post(url, json=instrument, headers=headers)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"Failed to get historical data: {response.status_code} - {response.text}")
-
-        
+        return BrokerData._request(
+            "POST", "historical-data", "Failed to get historical data",
+            json=instrument, params={"broker_type": broker_type}
+        )
+
+
+class AsyncBrokerData:
+    """
+    Async counterpart of BrokerData for code running on the event loop.
+
+    All calls share one pooled keep-alive httpx.AsyncClient per event loop. LTP quotes are
+    requested in chunks of LTP_CHUNK_SIZE instruments, at most LTP_CONCURRENCY at a time,
+    and every request is retried with backoff like BrokerData.
+    """
+
+    _client: Optional[httpx.AsyncClient] = None
+    _client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @staticmethod
+    def _get_client() -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if AsyncBrokerData._client is None or AsyncBrokerData._client_loop is not loop:
+            AsyncBrokerData._client = httpx.AsyncClient(
+                base_url=BrokerData.BASE_URL, timeout=BROKER_TIMEOUT, limits=BROKER_LIMITS
+            )
+            AsyncBrokerData._client_loop = loop
+        return AsyncBrokerData._client
+
+    @staticmethod
+    async def aclose():
+        """Close the shared client, e.g. at the end of a script."""
+        if AsyncBrokerData._client is not None:
+            await AsyncBrokerData._client.aclose()
+            AsyncBrokerData._client = None
+            AsyncBrokerData._client_loop = None
+
+    @staticmethod
+    async def _request(method: str, path: str, error_message: str, **kwargs) -> Dict:
+        client = AsyncBrokerData._get_client()
+        for attempt in range(RETRY_ATTEMPTS):
+            last_attempt = attempt == RETRY_ATTEMPTS - 1
+            try:
+                response = await client.request(method, path, headers={"Content-Type": "application/json"}, **kwargs)
+            except httpx.TransportError as e:
+                if last_attempt:
+                    raise Exception(f"{error_message}: {e}")
+                logger.warning(f"{error_message} on attempt {attempt + 1}: {e}, retrying")
+            else:
+                if response.status_code == 200:
+                    return response.json()
+                if last_attempt or response.status_code not in RETRY_STATUS_CODES:
+                    raise Exception(f"{error_message}: {response.status_code} - {response.text}")
+                logger.warning(f"{error_message} on attempt {attempt + 1}: {response.status_code}, retrying")
+            await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+    @staticmethod
+    async def get_master_data(broker_type: str) -> Dict:
+        """Fetches the master data from the broker API. See BrokerData.get_master_data."""
+        return await AsyncBrokerData._request(
+            "GET", "master-data", "Failed to get master data", params={"broker_type": broker_type}
+        )
+
+    @staticmethod
+    async def get_ltp_quote(broker_type: str, instruments: List[Dict[str, str]]) -> Dict:
+        """
+        Fetches LTP quotes for the given instruments with concurrent chunked requests.
+        See BrokerData.get_ltp_quote.
+        """
+        semaphore = asyncio.Semaphore(LTP_CONCURRENCY)
+
+        async def fetch(chunk: List[Dict[str, str]]) -> Dict:
+            async with semaphore:
+                return await AsyncBrokerData._request(
+                    "POST", "ltp-quote", "Failed to get LTP quote",
+                    json=chunk, params={"broker_type": broker_type}
+                )
+
+        responses = await asyncio.gather(*(fetch(chunk) for chunk in _chunks(instruments, LTP_CHUNK_SIZE)))
+        return _merge_ltp_responses(responses)
+
+    @staticmethod
+    async def historical_data(broker_type: str, instrument: Dict) -> Dict:
+        """Hits the /historical-data endpoint. See BrokerData.historical_data."""
+        return await AsyncBrokerData._request(
+            "POST", "historical-data", "Failed to get historical data",
+            json=instrument, params={"broker_type": broker_type}
+        )
@@ -0,0 +1,82 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from app.logger import logger
+from typing import Dict, Optional
+
+
+class BulkHoldingsManifest:
+    """
+    Local record of the Keynote bulk holdings workbooks already split and uploaded to S3.
+
+    For every workbook the manifest stores the sha1 of its contents, when it was fully
+    processed, and the S3 key and ETag of every client file uploaded from it:
+
+        {"files": {"Bulk Holdings_31-03-25.xlsx": {
+            "sha1": "...", "processed_at": "2025-04-01T02:10:00" | null,
+            "objects": {"RC038": {"key": "...", "etag": "..."}}}}}
+
+    A workbook whose sha1 matches a completed entry is skipped. If a run stops part way
+    through a workbook, the clients already recorded are not uploaded again. Uploads are
+    recorded from several threads, so writes are locked and saved atomically.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self) -> Dict:
+        if not os.path.exists(self.path):
+            return {"files": {}}
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            data.setdefault("files", {})
+            return data
+        except Exception as e:
+            logger.warning(f"Discarding unreadable bulk holdings manifest {self.path}: {e}")
+            return {"files": {}}
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._data, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+    def is_processed(self, file_name: str, sha1: str) -> bool:
+        entry = self._data["files"].get(file_name)
+        return bool(entry and entry["sha1"] == sha1 and entry.get("processed_at"))
+
+    def start(self, file_name: str, sha1: str) -> Dict[str, Dict]:
+        """
+        Begin (or resume) processing a workbook. Returns the client objects already
+        uploaded from this exact content; a changed workbook starts from scratch.
+        """
+        with self._lock:
+            entry = self._data["files"].get(file_name)
+            if not entry or entry["sha1"] != sha1:
+                entry = {"sha1": sha1, "processed_at": None, "objects": {}}
+                self._data["files"][file_name] = entry
+            return dict(entry["objects"])
+
+    def record_upload(self, file_name: str, client_code: str, key: str, etag: Optional[str]):
+        with self._lock:
+            self._data["files"][file_name]["objects"][client_code] = {"key": key, "etag": etag}
+
+    def finish(self, file_name: str):
+        with self._lock:
+            self._data["files"][file_name]["processed_at"] = datetime.now().isoformat(timespec="seconds")
+        self.save()
+
+
+def file_sha1(file_path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -1,27 +1,35 @@
 import time
-import boto3
-from io import BytesIO
+import asyncio
 import pandas as pd
 from datetime import datetime, timedelta
-from app.scripts.data_fetchers.broker_data import BrokerData
-from app.scripts.data_fetchers.portfolio_data import KeynoteDataProcessor, ZerodhaDataFetcher
+from app.scripts.data_fetchers.portfolio_data import get_keynote_data_processor, get_zerodha_data_fetcher
+from app.scripts.data_fetchers.ledger_cache import LedgerCache
+from app.scripts.data_fetchers.ledger import Ledger
+from app.scripts.data_fetchers.snapshot_format import latest_snapshot, decode_snapshot
+from app.scripts.data_fetchers.storage import get_storage
+from app.scripts.data_fetchers.s3_listing_index import s3_listing_index
+from app.scripts.data_fetchers.reference_data import (
+    reference_data, FEES_PATH, BUYBACKS_PATH, SHARE_TRANSFERS_PATH, CASHFLOW_EXCEPTIONS_PATH
+)
 from typing import Dict, Optional, Tuple
 from app.logger import logger
 
-broker_data = BrokerData()
-master_data = broker_data.get_master_data(broker_type='upstox')
-upstox_master_df = pd.DataFrame(master_data["data"]) if master_data and "data" in master_data else pd.DataFrame()
-
 
 class KeynoteDataTransformer:
 
-    def __init__(self):
+    def __init__(self, ledger_cache: LedgerCache = None):
         """Initialize with KeynoteApi instance."""
-        self.keynote_portfolio = KeynoteDataProcessor()
-        self.fees = pd.read_excel("/home/admin/Plus91Backoffice/Plus91_Backend/data/cashflow_data/plus91_fees.xlsx")
-        self.buybacks = pd.read_excel("/home/admin/Plus91Backoffice/Plus91_Backend/data/cashflow_data/plus91_buybacks.xlsx")
-        self.share_transfers = pd.read_excel("/home/admin/Plus91Backoffice/Plus91_Backend/data/cashflow_data/plus91_share_transfers.xlsx")
-        self.cashflow_exceptions = pd.read_excel("/home/admin/Plus91Backoffice/Plus91_Backend/data/cashflow_data/plus91_cashflow_exceptions.xlsx")
+        self.keynote_portfolio = get_keynote_data_processor()
+        self.ledger_cache = ledger_cache or LedgerCache()
+
+    def get_ledger(self, broker_code: str) -> Optional[Ledger]:
+        """The complete ledger for a UCC as a Ledger, built at most once per run via the ledger cache."""
+        return self.ledger_cache.get_or_load(
+            "keynote",
+            broker_code,
+            self.keynote_portfolio.ledger_store.version(),
+            lambda: Ledger.from_keynote(self.keynote_portfolio.fetch_ledger(ucc=broker_code))
+        )
 
     async def transform_ledger_to_cashflow(
             self,
@@ -31,43 +39,23 @@ class KeynoteDataTransformer:
     ) -> Optional[Dict]:
         """Transform ledger data into cashflow format."""
         try:
-            ledger_data = self.keynote_portfolio.fetch_ledger(
-                ucc=broker_code,
-                from_date=from_date,
-                to_date=to_date
-            )
-            if not ledger_data:
+            if from_date or to_date:
+                ledger = await asyncio.to_thread(lambda: Ledger.from_keynote(self.keynote_portfolio.fetch_ledger(
+                    ucc=broker_code,
+                    from_date=from_date,
+                    to_date=to_date
+                )))
+            else:
+                ledger = await asyncio.to_thread(self.get_ledger, broker_code)
+            if not ledger:
                 logger.warning(f"Ledger data for {broker_code}, from: {from_date}, to: {to_date} was not found.")
                 return None
 
-            ledger_df = pd.DataFrame(ledger_data)
-            if ledger_df.empty:
-                logger.warning(f"Ledger data for {broker_code}, from: {from_date}, to: {to_date} is empty.")
-                return None
-            
-            ledger_df.columns = [col.replace("_x000D_", "").replace("\n", "").strip() for col in ledger_df.columns]
-            ledger_df = ledger_df.rename(columns={
-                'VoucherDate': 'event_date',
-                'AmountDebit': 'debit',
-                'AmountCredit': 'credit',
-                'RunningBalance': 'runbal',
-                'DrCr': 'type',
-                'EntryDetails': 'narr',
-                'Sett#': 'settl_no',
-                'Branch': 'branch',
-                'column_8': 'notes'
-            })
-            
-            ledger_df = ledger_df[
-                ledger_df['narr'].fillna('').str.startswith('AXIS BANK')
-            ][["event_date", "debit", "credit"]]
-
-            ledger_df['event_date'] = pd.to_datetime(ledger_df['event_date'], format='%d-%b-%Y', errors='coerce').dt.date
-            ledger_df['cashflow'] = ledger_df['credit'].fillna(0) - ledger_df['debit'].fillna(0)
+            ledger_df = ledger.cashflows_between()
             ledger_df['tag'] = ""
             ledger_df = ledger_df[['event_date', 'cashflow', 'tag']].reset_index(drop=True)
 
-            fees_data = self.fees[self.fees['broker_code'] == broker_code]
+            fees_data = reference_data.get(FEES_PATH, group_by=['broker_code']).rows('broker_code', broker_code)
             if not fees_data.empty:
                 fees_data['event_date'] = pd.to_datetime(fees_data['event_date'], format='%Y-%m-%d', errors='coerce').dt.date
                 fees_data['tag'] = "fees"
@@ -75,7 +63,7 @@ class KeynoteDataTransformer:
             else:
                 fees_data = pd.DataFrame(columns=["event_date", "cashflow", "tag"])
 
-            buybacks_data = self.buybacks[self.buybacks['broker_code'] == broker_code]
+            buybacks_data = reference_data.get(BUYBACKS_PATH, group_by=['broker_code']).rows('broker_code', broker_code)
             if not buybacks_data.empty:
                 buybacks_data['event_date'] = pd.to_datetime(buybacks_data['event_date'], format='%Y-%m-%d', errors='coerce').dt.date
                 buybacks_data['cashflow'] = -buybacks_data['cashflow']
@@ -84,7 +72,7 @@ class KeynoteDataTransformer:
             else:
                 buybacks_data = pd.DataFrame(columns=["event_date", "cashflow", "tag"])
 
-            share_transfers_data = self.share_transfers[self.share_transfers['broker_code'] == broker_code]
+            share_transfers_data = reference_data.get(SHARE_TRANSFERS_PATH, group_by=['broker_code']).rows('broker_code', broker_code)
             if not share_transfers_data.empty:
                 share_transfers_data['event_date'] = pd.to_datetime(share_transfers_data['event_date'], format='%Y-%m-%d', errors='coerce').dt.date
                 share_transfers_data['tag'] = "share transfer"
@@ -92,7 +80,7 @@ class KeynoteDataTransformer:
             else:
                 share_transfers_data = pd.DataFrame(columns=["event_date", "cashflow", "tag"])
             
-            cashflow_exceptions_data = self.cashflow_exceptions[self.cashflow_exceptions['broker_code'] == broker_code]
+            cashflow_exceptions_data = reference_data.get(CASHFLOW_EXCEPTIONS_PATH, group_by=['broker_code']).rows('broker_code', broker_code)
             if not cashflow_exceptions_data.empty:
                 cashflow_exceptions_data['event_date'] = pd.to_datetime(cashflow_exceptions_data['event_date'], format='%Y-%m-%d', errors='coerce').dt.date
                 cashflow_exceptions_data['tag'] = "cashflow exception"
@@ -127,36 +115,28 @@ class KeynoteDataTransformer:
             Optional[Dict]: A dictionary with aggregated holdings data or None if no data is found.
         """
         try:
-            bucket_name = 'plus91backoffice'
-            prefix = f"PLUS91_PMS/ledgers_and_holdings/keynote/single_accounts/{broker_code}/holdings/"
-            
             for_date_dt = datetime.strptime(for_date, "%Y-%m-%d")
             year = for_date_dt.year
             month = for_date_dt.month
             month_prefix = f"{year}-{month:02d}-"
 
-            s3 = boto3.client('s3')
-            response = s3.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
-            if 'Contents' not in response:
+            snapshots = s3_listing_index.holdings("keynote", broker_code)
+            if not snapshots:
                 logger.warning(f"No holdings files found in S3 for {broker_code}")
                 return None
 
-            files = [
-                obj['Key'] for obj in response['Contents']
-                if obj['Key'].endswith('.xlsx') and month_prefix in obj['Key']
-            ]
-
-            if not files:
+            latest = latest_snapshot((key for _, key, _ in snapshots), month_prefix)
+            if latest is None:
                 logger.warning(f"No holdings files found for {year}-{month:02d} in S3 for {broker_code}")
                 return None
 
-            latest_file = max(files, key=lambda x: x.split('/')[-1].replace('.xlsx', ''))
-            latest_date = latest_file.split('/')[-1].replace('.xlsx', '')
+            latest_file, latest_date = latest
             logger.info(f"Found latest file: {latest_file} for {broker_code}")
 
-            obj = s3.get_object(Bucket=bucket_name, Key=latest_file)
-            file_content = obj['Body'].read()
-            holdings_df = pd.read_excel(BytesIO(file_content))
+            etag = next(etag for _, key, etag in snapshots if key == latest_file)
+            holdings_df = await asyncio.to_thread(
+                lambda: decode_snapshot(get_storage().get(latest_file, etag=etag), latest_file)
+            )
             
             holdings_df = holdings_df[~holdings_df["isin"].isin([0, '0'])]
             holdings_df = holdings_df.groupby("trading_symbol")[["quantity", "market_value"]].sum().reset_index()
@@ -171,50 +151,35 @@ class KeynoteDataTransformer:
 
 class ZerodhaDataTransformer:
 
-    def __init__(self):
+    def __init__(self, ledger_cache: LedgerCache = None):
         """Initialize with ZerodhaDataFetcher instance."""
-        self.zerodha_portfolio = ZerodhaDataFetcher()
-        self.fees = pd.read_excel("/home/admin/Plus91Backoffice/Plus91_Backend/data/cashflow_data/plus91_fees.xlsx")
-        self.buybacks = pd.read_excel("/home/admin/Plus91Backoffice/Plus91_Backend/data/cashflow_data/plus91_buybacks.xlsx")
-        self.share_transfers = pd.read_excel("/home/admin/Plus91Backoffice/Plus91_Backend/data/cashflow_data/plus91_share_transfers.xlsx")
-
+        self.zerodha_portfolio = get_zerodha_data_fetcher()
+        self.ledger_cache = ledger_cache or LedgerCache()
+
+    def get_ledger(self, broker_code: str) -> Optional[Ledger]:
+        """The ledger for a broker code as a Ledger, downloaded and built at most once per run via the ledger cache."""
+        return self.ledger_cache.get_or_load(
+            "zerodha",
+            broker_code,
+            self.zerodha_portfolio.get_ledger_version(broker_code),
+            lambda: Ledger.from_zerodha(self.zerodha_portfolio.get_ledger(broker_code=broker_code))
+        )
 
     async def transform_ledger_to_cashflow(
             self,
             broker_code: str
         ) -> Optional[Dict]:
         """Transform Zerodha ledger data into cashflow format."""
-        ledger_data = self.zerodha_portfolio.get_ledger(
-            broker_code=broker_code
-        )
-        if not ledger_data:
+        ledger = await asyncio.to_thread(self.get_ledger, broker_code)
+        if not ledger:
             logger.warning(f"Ledger data for {broker_code} could not be fetched.")
             return None
 
-        ledger_df = pd.DataFrame(ledger_data)
-        if ledger_df.empty:
-            logger.warning(f"Ledger data for {broker_code} is empty.")
-            return None
-
-        ledger_df_slice = ledger_df[ledger_df['Voucher Type'].isin(['Bank Receipts', 'Bank Payments'])]
-        if ledger_df.empty:
-            logger.warning(f"No cash transactions found in ledger data for {broker_code}.")
-            return None
-
         try:
-            inflow_df = ledger_df_slice[["Posting Date", "Credit"]].rename(columns={"Posting Date": "event_date", "Credit": "cashflow"})
-            inflow_df = inflow_df[inflow_df['cashflow'] != 0]
-
-            outflow_df = ledger_df_slice[["Posting Date", "Debit"]].rename(columns={"Posting Date": "event_date", "Debit": "cashflow"})
-            outflow_df['cashflow'] = -outflow_df['cashflow']
-            outflow_df = outflow_df[outflow_df['cashflow'] != 0]
-
-            cashflow_df = pd.concat([inflow_df, outflow_df], ignore_index=True)
-            cashflow_df["event_date"] = pd.to_datetime(cashflow_df["event_date"], format='%Y-%m-%d', errors='coerce').dt.date
-            cashflow_df["cashflow"] = cashflow_df["cashflow"].astype(float)
+            cashflow_df = ledger.cashflows_between()
             cashflow_df["tag"] = ""
 
-            fees_data = self.fees[self.fees['broker_code'] == broker_code]
+            fees_data = reference_data.get(FEES_PATH, group_by=['broker_code']).rows('broker_code', broker_code)
             if not fees_data.empty:
                 fees_data['event_date'] = pd.to_datetime(fees_data['event_date'], format='%Y-%m-%d', errors='coerce').dt.date
                 fees_data['tag'] = "fees"
@@ -222,7 +187,7 @@ class ZerodhaDataTransformer:
             else:
                 fees_data = pd.DataFrame(columns=["event_date", "cashflow", "tag"])
 
-            buybacks_data = self.buybacks[self.buybacks['broker_code'] == broker_code]
+            buybacks_data = reference_data.get(BUYBACKS_PATH, group_by=['broker_code']).rows('broker_code', broker_code)
             if not buybacks_data.empty:
                 buybacks_data['event_date'] = pd.to_datetime(buybacks_data['event_date'], format='%Y-%m-%d', errors='coerce').dt.date
                 buybacks_data['cashflow'] = -buybacks_data['cashflow']
@@ -231,7 +196,7 @@ class ZerodhaDataTransformer:
             else:
                 buybacks_data = pd.DataFrame(columns=["event_date", "cashflow", "tag"])
 
-            share_transfers_data = self.share_transfers[self.share_transfers['broker_code'] == broker_code]
+            share_transfers_data = reference_data.get(SHARE_TRANSFERS_PATH, group_by=['broker_code']).rows('broker_code', broker_code)
             if not share_transfers_data.empty:
                 share_transfers_data['event_date'] = pd.to_datetime(share_transfers_data['event_date'], format='%Y-%m-%d', errors='coerce').dt.date
                 share_transfers_data['tag'] = "share transfer"
@@ -242,10 +207,6 @@ class ZerodhaDataTransformer:
             cashflow_df = pd.concat(
                 [cashflow_df, fees_data, buybacks_data, share_transfers_data], ignore_index=True
             ).sort_values(by='event_date')
-
-            ledger_df['Posting Date'] = pd.to_datetime(ledger_df['Posting Date'])
-            latest_row = ledger_df.sort_values('Posting Date').iloc[-1]
-            latest_balance = float(latest_row['Net Balance'])
             cashflow_df = cashflow_df.reset_index(drop=True)
             return cashflow_df.to_dict()
         except Exception as e:
@@ -259,7 +220,8 @@ class ZerodhaDataTransformer:
             year: int
     ) -> Optional[Tuple[Dict, str]]:
         """Transform Zerodha holdings data into actual portfolio format."""
-        holdings_data, snapshot_date = self.zerodha_portfolio.get_holdings(
+        holdings_data, snapshot_date = await asyncio.to_thread(
+            self.zerodha_portfolio.get_holdings,
             broker_code=broker_code,
             month=month,
             year=year
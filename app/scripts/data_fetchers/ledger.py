@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+# Tag of the entries that move cash between the client's bank and the broker.
+BANK_TAG = "bank"
+ZERODHA_BANK_VOUCHER_TYPES = ("Bank Receipts", "Bank Payments")
+KEYNOTE_BANK_NARRATION_PREFIX = "AXIS BANK"
+KEYNOTE_COLUMNS = {
+    'VoucherDate': 'event_date',
+    'AmountDebit': 'debit',
+    'AmountCredit': 'credit',
+    'RunningBalance': 'runbal',
+    'DrCr': 'type',
+    'EntryDetails': 'narr',
+    'Sett#': 'settl_no',
+    'Branch': 'branch',
+    'column_8': 'notes'
+}
+
+
+def _to_datetime64(dates) -> np.ndarray:
+    """Dates, Timestamps or date strings as a datetime64[D] array."""
+    return pd.to_datetime(pd.Series(list(dates), dtype=object)).values.astype('datetime64[D]')
+
+
+class Ledger:
+    """
+    Columnar, read-only view of a broker ledger.
+
+    Entries are kept sorted by date (stably, so same-day entries stay in ledger order) as
+    a datetime64[D] date array, float64 debit, credit and running balance arrays and a
+    categorical tag per entry; BANK_TAG marks the bank receipts and payments that count
+    as cashflows. Entries without a running balance are kept for cashflows but ignored by
+    the balance lookups.
+
+    A Ledger is built once per account and run (see the transformers' get_ledger) and
+    shared by the cashflow and cash balance calculations.
+    """
+
+    def __init__(
+            self,
+            dates: np.ndarray,
+            debit: np.ndarray,
+            credit: np.ndarray,
+            balance: np.ndarray,
+            tags: pd.Categorical
+        ):
+        order = np.argsort(dates, kind='mergesort')
+        self.dates = dates[order]
+        self.debit = debit[order]
+        self.credit = credit[order]
+        self.balance = balance[order]
+        self.tags = tags[order]
+        has_balance = ~np.isnan(self.balance)
+        self._balance_dates = self.dates[has_balance]
+        self._balances = self.balance[has_balance]
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @classmethod
+    def _from_columns(cls, dates, debit, credit, balance, tags) -> "Ledger":
+        dates = pd.to_datetime(dates, errors='coerce')
+        valid = dates.notna().to_numpy()
+        return cls(
+            dates[valid].to_numpy().astype('datetime64[D]'),
+            pd.to_numeric(debit, errors='coerce').fillna(0).to_numpy(dtype=np.float64)[valid],
+            pd.to_numeric(credit, errors='coerce').fillna(0).to_numpy(dtype=np.float64)[valid],
+            pd.to_numeric(balance, errors='coerce').to_numpy(dtype=np.float64)[valid],
+            pd.Categorical(tags.astype(str).to_numpy()[valid])
+        )
+
+    @classmethod
+    def from_zerodha(cls, ledger_data: Dict) -> Optional["Ledger"]:
+        """
+        Builds a Ledger from ZerodhaDataFetcher.get_ledger output. Entries are tagged with
+        their voucher type, or BANK_TAG for bank receipts and payments.
+        """
+        if not ledger_data:
+            return None
+        df = pd.DataFrame(ledger_data)
+        if df.empty:
+            return None
+        voucher_types = df['Voucher Type'].astype(str)
+        tags = voucher_types.where(~voucher_types.isin(ZERODHA_BANK_VOUCHER_TYPES), BANK_TAG)
+        return cls._from_columns(df['Posting Date'], df['Debit'], df['Credit'], df['Net Balance'], tags)
+
+    @classmethod
+    def from_keynote(cls, ledger_data) -> Optional["Ledger"]:
+        """
+        Builds a Ledger from KeynoteDataProcessor.fetch_ledger records. Entries whose
+        narration starts with "AXIS BANK" are tagged BANK_TAG, all others "".
+        """
+        if not ledger_data:
+            return None
+        df = pd.DataFrame(ledger_data)
+        if df.empty:
+            return None
+        df.columns = [col.replace("_x000D_", "").replace("\n", "").strip() for col in df.columns]
+        df = df.rename(columns=KEYNOTE_COLUMNS)
+        is_bank = df['narr'].fillna('').astype(str).str.startswith(KEYNOTE_BANK_NARRATION_PREFIX)
+        tags = pd.Series(np.where(is_bank, BANK_TAG, ""), index=df.index)
+        dates = pd.to_datetime(df['event_date'], format='%d-%b-%Y', errors='coerce')
+        return cls._from_columns(dates, df['debit'], df['credit'], df['runbal'], tags)
+
+    def balances_at(self, dates: Iterable) -> np.ndarray:
+        """
+        The running balance at the end of each of the given dates: the balance after the
+        last entry on or before the date, or 0.0 before the first entry.
+        """
+        targets = _to_datetime64(dates)
+        idx = np.searchsorted(self._balance_dates, targets, side='right')
+        balances = np.zeros(len(targets), dtype=np.float64)
+        found = idx > 0
+        balances[found] = self._balances[idx[found] - 1]
+        return balances
+
+    def latest_balance(self) -> float:
+        """The balance after the last entry with one, or 0.0 for an empty ledger."""
+        return float(self._balances[-1]) if len(self._balances) else 0.0
+
+    def cashflows_between(self, start: date = None, end: date = None) -> pd.DataFrame:
+        """
+        The bank cashflows (credit - debit of BANK_TAG entries, zero amounts excluded)
+        dated between start and end inclusive; either bound may be omitted.
+
+        Returns:
+            pd.DataFrame: event_date (datetime.date) and cashflow, in date order.
+        """
+        mask = np.asarray(self.tags == BANK_TAG)
+        if start is not None:
+            mask &= self.dates >= np.datetime64(start, 'D')
+        if end is not None:
+            mask &= self.dates <= np.datetime64(end, 'D')
+        cashflows = self.credit[mask] - self.debit[mask]
+        nonzero = cashflows != 0
+        return pd.DataFrame({
+            'event_date': self.dates[mask][nonzero].astype(object),
+            'cashflow': cashflows[nonzero]
+        })
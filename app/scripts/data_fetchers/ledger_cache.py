@@ -0,0 +1,63 @@
+import threading
+from app.logger import logger
+from typing import Any, Callable, Dict, Hashable
+
+
+class LedgerCache:
+    """
+    Run-scoped cache of parsed broker ledgers (ledger.Ledger instances).
+
+    Entries are keyed by (broker, broker_code, source version), so a ledger is parsed once
+    per run and reparsed only if its source (bulk ledger workbooks, S3 object ETag) changes.
+    One instance is shared by CashflowProcessor and the Keynote/Zerodha transformers.
+    Cached ledgers are shared between callers and must be treated as read-only.
+
+    The cache is thread-safe: ledgers are loaded in worker threads (asyncio.to_thread), and
+    concurrent lookups of the same key wait for a single load instead of repeating it.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(
+            self,
+            broker: str,
+            broker_code: str,
+            version: Hashable,
+            loader: Callable[[], Any]
+        ) -> Any:
+        """Return the cached ledger for the key, calling loader() on a miss."""
+        key = (broker, broker_code, version)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self.hits += 1
+                    return self._entries[key]
+                self.misses += 1
+            ledger = loader()
+            with self._lock:
+                self._entries[key] = ledger
+                self._key_locks.pop(key, None)
+            return ledger
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def log_stats(self):
+        logger.info(f"Ledger cache: {self.hits} hits, {self.misses} misses, {len(self._entries)} ledgers cached")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,189 @@
+import os
+import pickle
+import hashlib
+import threading
+import multiprocessing
+from app.scripts.data_fetchers.workbook_reader import iter_workbook_rows, iter_ledger_blocks
+from app.logger import logger
+from typing import Dict, List, Tuple
+
+
+class KeynoteLedgerStore:
+    """
+    Local, UCC-indexed store of the Keynote bulk ledger workbooks.
+
+    Every workbook in the bulk ledger folder is parsed once, split into per-client
+    blocks and persisted next to the other backend data as a pickled index
+    {ucc: [rows]}. The index is keyed by the source file's size and mtime, so a
+    workbook is only parsed again when it changes on disk; a workbook that fails to parse
+    is not retried until its signature changes either. Cell values are kept
+    exactly as the workbook reader returns them (the blocks mix dates, narration rows and
+    numbers), which is why the blocks are pickled rather than written to a
+    typed columnar format.
+
+    The store is thread-safe; ledgers are loaded from worker threads during a run.
+    """
+
+    def __init__(self, ledger_location: str, store_location: str):
+        self.ledger_location = ledger_location
+        self.store_location = store_location
+        self._indexes = {}
+        self._lock = threading.RLock()
+        # file name -> signature of workbooks that failed to parse
+        self._failed = {}
+        # (file name, signature) pairs of the listing last refreshed against
+        self._listing = None
+        self._version = None
+
+    def __getstate__(self):
+        # Locks cannot be pickled; the indexes are reloaded from disk on first use.
+        return {"ledger_location": self.ledger_location, "store_location": self.store_location}
+
+    def __setstate__(self, state):
+        self.__init__(state["ledger_location"], state["store_location"])
+
+    def get_blocks(self, ucc: str) -> Tuple[List, List[List]]:
+        """
+        Returns the header row and all ledger blocks stored for a client code, in
+        workbook file name order. Each block starts with the client header row.
+        """
+        with self._lock:
+            self.refresh()
+            header = None
+            blocks = []
+            for file_name in sorted(self._indexes):
+                index = self._indexes[file_name]
+                client_blocks = index["blocks"].get(ucc)
+                if not client_blocks:
+                    continue
+                if header is None:
+                    header = index["header"]
+                blocks.extend(client_blocks)
+            return header, blocks
+
+    def version(self) -> str:
+        """Returns a short hash of the signatures of all indexed workbooks."""
+        with self._lock:
+            self.refresh()
+            if self._version is None:
+                digest = hashlib.sha1()
+                for file_name in sorted(self._indexes):
+                    digest.update(f"{file_name}:{self._indexes[file_name]['signature']}".encode())
+                self._version = digest.hexdigest()
+            return self._version
+
+    def refresh(self):
+        """
+        Brings the in-memory and on-disk indexes in line with the bulk ledger folder:
+        drops workbooks that were removed and (re)parses only new or modified ones.
+
+        Returns right away when no workbook was added, removed or modified since the last
+        call, so it only costs a directory listing and a stat per workbook.
+        """
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        files = [f for f in os.listdir(self.ledger_location) if f.endswith(".xlsx")]
+        if not files:
+            raise FileNotFoundError(f"No Excel files found in folder {self.ledger_location}.")
+
+        listing = tuple(sorted(
+            (file_name, self._file_signature(os.path.join(self.ledger_location, file_name)))
+            for file_name in files
+        ))
+        if listing == self._listing:
+            return
+        self._version = None
+
+        for file_name in list(self._indexes):
+            if file_name not in files:
+                del self._indexes[file_name]
+        for file_name in list(self._failed):
+            if file_name not in files:
+                del self._failed[file_name]
+
+        stale = []
+        for file_name, signature in listing:
+            if self._failed.get(file_name) == signature:
+                continue
+            index = self._indexes.get(file_name)
+            if index is None:
+                index = self._load_index(file_name)
+            if index is not None and index["signature"] == signature:
+                self._indexes[file_name] = index
+            else:
+                stale.append((file_name, signature))
+
+        if not stale:
+            self._listing = listing
+            return
+
+        logger.info(f"Indexing {len(stale)} bulk ledger file(s) into {self.store_location}")
+        paths = [os.path.join(self.ledger_location, file_name) for file_name, _ in stale]
+        if len(paths) > 1:
+            with multiprocessing.Pool(min(len(paths), os.cpu_count() or 1)) as pool:
+                results = pool.map(_split_ledger_file, paths)
+        else:
+            results = [_split_ledger_file(paths[0])]
+
+        for (file_name, signature), (header, blocks) in zip(stale, results):
+            if header is None:
+                logger.warning(f"Skipping bulk ledger file {file_name} until it changes")
+                self._failed[file_name] = signature
+                continue
+            self._failed.pop(file_name, None)
+            index = {"signature": signature, "header": header, "blocks": blocks}
+            self._save_index(file_name, index)
+            self._indexes[file_name] = index
+        self._listing = listing
+
+    def _file_signature(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    def _index_path(self, file_name: str) -> str:
+        return os.path.join(self.store_location, f"{file_name}.idx.pkl")
+
+    def _load_index(self, file_name: str):
+        path = self._index_path(file_name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable ledger index {path}: {e}")
+            return None
+
+    def _save_index(self, file_name: str, index: Dict):
+        os.makedirs(self.store_location, exist_ok=True)
+        path = self._index_path(file_name)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Could not persist ledger index {path}: {e}")
+
+
+def _split_ledger_file(file_path: str) -> Tuple[List, Dict[str, List[List]]]:
+    """
+    Parses one bulk ledger workbook and splits it into client blocks keyed by every
+    client code found in square brackets on the client header row.
+
+    Rows are streamed from the workbook (see iter_workbook_rows) instead of loading the
+    whole sheet first. Expects the header row in the second row and ledger entries from
+    the third row on.
+    """
+    try:
+        header, ledger_blocks = iter_ledger_blocks(iter_workbook_rows(file_path))
+        blocks = {}
+        for codes, block in ledger_blocks:
+            for code in codes:
+                blocks.setdefault(code, []).append(block)
+    except Exception as e:
+        logger.error(f"Could not load {file_path}: {e}")
+        return None, {}
+    return header, blocks
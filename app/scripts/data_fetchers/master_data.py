@@ -0,0 +1,111 @@
+import os
+import glob
+import threading
+import pandas as pd
+from datetime import datetime
+from app.scripts.data_fetchers.broker_data import BrokerData
+from app.logger import logger
+from typing import Dict, Optional, Tuple
+
+MASTER_DATA_LOCATION = "/home/admin/Plus91Backoffice/Plus91_Backend/data/master_data"
+EQUITY_EXCHANGES = ["NSE_EQ", "BSE_EQ"]
+
+
+# Master columns read by the holdings processing (isin -> trading symbol lookup).
+INSTRUMENT_COLUMNS = ["isin", "trading_symbol"]
+
+
+class MasterDataCache:
+    """
+    Daily on-disk cache of the Upstox master instrument list.
+
+    The list is downloaded at most once per day and reduced to what the pipeline reads:
+    the `INSTRUMENT_COLUMNS` of every instrument and the resolved `symbol_index`. Both are
+    pickled together to MASTER_DATA_LOCATION, so every later process that day loads them
+    directly, without the full dump and without rebuilding the index. Nothing is loaded
+    until the first call, so importing a module that uses the cache does not hit the
+    broker API.
+
+    `symbol_index` maps each equity trading symbol to the (exchange, exchange_token,
+    instrument_type) its LTP is requested with, preferring the NSE listing over BSE.
+    """
+
+    def __init__(self, broker_type: str = 'upstox', location: str = MASTER_DATA_LOCATION):
+        self.broker_type = broker_type
+        self.location = location
+        self._lock = threading.Lock()
+        self._day = None
+        self._df: Optional[pd.DataFrame] = None
+        self._symbol_index: Optional[Dict[str, Tuple[str, str, str]]] = None
+
+    def _path(self, day: str) -> str:
+        return os.path.join(self.location, f"{self.broker_type}_master_{day}.pkl")
+
+    def _ensure_loaded(self):
+        day = datetime.now().date().isoformat()
+        if self._df is None or self._day != day:
+            self._df, self._symbol_index = self._load(day)
+            self._day = day
+
+    def get_df(self) -> pd.DataFrame:
+        """
+        Today's master instruments, limited to INSTRUMENT_COLUMNS. Treat it as read-only;
+        it is shared by all callers.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self._df
+
+    def symbol_index(self) -> Dict[str, Tuple[str, str, str]]:
+        """tradingsymbol -> (exchange, exchange_token, instrument_type) for NSE/BSE equities."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._symbol_index
+
+    def _load(self, day: str) -> Tuple[pd.DataFrame, Dict[str, Tuple[str, str, str]]]:
+        path = self._path(day)
+        if os.path.exists(path):
+            try:
+                cached = pd.read_pickle(path)
+                return cached["instruments"], cached["symbol_index"]
+            except Exception as e:
+                logger.warning(f"Could not read cached master data {path}, downloading again: {e}")
+
+        master_data = BrokerData.get_master_data(broker_type=self.broker_type)
+        if not master_data or master_data.get("status") != "success" or "data" not in master_data:
+            raise ValueError("Failed to fetch master data from broker")
+        master_df = pd.DataFrame(master_data["data"])
+        instruments = master_df.loc[:, [column for column in INSTRUMENT_COLUMNS if column in master_df.columns]]
+        symbol_index = _build_symbol_index(master_df)
+        del master_df
+
+        os.makedirs(self.location, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        pd.to_pickle({"instruments": instruments, "symbol_index": symbol_index}, temp_path)
+        os.replace(temp_path, path)
+        for old_path in glob.glob(self._path("*")):
+            if old_path != path:
+                os.remove(old_path)
+        logger.info(f"Downloaded {len(instruments)} master instruments ({len(symbol_index)} equity symbols) to {path}")
+        return instruments, symbol_index
+
+
+def _build_symbol_index(master_df: pd.DataFrame) -> Dict[str, Tuple[str, str, str]]:
+    equities = master_df.loc[
+        master_df["exchange"].isin(EQUITY_EXCHANGES), ["tradingsymbol", "exchange", "exchange_token"]
+    ]
+    # "NSE_EQ" sorts after "BSE_EQ", so descending order keeps the NSE listing of each symbol.
+    equities = equities.sort_values(by=["tradingsymbol", "exchange"], ascending=[True, False])
+    equities = equities.drop_duplicates(subset="tradingsymbol", keep="first")
+    exchange_parts = equities["exchange"].str.split("_", n=1, expand=True)
+    return dict(zip(
+        equities["tradingsymbol"],
+        zip(
+            exchange_parts[0].astype(str),
+            equities["exchange_token"].astype(str),
+            exchange_parts[1].astype(str)
+        )
+    ))
+
+
+master_data_cache = MasterDataCache()
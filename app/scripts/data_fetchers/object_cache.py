@@ -0,0 +1,191 @@
+import os
+import mmap
+import hashlib
+import threading
+from functools import lru_cache
+from botocore.exceptions import ClientError
+from app.config import settings
+from app.scripts.data_fetchers.s3_client import get_s3_client
+from app.scripts.data_fetchers.storage import read_file
+from app.logger import logger
+from typing import Optional, Tuple, Union
+
+OBJECT_CACHE_LOCATION = "/home/admin/Plus91Backoffice/Plus91_Backend/data/s3_cache"
+# Eviction trims the cache to this fraction of its limit, so it does not run on every write.
+EVICTION_TARGET_RATIO = 0.9
+
+
+def _is_not_modified(error: ClientError) -> bool:
+    return error.response.get('Error', {}).get('Code') in ('304', 'NotModified')
+
+
+def _normalize_etag(etag: Optional[str]) -> Optional[str]:
+    return etag.strip('"') if etag else None
+
+
+class S3ObjectCache:
+    """
+    On-disk cache of S3 objects, keyed by object key and ETag.
+
+    Every object is stored once per version as `{sha1(bucket/key)}/{etag}` under the cache
+    directory. Entries are not deduplicated by content: the same bytes under two keys are
+    stored twice, and each key is revalidated on its own. When the caller already knows
+    the object's ETag (e.g. from the S3 listing index), a cached copy with that ETag is
+    returned without touching the network. Otherwise the cached version is revalidated
+    with a conditional GET (IfNoneMatch), which costs a round trip but no transfer when
+    the object is unchanged.
+
+    The cache is bounded by max_bytes: reads touch a file's mtime and, when a write takes
+    the cache over its limit, the least recently used files are removed. Files are written
+    atomically, so several processes can share one cache directory, and the cache is
+    safe to use from several threads. Large files are returned as a read-only mmap (see
+    storage.read_file) instead of bytes.
+    """
+
+    def __init__(
+            self,
+            s3_client,
+            location: str = OBJECT_CACHE_LOCATION,
+            max_bytes: int = None
+        ):
+        self.s3 = s3_client
+        self.location = location
+        self.max_bytes = settings.S3_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def _object_dir(self, bucket: str, key: str) -> str:
+        digest = hashlib.sha1(f"{bucket}/{key}".encode()).hexdigest()
+        return os.path.join(self.location, digest[:2], digest)
+
+    def _cached_version(self, object_dir: str) -> Optional[Tuple[str, str]]:
+        """(etag, path) of the cached version of an object, or None."""
+        try:
+            names = [name for name in os.listdir(object_dir) if not name.endswith('.tmp')]
+        except FileNotFoundError:
+            return None
+        if not names:
+            return None
+        try:
+            etag = max(names, key=lambda name: os.path.getmtime(os.path.join(object_dir, name)))
+        except FileNotFoundError:
+            # Evicted or replaced by another thread or process meanwhile.
+            return None
+        return etag, os.path.join(object_dir, etag)
+
+    def get(self, bucket: str, key: str, etag: str = None) -> Union[bytes, mmap.mmap]:
+        """
+        The contents of s3://bucket/key, from the local cache when it is current.
+
+        Args:
+            bucket (str): The bucket name.
+            key (str): The object key.
+            etag (str, optional): The object's current ETag, if known. Skips revalidation
+                when the cached copy has this ETag.
+
+        Raises:
+            botocore.exceptions.ClientError: If the object cannot be fetched (e.g. NoSuchKey).
+        """
+        object_dir = self._object_dir(bucket, key)
+        cached = self._cached_version(object_dir)
+        etag = _normalize_etag(etag)
+
+        if cached and etag and cached[0] == etag:
+            try:
+                data = self._read(cached[1])
+            except FileNotFoundError:
+                cached = None
+            else:
+                self._count('hits')
+                return data
+
+        request = {'Bucket': bucket, 'Key': key}
+        if cached:
+            request['IfNoneMatch'] = f'"{cached[0]}"'
+        try:
+            response = self.s3.get_object(**request)
+        except ClientError as e:
+            if cached and _is_not_modified(e):
+                self._count('revalidated')
+                return self._read(cached[1])
+            raise
+
+        self._count('misses')
+        data = response['Body'].read()
+        self._store(object_dir, _normalize_etag(response.get('ETag')), data)
+        return data
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _read(self, path: str) -> Union[bytes, mmap.mmap]:
+        os.utime(path)
+        return read_file(path)
+
+    def _store(self, object_dir: str, etag: Optional[str], data: bytes):
+        if not etag:
+            return
+        try:
+            os.makedirs(object_dir, exist_ok=True)
+            path = os.path.join(object_dir, etag)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            for name in os.listdir(object_dir):
+                if name != etag and not name.endswith('.tmp'):
+                    os.remove(os.path.join(object_dir, name))
+        except OSError as e:
+            logger.warning(f"Could not cache S3 object in {object_dir}: {e}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[0]
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _scan(self):
+        files = []
+        for root, _, names in os.walk(self.location):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return sum(size for _, size, _ in files), files
+
+    def _evict(self):
+        total, files = self._scan()
+        target = self.max_bytes * EVICTION_TARGET_RATIO
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self._size = total
+        logger.info(f"Evicted {removed} objects from the S3 cache, {total / 1024 ** 2:.0f} MiB left")
+
+    def log_stats(self):
+        logger.info(
+            f"S3 cache: {self.hits} hits, {self.revalidated} revalidated, {self.misses} downloads"
+        )
+
+
+@lru_cache(maxsize=None)
+def get_object_cache() -> S3ObjectCache:
+    """The process-wide S3ObjectCache on the shared S3 client, created on first use."""
+    return S3ObjectCache(get_s3_client())
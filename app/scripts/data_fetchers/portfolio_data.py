@@ -1,35 +1,91 @@
 import os
-import io
 import re
-import boto3
+import json
 import httpx
 import asyncio
-import openpyxl
 import multiprocessing
 import pandas as pd
 import polars as pl
-from functools import partial
-from datetime import datetime, date
-from app.scripts.data_fetchers.broker_data import BrokerData
+from datetime import datetime, date, timedelta
+from functools import lru_cache
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+from app.scripts.data_fetchers.master_data import master_data_cache
+from app.scripts.data_fetchers.ledger_store import KeynoteLedgerStore
+from app.scripts.data_fetchers.bulk_holdings_manifest import BulkHoldingsManifest, file_sha1
+from app.scripts.data_fetchers.workbook_reader import iter_workbook_rows, iter_holdings_blocks
+from app.scripts.data_fetchers.s3_listing_index import s3_listing_index
+from app.scripts.data_fetchers.storage import Storage, get_storage
+from app.scripts.data_fetchers.snapshot_format import (
+    snapshot_key, latest_snapshot, encode_snapshot, decode_snapshot
+)
 from dotenv import load_dotenv
 from app.logger import logger
-from typing import Dict, Tuple
+from typing import Dict, Iterator, Optional, Tuple
 
 
 load_dotenv()
 pd.set_option('future.no_silent_downcasting', True)
 
+# Client blocks read, built and uploaded together by process_bulk_holdings_to_s3.
+BULK_HOLDINGS_BATCH_SIZE = 256
+
+KEYNOTE_API_TIMEOUT = httpx.Timeout(30.0)
+KEYNOTE_API_CONCURRENCY = 4
+KEYNOTE_API_LIMITS = httpx.Limits(max_connections=KEYNOTE_API_CONCURRENCY, max_keepalive_connections=KEYNOTE_API_CONCURRENCY)
+KEYNOTE_LEDGER_CACHE_LOCATION = "/home/admin/Plus91Backoffice/Plus91_Backend/data/keynote_api_ledgers"
+
 class ApiError(Exception):
     """Custom exception for API errors."""
     pass
 
-class KeynoteApi:
 
-    def __init__(self):
+def _current_fy_start() -> date:
+    """1 April of the current financial year."""
+    today = date.today()
+    return date(today.year if today.month >= 4 else today.year - 1, 4, 1)
+
+class KeynoteApi:
+    """
+    Client for the Wizzer (Keynote) back-office API.
+
+    All requests share one pooled keep-alive httpx.AsyncClient per event loop, with at
+    most KEYNOTE_API_CONCURRENCY requests in flight. Ledgers are requested one financial
+    year per call, concurrently. Successful responses for financial years that ended more
+    than settings.KEYNOTE_LEDGER_CACHE_GRACE_DAYS ago are cached under
+    KEYNOTE_LEDGER_CACHE_LOCATION, so later runs only fetch recent years again; late
+    postings to an older year need invalidate_ledger_cache.
+    """
+
+    _client: Optional[httpx.AsyncClient] = None
+    _client_loop: Optional[asyncio.AbstractEventLoop] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+
+    def __init__(self, ledger_cache_location: str = KEYNOTE_LEDGER_CACHE_LOCATION):
         """Initialize the API client with base URL, headers, and API key."""
         self.BASE_URL = "https://backoffice.wizzer.in/shrdbms/dotnet/api/stansoft/"
         self.HEADERS = {"Content-Type": "application/json"}
         self.API_KEY = os.getenv("SHAREPRO_WIZZER_API_KEY")
+        self.ledger_cache_location = ledger_cache_location
+
+    @staticmethod
+    def _get_client() -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        if KeynoteApi._client is None or KeynoteApi._client_loop is not loop:
+            KeynoteApi._client = httpx.AsyncClient(timeout=KEYNOTE_API_TIMEOUT, limits=KEYNOTE_API_LIMITS)
+            KeynoteApi._client_loop = loop
+            KeynoteApi._semaphore = asyncio.Semaphore(KEYNOTE_API_CONCURRENCY)
+        return KeynoteApi._client, KeynoteApi._semaphore
+
+    @staticmethod
+    async def aclose():
+        """Close the shared client, e.g. at the end of a script."""
+        if KeynoteApi._client is not None:
+            await KeynoteApi._client.aclose()
+            KeynoteApi._client = None
+            KeynoteApi._client_loop = None
+            KeynoteApi._semaphore = None
 
     async def fetch_holding(self, for_date: str, ucc: str) -> Dict:
         """
@@ -54,32 +110,99 @@ class KeynoteApi:
         """
         Fetch ledger data between two dates for a UCC.
         Returns a pandas DataFrame if successful, None otherwise.
+
+        The financial years are fetched concurrently and their transactions are merged
+        in financial year order. Closed financial years are served from the local cache
+        when available.
         """
         params = self._generate_ledger_params(from_date, to_date, ucc)
-        all_transactions = []
-        for p in params:
-            url = self.BASE_URL + "ClientLedgerData"
-            payload = {
-                "key": self.API_KEY,
-                "datefrom": p["datefrom"],
-                "dateto": p["dateto"],
-                "segments": "NSE,BSE,NFO",
-                "ucc": p["ucc"],
-                "accyear": p["accyear"]
-            }
-            try:
-                data = await self._fetch_api_data(url, payload)
-                if "curdata" in data:
-                    all_transactions.extend(data["curdata"])
-            except ApiError as e:
-                logger.info(f"Error fetching ledger data for {p['datefrom']} to {p['dateto']}: {e}")
-                continue
+        results = await asyncio.gather(*(self._fetch_ledger_period(p) for p in params))
+        all_transactions = [transaction for transactions in results for transaction in transactions]
         if not all_transactions:
             return None
         
         all_transactions_df = pd.DataFrame(all_transactions)
         all_transactions_df["vrdt"] = pd.to_datetime(all_transactions_df["vrdt"]).dt.date
         return all_transactions_df.to_dict()
+
+    def invalidate_ledger_cache(self, ucc: str = None, accyear: str = None) -> int:
+        """
+        Deletes cached ledger years so they are fetched from the API again, e.g. after
+        back-office postings to a closed financial year.
+
+        Args:
+            ucc (str, optional): Only this client's years. Defaults to every client.
+            accyear (str, optional): Only this financial year, as passed to the API
+                (e.g. "2324"). Defaults to every year.
+
+        Returns:
+            int: The number of cached years deleted.
+        """
+        if not os.path.isdir(self.ledger_cache_location):
+            return 0
+        uccs = [ucc] if ucc else os.listdir(self.ledger_cache_location)
+        removed = 0
+        for client in uccs:
+            client_dir = os.path.join(self.ledger_cache_location, client)
+            if not os.path.isdir(client_dir):
+                continue
+            for name in os.listdir(client_dir):
+                if accyear is None or name.startswith(f"{accyear}_"):
+                    os.remove(os.path.join(client_dir, name))
+                    removed += 1
+        logger.info(f"Invalidated {removed} cached Keynote ledger years")
+        return removed
+
+    async def _fetch_ledger_period(self, p: Dict) -> list:
+        """
+        Transactions of one financial year period, from the cache if the year is closed
+        (ended more than settings.KEYNOTE_LEDGER_CACHE_GRACE_DAYS before the current one).
+        """
+        cache_path = os.path.join(
+            self.ledger_cache_location, p["ucc"], f"{p['accyear']}_{p['datefrom']}_{p['dateto']}.json"
+        )
+        closed = (
+            datetime.strptime(p["dateto"], "%d-%m-%Y").date()
+            < _current_fy_start() - timedelta(days=settings.KEYNOTE_LEDGER_CACHE_GRACE_DAYS)
+        )
+        if closed and os.path.exists(cache_path):
+            try:
+                with open(cache_path) as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"Discarding unreadable ledger cache {cache_path}: {e}")
+
+        url = self.BASE_URL + "ClientLedgerData"
+        payload = {
+            "key": self.API_KEY,
+            "datefrom": p["datefrom"],
+            "dateto": p["dateto"],
+            "segments": "NSE,BSE,NFO",
+            "ucc": p["ucc"],
+            "accyear": p["accyear"]
+        }
+        try:
+            data = await self._fetch_api_data(url, payload)
+        except ApiError as e:
+            logger.info(f"Error fetching ledger data for {p['datefrom']} to {p['dateto']}: {e}")
+            return []
+        transactions = data.get("curdata")
+        if not isinstance(transactions, list):
+            # Not a verified reply: treat the year as empty for this run, but do not
+            # cache it, so the next run asks the API again.
+            logger.warning(f"Ledger reply for {p['ucc']} {p['accyear']} has no curdata list, not caching it")
+            return []
+
+        if closed:
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                temp_path = f"{cache_path}.{os.getpid()}.tmp"
+                with open(temp_path, "w") as f:
+                    json.dump(transactions, f)
+                os.replace(temp_path, cache_path)
+            except OSError as e:
+                logger.warning(f"Could not cache ledger data in {cache_path}: {e}")
+        return transactions
     
     def _generate_ledger_params(self, from_date: str, to_date: str, ucc: str):
         """
@@ -123,29 +246,32 @@ class KeynoteApi:
         Helper function to fetch API data with retries and error handling.
         Returns a dictionary if successful, raises ApiError otherwise.
         """
+        client, semaphore = self._get_client()
         tries = 3
         for attempt in range(tries):
             try:
-                async with httpx.AsyncClient(timeout=30) as client:
+                async with semaphore:
                     response = await client.post(url, headers=self.HEADERS, json=payload)
-                    
-                    if response.status_code != 200:
-                        raise ApiError(f"Server error—status code {response.status_code}")
-                    
-                    content_type = response.headers.get('Content-Type', '').lower()
-                    if 'application/json' not in content_type:
-                        raise ApiError(f"Expected JSON, got {content_type or 'no content type'}")
-                    
-                    try:
-                        data = response.json()
-                    except ValueError:
-                        raise ApiError("Response is not JSON")
-                    
-                    if not isinstance(data, dict):
-                        raise ApiError(f"Expected dict, got {type(data).__name__}")
-                    
-                    return data
+                
+                if response.status_code != 200:
+                    raise ApiError(f"Server error—status code {response.status_code}")
+                
+                content_type = response.headers.get('Content-Type', '').lower()
+                if 'application/json' not in content_type:
+                    raise ApiError(f"Expected JSON, got {content_type or 'no content type'}")
+                
+                try:
+                    data = response.json()
+                except ValueError:
+                    raise ApiError("Response is not JSON")
+                
+                if not isinstance(data, dict):
+                    raise ApiError(f"Expected dict, got {type(data).__name__}")
+                
+                return data
             
+            except ApiError:
+                raise
             except httpx.ReadTimeout:
                 logger.info(f"Timeout on attempt {attempt + 1}/{tries}")
                 if attempt < tries - 1:
@@ -158,21 +284,103 @@ class KeynoteApi:
                 raise ApiError(f"Unexpected error: {str(e)}")
 
 
+def _build_client_holdings(args) -> Optional[Tuple[str, str, bytes]]:
+    """
+    Processes a single client block from a bulk holdings file: selects and renames columns,
+    cleans the trading symbol and serializes the result. Runs in a worker process.
+
+    A module-level function rather than a KeynoteDataProcessor method, so Pool.map only
+    pickles the block arguments and not the processor (whose ledger store holds a lock).
+
+    The S3 key follows the structure:
+      PLUS91_PMS/ledgers_and_holdings/keynote/single_accounts/{client_code}/holdings/{file_date}.xlsx
+    with the extension of settings.HOLDINGS_SNAPSHOT_FORMAT (.xlsx, .parquet or .csv.gz).
+
+    Returns:
+        Optional[Tuple[str, str, bytes]]: (client_code, s3_key, file bytes), or None if the
+            block could not be processed.
+    """
+    client_code, block, file_date_str = args
+
+    desired_cols = ["Scrip", "ISIN", "Margin_x000D_\nQuantity", "Market_x000D_\nValue"]
+    rename_mapping = {
+        "Scrip": "trading_symbol",
+        "ISIN": "isin",
+        "Margin_x000D_\nQuantity": "quantity",
+        "Market_x000D_\nValue": "market_value"
+    }
+
+    try:
+        df = pd.DataFrame(block[1:], columns=block[0])
+    except Exception as ex:
+        logger.error(f"Error creating DataFrame for client {client_code}: {ex}")
+        return
+
+    df.columns = [str(col).strip() for col in df.columns]
+    missing = [col for col in desired_cols if col not in df.columns]
+    if missing:
+        logger.warning(f"For client {client_code} the following columns are missing: {missing}. Skipping.")
+        return
+
+    df = df[desired_cols].copy()
+    df.rename(columns=rename_mapping, inplace=True)
+
+    def clean_symbol(symbol):
+        if pd.isna(symbol):
+            return symbol
+        cleaned = re.sub(r'\s+(MF|EQ|NO)$', '', str(symbol)).strip()
+        return cleaned
+
+    df["trading_symbol"] = df["trading_symbol"].apply(clean_symbol)
+    df = df[df["isin"].notna()]
+    df = df.groupby('trading_symbol', as_index=False).agg({
+        'isin': 'first',
+        'quantity': 'sum',
+        'market_value': 'sum'
+    })
+
+    master_df = master_data_cache.get_df()[["isin", "trading_symbol"]]
+    df = df.merge(master_df, on="isin", how="left")
+    df['trading_symbol_y'] = df['trading_symbol_y'].fillna(df['isin'])
+
+    df = df.drop(columns=["trading_symbol_x"], errors="ignore")
+    df = df.rename(columns={"trading_symbol_y": "trading_symbol"})
+    df = df.drop_duplicates()
+
+    if df.empty:
+        logger.warning(f"Empty DataFrame for client {client_code}. Uploading empty file with headers.")
+        df = pd.DataFrame(columns=df.columns)
+
+    snapshot_format = settings.HOLDINGS_SNAPSHOT_FORMAT
+    s3_key = snapshot_key(
+        f"PLUS91_PMS/ledgers_and_holdings/keynote/single_accounts/{client_code}/holdings/",
+        file_date_str,
+        snapshot_format
+    )
+    file_bytes = encode_snapshot(df, snapshot_format)
+    return client_code, s3_key, file_bytes
+
+
 class KeynoteDataProcessor:
 
     def __init__(self):
         """Initialize the Keynote data processor."""
         self.bulk_ledger_location = "/home/admin/Plus91Backoffice/Plus91_Backend/data/bulk_ledgers"
         self.bulk_holdings_location = "/home/admin/Plus91Backoffice/Plus91_Backend/data/bulk_holdings"
-        self.broker = BrokerData()
-        self.master_data = self.broker.get_master_data(broker_type='upstox')
-        self.master_df = pd.DataFrame(self.master_data['data'])
+        self.ledger_store_location = "/home/admin/Plus91Backoffice/Plus91_Backend/data/ledger_store"
+        self.bulk_holdings_manifest_path = "/home/admin/Plus91Backoffice/Plus91_Backend/data/bulk_holdings_manifest.json"
+        self.ledger_store = KeynoteLedgerStore(self.bulk_ledger_location, self.ledger_store_location)
         self.logger = logger
 
+    @property
+    def master_df(self) -> pd.DataFrame:
+        """isin and trading_symbol of the Upstox master instruments, downloaded at most once a day on first use."""
+        return master_data_cache.get_df()
+
     def fetch_ledger(self, ucc: str, from_date: str = None, to_date: str = None) -> dict:
         """
-        For a given client code and optional date range, scans all bulk ledger Excel files in folder_path
-        and returns a consolidated Polars DataFrame (as a dictionary list) of transactions for the client.
+        For a given client code and optional date range, looks up the client's blocks in the
+        indexed bulk ledger store and returns the consolidated transactions (as a list of records).
 
         Date strings must be in "yyyy-mm-dd" format. If only one date is provided then:
           - If only from_date is provided, transactions from that date until the latest are returned.
@@ -182,32 +390,16 @@ class KeynoteDataProcessor:
         start_date = self._parse_optional_date(from_date, date.min)
         end_date   = self._parse_optional_date(to_date, date.max)
 
-        files = [os.path.join(self.bulk_ledger_location, f) for f in os.listdir(self.bulk_ledger_location) if f.endswith(".xlsx")]
-        if not files:
-            raise FileNotFoundError(f"No Excel files found in folder {self.bulk_ledger_location}.")
-
-        pool = multiprocessing.Pool()
-        func = partial(self._process_file, client_code=ucc, start_date=start_date, end_date=end_date)
-        results = pool.map(func, files)
-        pool.close()
-        pool.join()
-
-        combined_rows = []
-        header_included = False
-        for res in results:
-            if res:
-                if not header_included:
-                    combined_rows.extend(res)
-                    header_included = True
-                else:
-                    combined_rows.extend(res[1:])  # Skip header in subsequent results
+        header, blocks = self.ledger_store.get_blocks(ucc)
+
+        data_rows = []
+        for block in blocks:
+            filtered = self._filter_block_by_date([header] + block, start_date, end_date)
+            data_rows.extend(filtered[1:])
 
-        if not combined_rows:
+        if not data_rows:
             self.logger.info(f"No ledger entries found for client code {ucc} in the provided date range.")
             return {}
-
-        header = combined_rows[0]
-        data_rows = combined_rows[1:]
         
         try:
             # First attempt: Use pandas instead of polars since it handles mixed types better
@@ -223,56 +415,6 @@ class KeynoteDataProcessor:
                 self.logger.error(f"Error creating DataFrame: {e2}")
                 return {}
 
-    def _process_file(self, file_path, client_code, start_date, end_date):
-        """
-        Process a single bulk ledger file. Searches for client ledger blocks matching the given client_code
-        and returns a list of rows (as lists) that fall within the date range.
-        
-        Expects:
-          - A header row in the second row.
-          - Ledger entries starting from the third row.
-        """
-        result_rows = []
-        try:
-            wb = openpyxl.load_workbook(file_path, data_only=True)
-        except Exception as e:
-            self.logger.error(f"Could not load {file_path}: {e}")
-            return result_rows
-
-        sheet = wb.active
-        data = list(sheet.iter_rows(values_only=True))
-        if len(data) < 2:
-            return result_rows
-
-        header = list(data[1])
-        in_target_client = False
-        ledger_block = [header]
-        for row in data[2:]:
-            if row[0] is not None:
-                if self._is_client_header(row):
-                    if in_target_client:
-                        filtered = self._filter_block_by_date(ledger_block, start_date, end_date)
-                        if filtered and len(filtered) > 1:
-                            result_rows.extend(filtered)
-                        in_target_client = False
-                        ledger_block = [header]
-                    if re.search(r'\[' + re.escape(client_code) + r'\]', str(row[0])):
-                        in_target_client = True
-                        ledger_block = [header]
-                        ledger_block.append(list(row))
-                    else:
-                        in_target_client = False
-                        ledger_block = [header]
-                    continue
-
-            if in_target_client:
-                ledger_block.append(list(row))
-        if in_target_client and ledger_block:
-            filtered = self._filter_block_by_date(ledger_block, start_date, end_date)
-            if filtered and len(filtered) > 1:
-                result_rows.extend(filtered)
-        return result_rows
-
     def _filter_block_by_date(self, ledger_block, start_date, end_date):
         """
         Given a ledger block (a list of rows with the first row as the header),
@@ -315,22 +457,6 @@ class KeynoteDataProcessor:
         except Exception:
             return None
 
-    def _is_client_header(self, row):
-        """
-        Determines if a row is a client header. A valid client header should have a non-empty
-        first cell that contains a code enclosed in square brackets (e.g. "Client Name [MN025]")
-        while all other cells are empty or whitespace.
-        """
-        if row[0] is None:
-            return False
-        text = str(row[0])
-        if '[' in text and ']' in text:
-            for cell in row[1:]:
-                if cell is not None and str(cell).strip() != "":
-                    return False
-            return True
-        return False
-
     def _parse_optional_date(self, date_str: str, default: date) -> date:
         """
         If date_str is provided, parses it using _validate_date_str.
@@ -365,191 +491,172 @@ class KeynoteDataProcessor:
         else:
             raise ValueError("Could not extract a date from the file name.")
 
-    def _extract_client_blocks(self, file_path: str) -> dict:
-        """
-        Reads the bulk holdings Excel file and groups rows into client blocks.
-        Each block (a list of rows with the header as the first row) is keyed by the client code.
-        """
-        wb = openpyxl.load_workbook(file_path, data_only=True)
-        sheet = wb.active
-        all_rows = list(sheet.iter_rows(values_only=True))
-
-        header = None
-        header_index = None
-        for i, row in enumerate(all_rows):
-            if any(cell is not None and str(cell).strip() != "" for cell in row):
-                header = list(row)
-                header_index = i
-                break
-        if header is None:
-            raise ValueError("No header row found in the bulk holdings file.")
-
-        client_blocks = {}
-        current_client_code = None
-        current_block = None
-
-        for row in all_rows[header_index+1:]:
-            if row[0] is not None and ('[' in str(row[0]) and ']' in str(row[0])):
-                if current_client_code and current_block:
-                    client_blocks[current_client_code] = current_block
-                match = re.search(r'\[(.*?)\]', str(row[0]))
-                if match:
-                    current_client_code = match.group(1).strip()
-                else:
-                    current_client_code = None
-                current_block = [header]
-                current_block.append(list(row))
-            else:
-                if current_block is not None:
-                    current_block.append(list(row))
-        if current_client_code and current_block:
-            client_blocks[current_client_code] = current_block
-
-        return client_blocks
-
-    def _process_and_upload_client_block(self, args):
+    def _iter_client_blocks(self, file_path: str) -> Iterator[Tuple[str, list]]:
         """
-        Processes a single client block from a bulk holdings file: selects and renames columns,
-        cleans the trading symbol and uploads the result (as an Excel file) to S3.
-
-        The S3 key follows the structure:
-          PLUS91_PMS/ledgers_and_holdings/keynote/single_accounts/{client_code}/holdings/{file_date}.xlsx
+        Streams the bulk holdings Excel file and yields (client_code, block) for each client,
+        where a block is a list of rows with the header as the first row. Only the block
+        being read is held in memory.
         """
-        client_code, block, file_date_str, bucket_name = args
-
-        desired_cols = ["Scrip", "ISIN", "Margin_x000D_\nQuantity", "Market_x000D_\nValue"]
-        rename_mapping = {
-            "Scrip": "trading_symbol",
-            "ISIN": "isin",
-            "Margin_x000D_\nQuantity": "quantity",
-            "Market_x000D_\nValue": "market_value"
-        }
+        return iter_holdings_blocks(iter_workbook_rows(file_path))
 
-        try:
-            df = pd.DataFrame(block[1:], columns=block[0])
-        except Exception as ex:
-            self.logger.error(f"Error creating DataFrame for client {client_code}: {ex}")
-            return
-
-        df.columns = [str(col).strip() for col in df.columns]
-        missing = [col for col in desired_cols if col not in df.columns]
-        if missing:
-            self.logger.warning(f"For client {client_code} the following columns are missing: {missing}. Skipping.")
-            return
-
-        df = df[desired_cols].copy()
-        df.rename(columns=rename_mapping, inplace=True)
-
-        def clean_symbol(symbol):
-            if pd.isna(symbol):
-                return symbol
-            cleaned = re.sub(r'\s+(MF|EQ|NO)$', '', str(symbol)).strip()
-            return cleaned
-
-        df["trading_symbol"] = df["trading_symbol"].apply(clean_symbol)
-        df = df[df["isin"].notna()]
-        df = df.groupby('trading_symbol', as_index=False).agg({
-            'isin': 'first',
-            'quantity': 'sum',
-            'market_value': 'sum'
-        })
-        
-        master_df = self.master_df[["isin", "trading_symbol"]]
-        df = df.merge(master_df, on="isin", how="left")
-        df['trading_symbol_y'] = df['trading_symbol_y'].fillna(df['isin'])
-
-        df = df.drop(columns=["trading_symbol_x"], errors="ignore")
-        df = df.rename(columns={"trading_symbol_y": "trading_symbol"})
-        df = df.drop_duplicates()
-
-        output_buffer = io.BytesIO()
-
-        if df.empty:
-            self.logger.warning(f"Empty DataFrame for client {client_code}. Uploading empty file with headers.")
-            empty_df = pd.DataFrame(columns=df.columns)
-            empty_df.to_excel(output_buffer, index=False)
-        else:
-            df.to_excel(output_buffer, index=False) 
-
-        output_buffer.seek(0)
-
-        s3_key = f"PLUS91_PMS/ledgers_and_holdings/keynote/single_accounts/{client_code}/holdings/{file_date_str}.xlsx"
-        try:
-            s3_client = boto3.client('s3')
-            s3_client.upload_fileobj(output_buffer, bucket_name, s3_key)
-            self.logger.info(f"Uploaded file for client {client_code} to s3://{bucket_name}/{s3_key}")
-        except Exception as e:
-            self.logger.error(f"Error uploading file for client {client_code} to S3: {e}")
-        output_buffer.close()
-
-    def process_bulk_holdings_to_s3(self, file_path: str, bucket_name: str = "plus91backoffice"):
+    def process_bulk_holdings_to_s3(
+            self,
+            file_path: str,
+            manifest: BulkHoldingsManifest = None
+        ) -> bool:
         """
         Processes a single bulk holdings Excel file by:
           1. Extracting the file date from its name (converted to yyyy-mm-dd).
-          2. Splitting the file into client blocks.
+          2. Streaming the file into client blocks.
           3. Processing each client block (selecting, renaming, cleaning columns)
-             and uploading each as an Excel file to S3 in the proper folder structure.
+             and uploading each as a snapshot to S3 in the proper folder structure.
              
-        Uses multiprocessing to process client blocks concurrently.
+        Client blocks are processed concurrently with multiprocessing, then uploaded with
+        at most settings.S3_UPLOAD_WORKERS threads to the configured storage backend, in
+        batches of BULK_HOLDINGS_BATCH_SIZE clients. With a manifest,
+        clients already uploaded from the same file contents are skipped and every upload
+        is recorded.
+
+        Returns:
+            bool: True if every client file was uploaded.
         """
+        file_name = os.path.basename(file_path)
+        sha1 = file_sha1(file_path)
+        uploaded = manifest.start(file_name, sha1) if manifest else {}
+
         file_date_str = self._extract_file_date(file_path)
         self.logger.info(f"Extracted file date: {file_date_str} from {file_path}")
 
-        client_blocks = self._extract_client_blocks(file_path)
-        if not client_blocks:
-            self.logger.info("No client blocks found in the bulk holdings file.")
-            return
-
-        args_list = []
-        for client_code, block in client_blocks.items():
-            args_list.append((client_code, block, file_date_str, bucket_name))
+        # Load the master data before forking so the workers share it.
+        self.master_df
+        storage = get_storage()
+        failed = 0
+        seen = set()
+        if uploaded:
+            self.logger.info(f"Resuming {file_name}: {len(uploaded)} client files already uploaded")
 
-        with multiprocessing.Pool() as pool:
-            pool.map(self._process_and_upload_client_block, args_list)
+        def upload(result: Tuple[str, str, bytes]) -> bool:
+            client_code, s3_key, file_bytes = result
+            try:
+                etag = storage.put(s3_key, file_bytes)
+            except Exception as e:
+                self.logger.error(f"Error uploading file for client {client_code} to {storage}: {e}")
+                return False
+            self.logger.info(f"Uploaded file for client {client_code} to {storage}/{s3_key}")
+            if manifest:
+                manifest.record_upload(file_name, client_code, s3_key, etag)
+            return True
 
-        self.logger.info("Processing of bulk holdings file complete.")
+        def pending_args() -> Iterator[Tuple[str, list, str]]:
+            # A client code that appears again replaces its earlier block, as it did when the
+            # blocks were collected in a dict. A repeated block is always uploaded, even when
+            # resuming, since the manifest may only have recorded the earlier one.
+            for client_code, block in self._iter_client_blocks(file_path):
+                if client_code in seen:
+                    self.logger.warning(f"Duplicate block for client {client_code} in {file_name}, keeping the last")
+                elif client_code in uploaded:
+                    seen.add(client_code)
+                    continue
+                seen.add(client_code)
+                yield client_code, block, file_date_str
+
+        # Blocks are read, built and uploaded BULK_HOLDINGS_BATCH_SIZE clients at a time, so
+        # memory is bounded by one batch rather than the whole workbook. Blocks that could
+        # not be processed are skipped deterministically; only failed uploads keep the file
+        # from being marked as processed. Batches are uploaded one after another and a batch
+        # keeps only the last block of each client, so a client's uploads follow file order.
+        args_iter = pending_args()
+        with multiprocessing.Pool() as pool, \
+                ThreadPoolExecutor(max_workers=max(1, settings.S3_UPLOAD_WORKERS)) as executor:
+            while True:
+                batch = list(islice(args_iter, BULK_HOLDINGS_BATCH_SIZE))
+                if not batch:
+                    break
+                batch = list({args[0]: args for args in batch}.values())
+                results = pool.map(_build_client_holdings, batch)
+                for ok in executor.map(upload, [r for r in results if r is not None]):
+                    failed += not ok
+                if manifest:
+                    manifest.save()
+
+        if manifest:
+            if failed:
+                manifest.save()
+            else:
+                manifest.finish(file_name)
+        self.logger.info(f"Processing of bulk holdings file complete, {failed} client files failed.")
+        return not failed
 
-    def process_all_bulk_holdings_to_s3(self, bucket_name: str = "plus91backoffice"):
+    def process_all_bulk_holdings_to_s3(self):
         """
         Scans the given folder for bulk holdings Excel files that match the naming format:
           Bulk Holdings_{dd-mm-yy}.xlsx
         For each matching file, processes it such that individual client holding files are uploaded to S3
         under the folder structure:
           PLUS91_PMS/ledgers_and_holdings/keynote/single_accounts/{client_code}/holdings/{yyyy-mm-dd}.xlsx
+
+        Files whose contents were already fully processed, according to the bulk holdings
+        manifest, are skipped.
         """
         file_pattern = r'^Bulk Holdings_\d{2}-\d{2}-\d{2}\.xlsx$'
         files = [f for f in os.listdir(self.bulk_holdings_location) if re.match(file_pattern, f)]
         if not files:
             self.logger.info(f"No bulk holdings files found in folder {self.bulk_holdings_location} matching the required naming format.")
             return
-        
-        for filename in files:
+
+        manifest = BulkHoldingsManifest(self.bulk_holdings_manifest_path)
+        skipped = 0
+        for filename in sorted(files):
             full_path = os.path.join(self.bulk_holdings_location, filename)
-            self.logger.info(f"Processing bulk holdings file: {full_path}")
             try:
-                self.process_bulk_holdings_to_s3(full_path, bucket_name)
+                if manifest.is_processed(filename, file_sha1(full_path)):
+                    skipped += 1
+                    continue
+                self.logger.info(f"Processing bulk holdings file: {full_path}")
+                self.process_bulk_holdings_to_s3(full_path, manifest)
             except Exception as e:
                 self.logger.error(f"Error processing file {full_path}: {e}")
+                manifest.save()
+        self.logger.info(f"Bulk holdings: {len(files) - skipped} file(s) processed, {skipped} unchanged")
 
 
 class ZerodhaDataFetcher:
-    def __init__(self, bucket_name="plus91backoffice", 
+    def __init__(self, storage: Storage = None,
                  base_prefix="PLUS91_PMS/ledgers_and_holdings/zerodha/single_accounts/"):
-        """Set up the S3 connection with your bucket and base prefix."""
-        self.s3 = boto3.client('s3')
-        self.bucket_name = bucket_name
+        """Set the storage and base prefix; the default storage backend is resolved on first use."""
+        self._storage = storage
         self.base_prefix = base_prefix.rstrip('/') + '/'
 
+    @property
+    def storage(self) -> Storage:
+        if self._storage is None:
+            self._storage = get_storage()
+        return self._storage
+
     def _get_s3_file_bytes(self, key):
-        """Fetch an XLSX file from S3 and return its raw bytes."""
+        """
+        Fetch a file from storage and return its contents (bytes, or a read-only mmap for
+        large files).
+        """
         full_key = self.base_prefix + key
         try:
-            obj = self.s3.get_object(Bucket=self.bucket_name, Key=full_key)
-            return obj['Body'].read()
+            return self.storage.get(full_key, etag=s3_listing_index.etag(full_key))
         except Exception as e:
             logger.warning(f"Couldn’t grab {full_key}: {e}")
             return None
 
+    def get_ledger_version(self, broker_code: str) -> str:
+        """Return the ETag of a broker_code's ledger file in storage, or None if it cannot be read."""
+        full_key = self.base_prefix + f"{broker_code}/ledger/ledger-{broker_code}.xlsx"
+        if s3_listing_index.loaded:
+            return s3_listing_index.etag(full_key)
+        try:
+            info = self.storage.head(full_key)
+            return info.etag if info else None
+        except Exception as e:
+            logger.warning(f"Couldn’t stat {full_key}: {e}")
+            return None
+
     def get_ledger(
             self, 
             broker_code: str, 
@@ -565,9 +672,9 @@ class ZerodhaDataFetcher:
             return None
         
         if not as_dataframe:
-            return file_bytes
+            return bytes(file_bytes)
         
-        df = pd.read_excel(io.BytesIO(file_bytes), header=None)
+        df = decode_snapshot(file_bytes, key, header=None)
         new_column_names = {
                 0: 'Index',
                 1: 'Particulars',
@@ -600,29 +707,17 @@ class ZerodhaDataFetcher:
         Returns raw bytes if as_dataframe=False, or a list of pandas DataFrames if True.
         """
         target_year_month = f"{year}-{month:02d}"
-        prefix = f"{broker_code}/holdings/"
-        
-        response = self.s3.list_objects_v2(Bucket=self.bucket_name, 
-                                          Prefix=self.base_prefix + prefix)
-        if 'Contents' not in response:
-            logger.warning(f"No holdings files found for {broker_code} under {self.base_prefix + prefix}!")
+        snapshots = s3_listing_index.holdings("zerodha", broker_code)
+        if not snapshots:
+            logger.warning(f"No holdings files found for {broker_code} under {self.base_prefix}{broker_code}/holdings/!")
             return None
 
-        holdings_files = []
-        for obj in response['Contents']:
-            try:
-                file_date_str = obj['Key'].split('/')[-1].replace('.xlsx', '')
-                file_date = datetime.strptime(file_date_str, "%Y-%m-%d")
-                if file_date.strftime("%Y-%m") == target_year_month:
-                    holdings_files.append((obj['Key'].replace(self.base_prefix, ''), file_date))
-            except ValueError:
-                logger.info(f"Skipping odd file name: {obj['Key']}")
-
-        if not holdings_files:
+        latest = latest_snapshot((key for _, key, _ in snapshots), f"{target_year_month}-")
+        if latest is None:
             logger.warning(f"No holdings files for {target_year_month} under {broker_code}!")
             return None
 
-        latest_file = max(holdings_files, key=lambda x: x[1])
+        latest_file = (latest[0].replace(self.base_prefix, ''), datetime.strptime(latest[1], "%Y-%m-%d"))
 
         snapshot_date = ""
         match = re.search(r'(\d{4}-\d{2}-\d{2})', latest_file[0])
@@ -637,9 +732,9 @@ class ZerodhaDataFetcher:
             return None
         
         if not as_dataframe:
-            return file_bytes
+            return bytes(file_bytes)
 
-        df = pd.read_excel(io.BytesIO(file_bytes), header=None)
+        df = decode_snapshot(file_bytes, latest_file[0], header=None)
         new_column_names = {
             1: 'Symbol',
             2: 'ISIN',
@@ -659,6 +754,18 @@ class ZerodhaDataFetcher:
         return df.to_dict(), snapshot_date
 
 
+@lru_cache(maxsize=None)
+def get_keynote_data_processor() -> KeynoteDataProcessor:
+    """The process-wide KeynoteDataProcessor, created on first use."""
+    return KeynoteDataProcessor()
+
+
+@lru_cache(maxsize=None)
+def get_zerodha_data_fetcher() -> ZerodhaDataFetcher:
+    """The process-wide ZerodhaDataFetcher, created on first use."""
+    return ZerodhaDataFetcher()
+
+
 if __name__ == "__main__":
     try:
         print("Starting portfolio data processing...")
@@ -0,0 +1,92 @@
+import os
+import threading
+import pandas as pd
+from app.logger import logger
+from typing import Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+CASHFLOW_DATA_LOCATION = "/home/admin/Plus91Backoffice/Plus91_Backend/data/cashflow_data"
+FEES_PATH = f"{CASHFLOW_DATA_LOCATION}/plus91_fees.xlsx"
+BUYBACKS_PATH = f"{CASHFLOW_DATA_LOCATION}/plus91_buybacks.xlsx"
+SHARE_TRANSFERS_PATH = f"{CASHFLOW_DATA_LOCATION}/plus91_share_transfers.xlsx"
+CASHFLOW_EXCEPTIONS_PATH = f"{CASHFLOW_DATA_LOCATION}/plus91_cashflow_exceptions.xlsx"
+RECO_EXCEPTIONS_PATH = f"{CASHFLOW_DATA_LOCATION}/plus91_reco_exceptions.xlsx"
+
+
+class ReferenceTable:
+    """
+    One loaded reference workbook sheet with its rows pre-grouped by one or more columns.
+
+    `rows(column, key)` returns the rows whose `column` equals `key`, in file order and with
+    their original index, like filtering the frame with `frame[frame[column] == key]`.
+    The result is a copy, so callers may modify it.
+    """
+
+    def __init__(self, frame: pd.DataFrame, group_by: Sequence[str] = ()):
+        self.frame = frame
+        self.groups: Dict[str, Dict[Hashable, pd.DataFrame]] = {
+            column: dict(tuple(frame.groupby(column, sort=False))) if column in frame.columns else {}
+            for column in group_by
+        }
+
+    @property
+    def empty(self) -> bool:
+        return self.frame.empty
+
+    def rows(self, column: str, key: Hashable) -> pd.DataFrame:
+        group = self.groups[column].get(key)
+        if group is None:
+            return self.frame.iloc[0:0].copy()
+        return group.copy()
+
+
+class ReferenceDataRegistry:
+    """
+    Process-wide cache of the reference workbooks (fees, buybacks, share transfers,
+    cashflow and reco exceptions).
+
+    Each workbook sheet is read once and kept with the file's mtime and size; a later
+    lookup re-reads it only if the file changed on disk. Rows are grouped by the
+    requested columns when loaded, so per-account lookups are dict hits instead of
+    full-frame filters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple, Tuple[Tuple[int, int], ReferenceTable]] = {}
+
+    def get(
+            self,
+            path: str,
+            sheet_name=0,
+            group_by: Sequence[str] = (),
+            prepare: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None
+        ) -> ReferenceTable:
+        """
+        Returns the table for a workbook sheet, loading it if it is not cached or the file
+        changed. `prepare` is applied to the frame once per load, before grouping.
+
+        Raises:
+            FileNotFoundError: If the workbook does not exist.
+        """
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        key = (path, sheet_name, tuple(group_by), prepare)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and cached[0] == signature:
+                return cached[1]
+
+            frame = pd.read_excel(path, sheet_name=sheet_name)
+            if prepare is not None:
+                frame = prepare(frame)
+            table = ReferenceTable(frame, group_by)
+            self._entries[key] = (signature, table)
+            logger.debug(f"Loaded {len(frame)} reference rows from {path}")
+            return table
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+reference_data = ReferenceDataRegistry()
@@ -0,0 +1,16 @@
+import boto3
+from botocore.config import Config
+from functools import lru_cache
+
+S3_MAX_POOL_CONNECTIONS = 32
+
+
+@lru_cache(maxsize=None)
+def get_s3_client():
+    """
+    The process-wide S3 client, created on first use.
+
+    boto3 clients are thread-safe, so one client (with a connection pool large enough for
+    the upload thread pools) is shared instead of creating a client per call.
+    """
+    return boto3.client('s3', config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS))
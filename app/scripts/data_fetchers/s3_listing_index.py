@@ -0,0 +1,81 @@
+import threading
+from app.scripts.data_fetchers.storage import ObjectInfo, get_storage
+from app.scripts.data_fetchers.snapshot_format import snapshot_file_date
+from app.logger import logger
+from typing import Dict, List, Optional, Tuple
+
+LEDGERS_AND_HOLDINGS_PREFIX = "PLUS91_PMS/ledgers_and_holdings/"
+
+# (yyyy-mm-dd, key, etag)
+SnapshotObject = Tuple[str, str, str]
+
+
+def _snapshot_objects(objects: List[ObjectInfo]) -> List[SnapshotObject]:
+    """The dated snapshots among listed objects, sorted by date."""
+    snapshots = []
+    for obj in objects:
+        date_str = snapshot_file_date(obj.key)
+        if date_str:
+            snapshots.append((date_str, obj.key, obj.etag))
+    return sorted(snapshots)
+
+
+class S3ListingIndex:
+    """
+    Run-scoped index of the objects under PLUS91_PMS/ledgers_and_holdings/.
+
+    `load()` lists the whole tree once from the storage backend and groups the keys of
+    `{broker}/single_accounts/{broker_code}/holdings/` by (broker, broker_code), so the
+    processors look up an account's holdings dates and ETags in memory instead of issuing
+    one LIST request per account and month. It should be loaded again at the start of
+    every run (after the bulk holdings upload), since objects written later are not seen.
+
+    Until it is loaded, lookups fall back to listing the account's own prefix,
+    so code paths that run outside db_runner (e.g. the API) keep working unchanged.
+    """
+
+    def __init__(self, prefix: str = LEDGERS_AND_HOLDINGS_PREFIX):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._holdings: Optional[Dict[Tuple[str, str], List[SnapshotObject]]] = None
+        self._etags: Dict[str, str] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self._holdings is not None
+
+    def load(self):
+        """List the whole tree and rebuild the index."""
+        objects = get_storage().list(self.prefix)
+
+        grouped: Dict[Tuple[str, str], List[ObjectInfo]] = {}
+        for obj in objects:
+            parts = obj.key[len(self.prefix):].split('/')
+            if len(parts) == 5 and parts[1] == 'single_accounts' and parts[3] == 'holdings':
+                grouped.setdefault((parts[0], parts[2]), []).append(obj)
+
+        with self._lock:
+            self._holdings = {account: _snapshot_objects(objs) for account, objs in grouped.items()}
+            self._etags = {obj.key: obj.etag for obj in objects}
+        logger.info(f"Indexed {len(objects)} objects for {len(grouped)} accounts under {self.prefix}")
+
+    def clear(self):
+        with self._lock:
+            self._holdings = None
+            self._etags = {}
+
+    def holdings(self, broker: str, broker_code: str) -> List[SnapshotObject]:
+        """The dated holdings snapshots of an account as (date, key, etag), sorted by date."""
+        with self._lock:
+            if self._holdings is not None:
+                return list(self._holdings.get((broker, broker_code), []))
+        prefix = f"{self.prefix}{broker}/single_accounts/{broker_code}/holdings/"
+        return _snapshot_objects(get_storage().list(prefix))
+
+    def etag(self, key: str) -> Optional[str]:
+        """The ETag of an indexed object, or None if the index is not loaded or has no such key."""
+        with self._lock:
+            return self._etags.get(key)
+
+
+s3_listing_index = S3ListingIndex()
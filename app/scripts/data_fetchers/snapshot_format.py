@@ -0,0 +1,98 @@
+import io
+import re
+import mmap
+import pandas as pd
+import polars as pl
+from typing import Iterable, Optional, Tuple, Union
+
+# File extension of each snapshot format, in order of preference when a date has several.
+SNAPSHOT_EXTENSIONS = {
+    "parquet": ".parquet",
+    "csv": ".csv.gz",
+    "xlsx": ".xlsx",
+}
+SNAPSHOT_DATE_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})$')
+
+
+def snapshot_format(key: str) -> Optional[str]:
+    """The format of a snapshot object from its key's extension, or None if it is not a snapshot."""
+    for fmt, extension in SNAPSHOT_EXTENSIONS.items():
+        if key.endswith(extension):
+            return fmt
+    return None
+
+
+def snapshot_file_date(key: str) -> Optional[str]:
+    """The yyyy-mm-dd date a snapshot key is named after (`.../2025-03-31.parquet`), or None."""
+    fmt = snapshot_format(key)
+    if fmt is None:
+        return None
+    stem = key.split('/')[-1][:-len(SNAPSHOT_EXTENSIONS[fmt])]
+    match = SNAPSHOT_DATE_PATTERN.match(stem)
+    return match.group(1) if match else None
+
+
+def snapshot_key(prefix: str, date_str: str, fmt: str) -> str:
+    """The key of a dated snapshot under a prefix, e.g. `{prefix}2025-03-31.parquet`."""
+    return f"{prefix}{date_str}{SNAPSHOT_EXTENSIONS[fmt]}"
+
+
+def latest_snapshot(keys: Iterable[str], date_prefix: str = "") -> Optional[Tuple[str, str]]:
+    """
+    The (key, date) of the latest dated snapshot among keys whose date starts with
+    date_prefix (e.g. "2025-03-"). When a date exists in several formats, the columnar one
+    is used, so legacy xlsx files can stay next to migrated ones.
+    """
+    preference = {fmt: rank for rank, fmt in enumerate(SNAPSHOT_EXTENSIONS)}
+    best = None
+    for key in keys:
+        date_str = snapshot_file_date(key)
+        if date_str is None or not date_str.startswith(date_prefix):
+            continue
+        rank = (date_str, -preference[snapshot_format(key)])
+        if best is None or rank > best[0]:
+            best = (rank, key, date_str)
+    return (best[1], best[2]) if best else None
+
+
+def encode_snapshot(df: pd.DataFrame, fmt: str) -> bytes:
+    """
+    Serializes a snapshot DataFrame (without its index) as xlsx, Parquet or gzipped CSV.
+
+    Parquet is written with polars, which is already a dependency, so pyarrow is not
+    needed. Column labels are stored as strings and integer labels are restored on read.
+    """
+    buffer = io.BytesIO()
+    if fmt == "xlsx":
+        df.to_excel(buffer, index=False)
+    elif fmt == "parquet":
+        pl.DataFrame(
+            {str(column): df[column].tolist() for column in df.columns}, strict=False
+        ).write_parquet(buffer)
+    elif fmt == "csv":
+        df.to_csv(buffer, index=False, compression="gzip")
+    else:
+        raise ValueError(f"Unknown snapshot format: {fmt}")
+    return buffer.getvalue()
+
+
+def decode_snapshot(data: Union[bytes, mmap.mmap], key: str, **excel_kwargs) -> pd.DataFrame:
+    """
+    Reads a snapshot in whichever format its key names, from bytes or a memory-mapped
+    file. `excel_kwargs` (e.g. header=None for raw broker exports) only apply to legacy
+    xlsx files.
+    """
+    fmt = snapshot_format(key)
+    if isinstance(data, mmap.mmap):
+        data.seek(0)
+        source = data
+    else:
+        source = io.BytesIO(data)
+    if fmt == "xlsx" or fmt is None:
+        return pd.read_excel(source, **excel_kwargs)
+    if fmt == "parquet":
+        df = pd.DataFrame(pl.read_parquet(source).to_dict(as_series=False))
+    else:
+        df = pd.read_csv(source, compression="gzip")
+    df.columns = [int(column) if str(column).isdigit() else column for column in df.columns]
+    return df
@@ -0,0 +1,248 @@
+import os
+import json
+import mmap
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from functools import lru_cache
+from app.config import settings
+from typing import BinaryIO, Dict, List, Optional, Union
+
+# Cached or local files at least this large are returned memory-mapped instead of read into memory.
+MMAP_THRESHOLD_BYTES = 8 * 1024 * 1024
+
+
+class ObjectNotFound(Exception):
+    """Raised when a key does not exist in the storage backend."""
+
+
+@dataclass
+class ObjectInfo:
+    key: str
+    etag: str
+    size: int
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+
+def read_file(path: str) -> Union[bytes, mmap.mmap]:
+    """A file's contents, memory-mapped if it is at least MMAP_THRESHOLD_BYTES."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD_BYTES:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return f.read()
+
+
+class Storage(ABC):
+    """
+    Object storage used by the pipeline and the report service for holdings, ledgers and
+    reports. Keys are S3-style paths such as
+    `PLUS91_PMS/ledgers_and_holdings/zerodha/single_accounts/{code}/holdings/2025-03-31.xlsx`.
+
+    ETags are opaque version strings: they change whenever an object's contents change
+    and are only meant to be compared with ETags from the same backend.
+    """
+
+    @abstractmethod
+    def get(self, key: str, etag: str = None) -> Union[bytes, mmap.mmap]:
+        """
+        The object's contents, as bytes or a read-only mmap for large objects. `etag`, if
+        known, lets a backend serve a cached copy without revalidating it.
+
+        Raises:
+            ObjectNotFound: If the key does not exist.
+        """
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """
+        A streaming, read-only file object over the object's contents.
+
+        Raises:
+            ObjectNotFound: If the key does not exist.
+        """
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str = None, metadata: Dict[str, str] = None) -> str:
+        """Store an object and return its ETag."""
+
+    @abstractmethod
+    def head(self, key: str) -> Optional[ObjectInfo]:
+        """The object's ETag, size and metadata, or None if it does not exist."""
+
+    @abstractmethod
+    def list(self, prefix: str) -> List[ObjectInfo]:
+        """Every object whose key starts with prefix, in key order. Metadata is not filled in."""
+
+    def log_stats(self):
+        """Log the backend's cache statistics, if it has any."""
+
+
+class S3Storage(Storage):
+    """
+    Storage on an S3 bucket. Reads go through the local S3ObjectCache, so unchanged
+    objects are served from disk; listings are paginated.
+    """
+
+    def __init__(self, bucket_name: str):
+        from app.scripts.data_fetchers.s3_client import get_s3_client
+        from app.scripts.data_fetchers.object_cache import get_object_cache
+
+        self.bucket_name = bucket_name
+        self.s3 = get_s3_client()
+        self.cache = get_object_cache()
+
+    def __repr__(self):
+        return f"S3Storage(s3://{self.bucket_name})"
+
+    def log_stats(self):
+        self.cache.log_stats()
+
+    @staticmethod
+    def _is_missing(error) -> bool:
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def get(self, key: str, etag: str = None) -> Union[bytes, mmap.mmap]:
+        from botocore.exceptions import ClientError
+        try:
+            return self.cache.get(self.bucket_name, key, etag=etag)
+        except ClientError as e:
+            if self._is_missing(e):
+                raise ObjectNotFound(key) from e
+            raise
+
+    def open(self, key: str) -> BinaryIO:
+        from botocore.exceptions import ClientError
+        try:
+            return self.s3.get_object(Bucket=self.bucket_name, Key=key)['Body']
+        except ClientError as e:
+            if self._is_missing(e):
+                raise ObjectNotFound(key) from e
+            raise
+
+    def put(self, key: str, data: bytes, content_type: str = None, metadata: Dict[str, str] = None) -> str:
+        request = {'Body': data, 'Bucket': self.bucket_name, 'Key': key}
+        if content_type:
+            request['ContentType'] = content_type
+        if metadata:
+            request['Metadata'] = metadata
+        return self.s3.put_object(**request).get('ETag')
+
+    def head(self, key: str) -> Optional[ObjectInfo]:
+        from botocore.exceptions import ClientError
+        try:
+            response = self.s3.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if self._is_missing(e):
+                return None
+            raise
+        return ObjectInfo(key, response.get('ETag'), response.get('ContentLength'), response.get('Metadata', {}))
+
+    def list(self, prefix: str) -> List[ObjectInfo]:
+        objects = []
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                objects.append(ObjectInfo(obj['Key'], obj.get('ETag'), obj.get('Size')))
+        return objects
+
+
+class LocalStorage(Storage):
+    """
+    Storage on a local directory tree laid out like the bucket, for offline runs and
+    benchmarks. Object metadata is kept in JSON sidecar files under `.metadata/`.
+
+    ETags are derived from each file's mtime and size rather than its contents, so
+    listing a large tree does not read every file.
+    """
+
+    METADATA_DIR = ".metadata"
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def __repr__(self):
+        return f"LocalStorage({self.root})"
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Key {key} is outside the storage root")
+        return path
+
+    def _metadata_path(self, key: str) -> str:
+        return self._path(f"{self.METADATA_DIR}/{key}.json")
+
+    @staticmethod
+    def _etag(stat: os.stat_result) -> str:
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    def get(self, key: str, etag: str = None) -> Union[bytes, mmap.mmap]:
+        try:
+            return read_file(self._path(key))
+        except FileNotFoundError as e:
+            raise ObjectNotFound(key) from e
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return open(self._path(key), 'rb')
+        except FileNotFoundError as e:
+            raise ObjectNotFound(key) from e
+
+    def put(self, key: str, data: bytes, content_type: str = None, metadata: Dict[str, str] = None) -> str:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        metadata_path = self._metadata_path(key)
+        if metadata:
+            os.makedirs(os.path.dirname(metadata_path), exist_ok=True)
+            with open(metadata_path, 'w') as f:
+                json.dump(metadata, f)
+        elif os.path.exists(metadata_path):
+            os.remove(metadata_path)
+        return self._etag(os.stat(path))
+
+    def head(self, key: str) -> Optional[ObjectInfo]:
+        try:
+            stat = os.stat(self._path(key))
+        except FileNotFoundError:
+            return None
+        metadata = {}
+        metadata_path = self._metadata_path(key)
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+        return ObjectInfo(key, self._etag(stat), stat.st_size, metadata)
+
+    def list(self, prefix: str) -> List[ObjectInfo]:
+        # Walk only the deepest directory the prefix fully names.
+        start = os.path.normpath(os.path.join(self.root, os.path.dirname(prefix)))
+        objects = []
+        for directory, subdirs, names in os.walk(start):
+            if directory == self.root:
+                subdirs[:] = [d for d in subdirs if d != self.METADATA_DIR]
+            for name in names:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(directory, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                if key.startswith(prefix):
+                    stat = os.stat(path)
+                    objects.append(ObjectInfo(key, self._etag(stat), stat.st_size))
+        return sorted(objects, key=lambda obj: obj.key)
+
+
+@lru_cache(maxsize=None)
+def get_storage() -> Storage:
+    """
+    The process-wide storage backend, chosen by settings.STORAGE_BACKEND: "s3" for the
+    settings.S3_BUCKET_NAME bucket, or "local" for the settings.LOCAL_STORAGE_ROOT tree.
+    """
+    backend = settings.STORAGE_BACKEND.lower()
+    if backend == "s3":
+        return S3Storage(settings.S3_BUCKET_NAME)
+    if backend == "local":
+        return LocalStorage(settings.LOCAL_STORAGE_ROOT)
+    raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
@@ -0,0 +1,106 @@
+import re
+import openpyxl
+from typing import Iterator, List, Tuple
+
+CLIENT_CODE_PATTERN = re.compile(r'\[(.*?)\]')
+
+
+def iter_workbook_rows(file_path: str) -> Iterator[tuple]:
+    """
+    Yields the rows of a workbook's active sheet as tuples of cell values, one row at a
+    time, using openpyxl in read-only mode so the whole sheet is never loaded.
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def _is_blank(row: tuple) -> bool:
+    return all(cell is None or str(cell).strip() == "" for cell in row)
+
+
+def iter_holdings_blocks(rows: Iterator[tuple]) -> Iterator[Tuple[str, List[list]]]:
+    """
+    Splits the rows of a bulk holdings workbook into client blocks as they are read.
+
+    The first non-empty row is the header. A row whose first cell contains a client code
+    in square brackets starts a new block; each block is yielded as (client_code, rows)
+    with the header as its first row once the next block starts, so only one block is
+    held in memory at a time.
+
+    Raises:
+        ValueError: If the workbook has no header row.
+    """
+    rows = iter(rows)
+    header = None
+    for row in rows:
+        if not _is_blank(row):
+            header = list(row)
+            break
+    if header is None:
+        raise ValueError("No header row found in the bulk holdings file.")
+
+    current_client_code = None
+    current_block = None
+    for row in rows:
+        if row[0] is not None and ('[' in str(row[0]) and ']' in str(row[0])):
+            if current_client_code and current_block:
+                yield current_client_code, current_block
+            match = CLIENT_CODE_PATTERN.search(str(row[0]))
+            current_client_code = match.group(1).strip() if match else None
+            current_block = [header, list(row)]
+        elif current_block is not None:
+            current_block.append(list(row))
+    if current_client_code and current_block:
+        yield current_client_code, current_block
+
+
+def is_ledger_client_header(row: tuple) -> bool:
+    """
+    A client header has a code enclosed in square brackets in its first cell
+    (e.g. "Client Name [MN025]") while all other cells are empty or whitespace.
+    """
+    text = str(row[0])
+    if '[' in text and ']' in text:
+        for cell in row[1:]:
+            if cell is not None and str(cell).strip() != "":
+                return False
+        return True
+    return False
+
+
+def iter_ledger_blocks(rows: Iterator[tuple]) -> Tuple[list, Iterator[Tuple[List[str], List[list]]]]:
+    """
+    Splits the rows of a bulk ledger workbook into client blocks as they are read.
+
+    Expects a title row, the header row second and ledger entries from the third row on.
+    Returns the header and a generator of (client_codes, rows) per block, where the block
+    starts with its client header row and client_codes lists every code in square
+    brackets on that row. A workbook with fewer than two rows has no blocks, and its
+    first row (if any) is returned as the header.
+    """
+    rows = iter(rows)
+    first_row = next(rows, None)
+    header_row = next(rows, None)
+    if header_row is None:
+        return (list(first_row) if first_row is not None else []), iter(())
+
+    def blocks():
+        current_codes = None
+        current_block = None
+        for row in rows:
+            if row[0] is not None and is_ledger_client_header(row):
+                if current_block is not None:
+                    yield current_codes, current_block
+                current_codes = re.findall(r'\[([^\]]*)\]', str(row[0]))
+                current_block = [list(row)]
+            elif current_block is not None:
+                current_block.append(list(row))
+        if current_block is not None:
+            yield current_codes, current_block
+
+    return list(header_row), blocks()
+
@@ -1,20 +1,20 @@
-import re
 import sys
-import boto3
 import asyncio
 import logging
 import pandas as pd
 from datetime import datetime
-from sqlalchemy import select, func, delete
+from sqlalchemy import select, func, delete, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.accounts.account_actual_portfolio import AccountActualPortfolio
 from app.scripts.data_fetchers.data_transformer import (
     KeynoteDataTransformer, ZerodhaDataTransformer
 )
+from app.scripts.data_fetchers.s3_listing_index import s3_listing_index
 from app.scripts.db_processors.helper_functions import (
     _generate_historical_month_ends, _get_existing_snapshot_dates
 )
-from typing import List, Dict
+from app.scripts.db_processors.bulk_writer import replace_rows
+from typing import List, Dict, Tuple
 from app.models.accounts.account_actual_portfolio_exceptions import AccountActualPortfolioException
 from app.logger import logger
 
@@ -26,8 +26,6 @@ class ActualPortfolioProcessor:
             zerodha_transformer: ZerodhaDataTransformer
     ):
         self.db = db
-        self.s3 = boto3.client('s3')
-        self.bucket_name = 'plus91backoffice'
         self.keynote_transformer = keynote_transformer
         self.zerodha_transformer = zerodha_transformer
 
@@ -110,24 +108,13 @@ class ActualPortfolioProcessor:
             prefix = f"PLUS91_PMS/ledgers_and_holdings/{broker_name}/single_accounts/{broker_code}/holdings/"
             debug_logger.info(f"Looking in S3 path: {prefix}")
             
-            response = self.s3.list_objects_v2(Bucket=self.bucket_name, Prefix=prefix)
-            if 'Contents' not in response:
+            snapshots = s3_listing_index.holdings(broker_name, broker_code)
+            if not snapshots:
                 debug_logger.warning(f"No holdings files found in S3 for {broker_code}")
                 return
 
             # Get all S3 dates
-            s3_dates = []
-            for obj in response['Contents']:
-                filename = obj['Key'].split('/')[-1]
-                if filename.endswith('.xlsx'):
-                    match = re.search(r'(\d{4}-\d{2}-\d{2})', filename)
-                    if match:
-                        date_str = match.group(1)
-                        s3_dates.append(datetime.strptime(date_str, '%Y-%m-%d').date())
-
-            if not s3_dates:
-                debug_logger.warning(f"No valid dates found in S3 holdings for {broker_code}")
-                return
+            s3_dates = [datetime.strptime(date_str, '%Y-%m-%d').date() for date_str, _, _ in snapshots]
 
             debug_logger.info(f"\nAll S3 dates found: {sorted(s3_dates)}")
             
@@ -166,16 +153,6 @@ class ActualPortfolioProcessor:
             for date in missing_historical_dates:
                 debug_logger.info(f"\nProcessing date: {date}")
                 
-                # Delete existing data for this specific date first
-                await self.db.execute(
-                    delete(AccountActualPortfolio)
-                    .where(AccountActualPortfolio.owner_id == account_id)
-                    .where(AccountActualPortfolio.owner_type == 'single')
-                    .where(AccountActualPortfolio.snapshot_date == date)
-                )
-                await self.db.commit()
-                debug_logger.info(f"Deleted existing portfolio entries for date: {date}")
-
                 portfolio_dict, snapshot_date_str = await asyncio.wait_for(
                     self.keynote_transformer.transform_holdings_to_actual_portfolio(
                         broker_code=broker_code,
@@ -194,8 +171,7 @@ class ActualPortfolioProcessor:
                         'quantity': 0,
                         'market_value': 0
                     }
-                    self.db.add(AccountActualPortfolio(**null_portfolio))
-                    await self.db.commit()
+                    await self._replace_snapshot(account_id, 'single', date, [null_portfolio])
                     continue
 
                 exceptions = await self._fetch_exceptions(account_id, 'single')
@@ -209,10 +185,8 @@ class ActualPortfolioProcessor:
                     'market_value': portfolio_dict['market_value']
                 }, exceptions)
 
-                for record in adjusted_portfolio:
-                    self.db.add(AccountActualPortfolio(**record))
+                await self._replace_snapshot(account_id, 'single', date, adjusted_portfolio)
                 debug_logger.info(f"Added adjusted portfolio records: {adjusted_portfolio}")
-                await self.db.commit()
                 debug_logger.info(f"Inserted adjusted portfolio records for account: {account_id}, date: {date}")
                 logger.info(f"Inserted adjusted portfolio records for {account_id} on {date}")
         except asyncio.TimeoutError:
@@ -238,23 +212,12 @@ class ActualPortfolioProcessor:
             prefix = f"PLUS91_PMS/ledgers_and_holdings/{broker_name}/single_accounts/{broker_code}/holdings/"
             logger.info(f"Looking in S3 path: {prefix}")
             
-            response = self.s3.list_objects_v2(Bucket=self.bucket_name, Prefix=prefix)
-            if 'Contents' not in response:
+            snapshots = s3_listing_index.holdings(broker_name, broker_code)
+            if not snapshots:
                 logger.warning(f"No holdings files found in S3 for {broker_code}")
                 return
 
-            s3_dates = []
-            for obj in response['Contents']:
-                filename = obj['Key'].split('/')[-1]
-                if filename.endswith('.xlsx'):
-                    match = re.search(r'(\d{4}-\d{2}-\d{2})', filename)
-                    if match:
-                        date_str = match.group(1)
-                        s3_dates.append(datetime.strptime(date_str, '%Y-%m-%d').date())
-
-            if not s3_dates:
-                logger.warning(f"No valid dates found in S3 holdings for {broker_code}")
-                return
+            s3_dates = [datetime.strptime(date_str, '%Y-%m-%d').date() for date_str, _, _ in snapshots]
 
             logger.info(f"All S3 dates found: {sorted(s3_dates)}")
             
@@ -303,16 +266,6 @@ class ActualPortfolioProcessor:
             for date in missing_historical_dates:
                 logger.info(f"Processing date: {date}")
                 
-                # Delete existing data for this specific date first
-                await self.db.execute(
-                    delete(AccountActualPortfolio)
-                    .where(AccountActualPortfolio.owner_id == account_id)
-                    .where(AccountActualPortfolio.owner_type == 'single')
-                    .where(AccountActualPortfolio.snapshot_date == date)
-                )
-                await self.db.commit()
-                logger.info(f"Deleted existing portfolio entries for date: {date}")
-
                 portfolio_dict, snapshot_date_str = await asyncio.wait_for(
                     self.zerodha_transformer.transform_holdings_to_actual_portfolio(
                         broker_code=broker_code,
@@ -333,8 +286,7 @@ class ActualPortfolioProcessor:
                         'quantity': 0,
                         'market_value': 0
                     }
-                    self.db.add(AccountActualPortfolio(**null_portfolio))
-                    await self.db.commit()
+                    await self._replace_snapshot(account_id, 'single', date, [null_portfolio])
                     continue
 
                 exceptions = await self._fetch_exceptions(account_id, 'single')
@@ -349,9 +301,7 @@ class ActualPortfolioProcessor:
                     'market_value': portfolio_dict['market_value']
                 }, exceptions)
 
-                for record in adjusted_portfolio:
-                    self.db.add(AccountActualPortfolio(**record))
-                await self.db.commit()
+                await self._replace_snapshot(account_id, 'single', date, adjusted_portfolio)
                 logger.info(f"Successfully inserted {len(adjusted_portfolio)} holdings for {date}")
                 
         except asyncio.TimeoutError:
@@ -396,15 +346,12 @@ class ActualPortfolioProcessor:
                         portfolio_by_date[date] = []
                     portfolio_by_date[date].append(p)
 
-                # Delete existing portfolio records for the joint account
-                await self.db.execute(
-                    delete(AccountActualPortfolio)
-                    .where(AccountActualPortfolio.owner_id == joint_id)
-                    .where(AccountActualPortfolio.owner_type == "joint")
-                )
-                await self.db.commit()
+                # Get and apply exceptions
+                exceptions = await self._fetch_exceptions(joint_id, 'joint')
+                logger.info(f"Found {len(exceptions)} exceptions for joint account {joint_id}")
 
                 # Process each date's portfolio
+                joint_records = []
                 for snapshot_date, date_portfolios in portfolio_by_date.items():
                     # Aggregate holdings from single accounts
                     aggregated_portfolio = {}
@@ -420,10 +367,6 @@ class ActualPortfolioProcessor:
                                 "market_value": p.market_value
                             }
 
-                    # Get and apply exceptions
-                    exceptions = await self._fetch_exceptions(joint_id, 'joint')
-                    logger.info(f"Found {len(exceptions)} exceptions for joint account {joint_id}")
-
                     adjusted_portfolio = self._adjust_portfolio({
                         'owner_id': joint_id,
                         'owner_type': 'joint',
@@ -433,16 +376,34 @@ class ActualPortfolioProcessor:
                         'market_value': [data['market_value'] for data in aggregated_portfolio.values()]
                     }, exceptions)
 
-                    # Insert aggregated records
-                    for record in adjusted_portfolio:
-                        self.db.add(AccountActualPortfolio(**record))
-                    await self.db.commit()
-                    logger.info(f"Successfully inserted {len(adjusted_portfolio)} holdings for {joint_id} on {snapshot_date}")
+                    joint_records.extend(adjusted_portfolio)
+
+                # Overwrite existing portfolio records for the joint account
+                await replace_rows(
+                    self.db,
+                    AccountActualPortfolio,
+                    [AccountActualPortfolio.owner_id == joint_id, AccountActualPortfolio.owner_type == "joint"],
+                    joint_records
+                )
+                logger.info(f"Successfully inserted {len(joint_records)} holdings for {joint_id} across {len(portfolio_by_date)} dates")
 
             except Exception as e:
                 logger.error(f"Error processing portfolios for joint account {joint_id}: {e}")
                 await self.db.rollback()
 
+    async def _replace_snapshot(self, owner_id: str, owner_type: str, snapshot_date, records: List[Dict]):
+        """Overwrite an owner's holdings for one snapshot date in a single transaction."""
+        await replace_rows(
+            self.db,
+            AccountActualPortfolio,
+            [
+                AccountActualPortfolio.owner_id == owner_id,
+                AccountActualPortfolio.owner_type == owner_type,
+                AccountActualPortfolio.snapshot_date == snapshot_date
+            ],
+            records
+        )
+
     async def calculate_pf_value(self, account_id: str, account_type: str) -> float:
         """Calculate the current portfolio value from the latest snapshot."""
         try:
@@ -466,6 +427,42 @@ class ActualPortfolioProcessor:
             logger.error(f"Error calculating pf_value for {account_type} account {account_id}: {e}")
             return 0.0
 
+    async def calculate_pf_values(self) -> Dict[Tuple[str, str], float]:
+        """
+        Calculate the current portfolio value of every single and joint owner in one query.
+
+        Returns:
+            Dict[Tuple[str, str], float]: (owner_id, owner_type) -> sum of market values on the
+            owner's latest snapshot date, as calculate_pf_value computes it. Owners without
+            snapshots are absent.
+        """
+        try:
+            latest = select(
+                AccountActualPortfolio.owner_id,
+                AccountActualPortfolio.owner_type,
+                func.max(AccountActualPortfolio.snapshot_date).label("snapshot_date")
+            ).group_by(
+                AccountActualPortfolio.owner_id, AccountActualPortfolio.owner_type
+            ).subquery()
+            sum_query = select(
+                AccountActualPortfolio.owner_id,
+                AccountActualPortfolio.owner_type,
+                func.sum(AccountActualPortfolio.market_value)
+            ).join(
+                latest,
+                and_(
+                    AccountActualPortfolio.owner_id == latest.c.owner_id,
+                    AccountActualPortfolio.owner_type == latest.c.owner_type,
+                    AccountActualPortfolio.snapshot_date == latest.c.snapshot_date
+                )
+            ).group_by(AccountActualPortfolio.owner_id, AccountActualPortfolio.owner_type)
+            result = await self.db.execute(sum_query)
+            return {(owner_id, owner_type): total or 0.0 for owner_id, owner_type, total in result.all()}
+        except Exception as e:
+            logger.error(f"Error calculating pf_value for all accounts: {e}")
+            await self.db.rollback()
+            return {}
+
     def get_fiscal_start(self, date_str: str) -> str:
         date = datetime.strptime(date_str, "%Y-%m-%d")
         fiscal_year_start = datetime(date.year, 4, 1)
@@ -0,0 +1,140 @@
+from sqlalchemy import delete, insert, update, values, column, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.logger import logger
+from typing import Dict, Iterable, List, Sequence
+
+BULK_INSERT_CHUNK_SIZE = 5000
+
+
+async def bulk_insert(db: AsyncSession, model, records: List[Dict], chunk_size: int = BULK_INSERT_CHUNK_SIZE) -> int:
+    """
+    Inserts plain dict records into the model's table with Core executemany.
+
+    Skips ORM object construction and unit-of-work flushing entirely; SQLAlchemy batches
+    each chunk into multi-row INSERT statements on asyncpg. Nothing is committed here.
+
+    Args:
+        db (AsyncSession): The session whose transaction the rows are written in.
+        model: The mapped model class (e.g. AccountCashflow).
+        records (List[Dict]): Rows keyed by column name.
+        chunk_size (int): Maximum number of rows sent per executemany call.
+
+    Returns:
+        int: The number of rows inserted.
+    """
+    if not records:
+        return 0
+    table = model.__table__
+    for start in range(0, len(records), chunk_size):
+        await db.execute(insert(table), records[start:start + chunk_size])
+    return len(records)
+
+
+async def replace_rows(
+        db: AsyncSession,
+        model,
+        where: Iterable,
+        records: List[Dict],
+        commit: bool = True
+    ) -> int:
+    """
+    Deletes the rows matching `where` and bulk inserts `records` in the same transaction.
+
+    Used by the db processors to overwrite an account's rows (cashflows, holdings for a
+    snapshot date, progression, time periods) in one round of DELETE + executemany INSERT.
+    On failure nothing is committed; callers roll back as before.
+
+    Args:
+        db (AsyncSession): The session to write with.
+        model: The mapped model class.
+        where (Iterable): Filter clauses selecting the rows to replace.
+        records (List[Dict]): The new rows keyed by column name.
+        commit (bool): Commit the transaction after inserting. Defaults to True.
+
+    Returns:
+        int: The number of rows inserted.
+    """
+    await db.execute(delete(model.__table__).where(*where))
+    inserted = await bulk_insert(db, model, records)
+    if commit:
+        await db.commit()
+    logger.debug(f"Replaced {model.__tablename__} rows with {inserted} records")
+    return inserted
+
+
+async def bulk_update(
+        db: AsyncSession,
+        model,
+        key: str,
+        records: List[Dict],
+        chunk_size: int = BULK_INSERT_CHUNK_SIZE
+    ) -> int:
+    """
+    Updates many rows with one `UPDATE ... FROM (VALUES ...)` statement per chunk.
+
+    Every record must have the same keys: `key` identifies the row and the other keys
+    are the columns to set. Records whose key matches no row are ignored. Nothing is
+    committed here.
+
+    Args:
+        db (AsyncSession): The session whose transaction the rows are written in.
+        model: The mapped model class (e.g. SingleAccount).
+        key (str): The column matching records to rows, usually the primary key.
+        records (List[Dict]): New values keyed by column name.
+        chunk_size (int): Maximum number of rows per statement.
+
+    Returns:
+        int: The number of records sent.
+    """
+    if not records:
+        return 0
+    table = model.__table__
+    names = list(records[0])
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        new_values = values(
+            *(column(name, table.c[name].type) for name in names), name="new_values"
+        ).data([tuple(record[name] for name in names) for record in chunk])
+        await db.execute(
+            update(table)
+            .where(table.c[key] == new_values.c[key])
+            .values({name: new_values.c[name] for name in names if name != key})
+        )
+    return len(records)
+
+
+async def upsert(
+        db: AsyncSession,
+        model,
+        records: List[Dict],
+        conflict_columns: Sequence[str],
+        update_columns: Sequence[str],
+        chunk_size: int = BULK_INSERT_CHUNK_SIZE
+    ) -> int:
+    """
+    Inserts records, updating `update_columns` of the rows that already exist, with
+    PostgreSQL `INSERT ... ON CONFLICT DO UPDATE`. Sets `updated_at` on conflict when the
+    table has one, since column onupdate defaults do not apply here. Nothing is committed.
+
+    Args:
+        db (AsyncSession): The session whose transaction the rows are written in.
+        model: The mapped model class (e.g. AccountPerformance).
+        records (List[Dict]): Rows keyed by column name.
+        conflict_columns (Sequence[str]): The primary key or unique columns to match on.
+        update_columns (Sequence[str]): The columns overwritten on existing rows.
+        chunk_size (int): Maximum number of rows per statement.
+
+    Returns:
+        int: The number of records sent.
+    """
+    if not records:
+        return 0
+    table = model.__table__
+    for start in range(0, len(records), chunk_size):
+        stmt = pg_insert(table).values(records[start:start + chunk_size])
+        set_ = {name: stmt.excluded[name] for name in update_columns}
+        if "updated_at" in table.c:
+            set_["updated_at"] = func.now()
+        await db.execute(stmt.on_conflict_do_update(index_elements=list(conflict_columns), set_=set_))
+    return len(records)
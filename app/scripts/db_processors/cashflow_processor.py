@@ -1,7 +1,6 @@
 import sys
 import asyncio
 import logging
-import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from sqlalchemy import select, func
@@ -9,13 +8,17 @@ from app.database import AsyncSessionLocal
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.accounts.account_cashflow_details import AccountCashflow
 from app.scripts.data_fetchers.data_transformer import KeynoteDataTransformer, ZerodhaDataTransformer
-from app.scripts.data_fetchers.portfolio_data import ZerodhaDataFetcher, KeynoteDataProcessor
 from app.scripts.db_processors.helper_functions import _generate_historical_month_ends
-from typing import List, Dict
+from app.scripts.db_processors.bulk_writer import bulk_insert, replace_rows
+from app.scripts.db_processors.sync_state import (
+    get_sync_state, get_sync_states, hash_records, save_sync_state
+)
+from app.config import settings
+from typing import List, Dict, Tuple
 from app.logger import logger
 
-keynote_portfolio = KeynoteDataProcessor()
-zerodha_portfolio = ZerodhaDataFetcher()
+CASHFLOW_COMPONENT = "cashflow"
+CASHFLOW_KEYS = ("event_date", "cashflow", "tag")
 
 class CashflowProcessor:
     def __init__(
@@ -27,6 +30,7 @@ class CashflowProcessor:
         self.db = db
         self.keynote_transformer = keynote_transformer
         self.zerodha_transformer = zerodha_transformer
+        self.incremental = settings.CASHFLOW_INCREMENTAL_SYNC
 
     async def process_single_account_ledger(self, account: dict):
         """Process ledger data for a single account based on broker type."""
@@ -64,15 +68,7 @@ class CashflowProcessor:
                 logger.warning(f"No cashflow data for Keynote account {account_id}. Skipping.")
                 return
 
-            # Delete existing cashflow records for the account
-            await self.db.execute(
-                AccountCashflow.__table__.delete().where(
-                    AccountCashflow.owner_id == account_id,
-                    AccountCashflow.owner_type == 'single'
-                )
-            )
-
-            # Insert the new cashflow records
+            # Sync the cashflow records for the account
             cashflow_records = [
                 {
                     "event_date": cashflow_dict["event_date"][i],
@@ -83,11 +79,7 @@ class CashflowProcessor:
                 }
                 for i in range(len(cashflow_dict["event_date"]))
             ]
-
-            for record in cashflow_records:
-                self.db.add(AccountCashflow(**record))
-            await self.db.commit()
-            logger.info(f"Overwritten with {len(cashflow_records)} cashflow records for account {account_id}")
+            await self._sync_cashflows(account_id, 'single', cashflow_records)
         except Exception as e:
             logger.error(f"Error processing ledger for Keynote account {account_id}: {e}", exc_info=True)
             await self.db.rollback()
@@ -110,15 +102,7 @@ class CashflowProcessor:
                 logger.warning(f"No cashflow data for Zerodha account {account_id}. Skipping.")
                 return
 
-            # Delete existing cashflow records for the account
-            await self.db.execute(
-                AccountCashflow.__table__.delete().where(
-                    AccountCashflow.owner_id == account_id,
-                    AccountCashflow.owner_type == 'single'
-                )
-            )
-
-            # Insert the new cashflow records
+            # Sync the cashflow records for the account
             cashflow_records = [
                 {
                     "event_date": cashflow_dict["event_date"][i],
@@ -129,11 +113,7 @@ class CashflowProcessor:
                 }
                 for i in range(len(cashflow_dict["event_date"]))
             ]
-
-            for record in cashflow_records:
-                self.db.add(AccountCashflow(**record))
-            await self.db.commit()
-            logger.info(f"Overwritten with {len(cashflow_records)} cashflow records for account {account_id}")
+            await self._sync_cashflows(account_id, 'single', cashflow_records)
         except Exception as e:
             logger.error(f"Error processing ledger for Zerodha account {account_id}: {e}", exc_info=True)
             await self.db.rollback()
@@ -150,6 +130,21 @@ class CashflowProcessor:
                 continue
 
             try:
+                # The joint aggregate only changes when a member's cashflows do
+                member_states = await get_sync_states(self.db, single_ids, "single", CASHFLOW_COMPONENT)
+                members_version = hash_records(
+                    [
+                        {"owner_id": single_id, "content_hash": getattr(member_states.get(single_id), "content_hash", None)}
+                        for single_id in single_ids
+                    ],
+                    ("owner_id", "content_hash")
+                )
+                if self.incremental and len(member_states) == len(single_ids):
+                    joint_state = await get_sync_state(self.db, joint_id, "joint", CASHFLOW_COMPONENT)
+                    if joint_state and joint_state.source_version == members_version:
+                        logger.info(f"Cashflows of joint account {joint_id} members unchanged, skipping aggregation")
+                        continue
+
                 cashflow_query = (
                     select(AccountCashflow)
                     .where(AccountCashflow.owner_id.in_(single_ids))
@@ -177,33 +172,103 @@ class CashflowProcessor:
                 aggregated_list = list(aggregated_cashflows.values())
                 aggregated_list.sort(key=lambda x: x["event_date"])
 
-                # Delete existing cashflow records for the joint account
-                await self.db.execute(
-                    AccountCashflow.__table__.delete().where(
-                        AccountCashflow.owner_id == joint_id,
-                        AccountCashflow.owner_type == "joint"
-                    )
+                # Sync the aggregated cashflow records for the joint account
+                await self._sync_cashflows(
+                    joint_id,
+                    "joint",
+                    [
+                        {
+                            "owner_id": joint_id,
+                            "owner_type": "joint",
+                            "event_date": cf["event_date"],
+                            "cashflow": cf["cashflow"],
+                            "tag": cf["tag"]
+                        }
+                        for cf in aggregated_list
+                    ],
+                    source_version=members_version
                 )
-
-                # Insert the new aggregated cashflows
-                for cf in aggregated_list:
-                    new_record = AccountCashflow(
-                        owner_id=joint_id,
-                        owner_type="joint",
-                        event_date=cf["event_date"],
-                        cashflow=cf["cashflow"],
-                        tag=cf["tag"]
-                    )
-                    self.db.add(new_record)
-
-                await self.db.commit()
-                logger.info(f"Overwritten with {len(aggregated_list)} cashflow records for joint account {joint_id}")
             except Exception as e:
                 logger.error(f"Error processing cashflows for joint account {joint_id}: {e}")
                 await self.db.rollback()
 
+    async def _sync_cashflows(
+            self,
+            owner_id: str,
+            owner_type: str,
+            cashflow_records: List[Dict],
+            source_version: str = None
+        ) -> bool:
+        """
+        Brings the AccountCashflow rows of an owner in line with cashflow_records.
+
+        In incremental mode the owner's watermark (content hash and last event date of the
+        records last written) is checked first and nothing is read or written if it matches.
+        Otherwise the stored rows are diffed against the new records as a multiset of
+        (event_date, cashflow, tag): only rows that disappeared are deleted and only new
+        rows are inserted, so a ledger that grew by a day writes a day's worth of rows.
+        In full mode the owner's rows are replaced. The rows and the watermark are
+        committed together.
+
+        Returns:
+            bool: True if the owner's cashflow rows were changed.
+        """
+        for record in cashflow_records:
+            record["cashflow"] = float(record["cashflow"])
+        content_hash = hash_records(cashflow_records, CASHFLOW_KEYS)
+        last_event_date = max((record["event_date"] for record in cashflow_records), default=None)
+        where = [AccountCashflow.owner_id == owner_id, AccountCashflow.owner_type == owner_type]
+
+        if self.incremental:
+            state = await get_sync_state(self.db, owner_id, owner_type, CASHFLOW_COMPONENT)
+            if state and state.content_hash == content_hash and state.source_version == source_version:
+                logger.info(f"Cashflows for {owner_type} account {owner_id} unchanged since {state.last_event_date}")
+                return False
+
+            result = await self.db.execute(
+                select(
+                    AccountCashflow.cashflow_id,
+                    AccountCashflow.event_date,
+                    AccountCashflow.cashflow,
+                    AccountCashflow.tag
+                ).where(*where)
+            )
+            pending = {}
+            for record in cashflow_records:
+                pending.setdefault(tuple(record[key] for key in CASHFLOW_KEYS), []).append(record)
+            stale_ids = []
+            for row in result.all():
+                matches = pending.get((row.event_date, row.cashflow, row.tag))
+                if matches:
+                    matches.pop()
+                else:
+                    stale_ids.append(row.cashflow_id)
+            new_records = [record for records in pending.values() for record in records]
+
+            if stale_ids:
+                await self.db.execute(
+                    AccountCashflow.__table__.delete().where(AccountCashflow.cashflow_id.in_(stale_ids))
+                )
+            await bulk_insert(self.db, AccountCashflow, new_records)
+            logger.info(
+                f"Synced cashflows for {owner_type} account {owner_id}: "
+                f"{len(new_records)} inserted, {len(stale_ids)} deleted"
+            )
+        else:
+            await replace_rows(self.db, AccountCashflow, where, cashflow_records, commit=False)
+            logger.info(f"Overwritten with {len(cashflow_records)} cashflow records for {owner_type} account {owner_id}")
+
+        await save_sync_state(
+            self.db, owner_id, owner_type, CASHFLOW_COMPONENT,
+            content_hash=content_hash,
+            last_event_date=last_event_date,
+            source_version=source_version
+        )
+        await self.db.commit()
+        return True
+
     async def get_month_end_cash_balances(self, account: dict, month_ends: list):
-        """Retrieve month-end cash balances for a given account from acc_start_date to today."""
+        """Retrieve the account's cash balance at each of the given month-end dates from its ledger."""
         broker_name = account.get('broker_name')
         account_id = account.get('account_id')
         acc_start_date = account.get('acc_start_date')
@@ -212,69 +277,26 @@ class CashflowProcessor:
         if not all([broker_name, account_id, acc_start_date, broker_code]):
             logger.warning(f"Missing required account data for {broker_name} account: {account}")
             return None
-        
-        today = datetime.now().date()
-        # month_ends = _generate_historical_month_ends(acc_start_date, today)
-        
-        month_ends_shifted = []
-        for month_end in month_ends:
-            new_month_end = month_end - timedelta(days=1)
-            month_ends_shifted.append(new_month_end)
 
         if not month_ends:
             logger.warning(f"No month-end dates generated for account {account_id}")
             return None
         
         try:
-            balances = []
+            # Loading a ledger reads and parses files, so it runs off the event loop
+            # and the other accounts in flight keep going meanwhile.
             if broker_name == "zerodha":
-                ledger_data = zerodha_portfolio.get_ledger(broker_code=broker_code)
-                if not ledger_data:
-                    logger.warning(f"No ledger data for Zerodha account {account_id}")
-                    return {}
-                ledger_df = pd.DataFrame(ledger_data)
-                if ledger_df.empty:
-                    logger.warning(f"Ledger data for Zerodha account {account_id} is empty")
-                    return {}
-                date_col = "Posting Date"
-                balance_col = "Net Balance"
-                balances = self.get_month_end_balances(ledger_df, date_col, balance_col, month_ends, broker_name)
-            
+                ledger = await asyncio.to_thread(self.zerodha_transformer.get_ledger, broker_code)
             elif broker_name == "keynote":
-                ledger_data = keynote_portfolio.fetch_ledger(
-                    ucc=broker_code
-                )
-                if not ledger_data:
-                    logger.warning(f"No ledger data for Keynote account {account_id}")
-                    return None
-                ledger_df = pd.DataFrame(ledger_data)
-                ledger_df.columns = [col.replace("_x000D_", "").replace("\n", "").strip() for col in ledger_df.columns]
-                ledger_df = ledger_df.rename(columns={
-                    'VoucherDate': 'event_date',
-                    'AmountDebit': 'debit',
-                    'AmountCredit': 'credit',
-                    'RunningBalance': 'runbal',
-                    'DrCr': 'type',
-                    'EntryDetails': 'narr',
-                    'Sett#': 'settl_no',
-                    'Branch': 'branch',
-                    'column_8': 'notes'
-                })
-                ledger_df = ledger_df[ledger_df["runbal"].notna()]
-                ledger_df["event_date"] = pd.to_datetime(ledger_df["event_date"], format="%d-%b-%Y").dt.date
-                ledger_df = ledger_df.dropna(subset=["event_date"]) 
-                ledger_df["runbal"] = ledger_df["runbal"].astype(float)
-
-                if ledger_df.empty:
-                    logger.warning(f"Ledger data for Keynote account {account_id} is empty")
-                    return None
-                date_col = "event_date"
-                balance_col = "runbal"
-                balances = self.get_month_end_balances(ledger_df, date_col, balance_col, month_ends, broker_name)
+                ledger = await asyncio.to_thread(self.keynote_transformer.get_ledger, broker_code)
             else:
                 logger.warning(f"Unknown broker {broker_name} for account {account_id}")
                 return None
-            
+
+            if not ledger:
+                logger.warning(f"No ledger data for {broker_name} account {account_id}")
+                return None
+            balances = dict(zip(month_ends, ledger.balances_at(month_ends).tolist()))
             logger.info(f"Calculated {len(balances)} month-end cash balances for account {account_id}")
             return balances
         
@@ -282,24 +304,6 @@ class CashflowProcessor:
             logger.error(f"Error processing cash balances for account {account_id}: {e}")
             return None
 
-    def get_month_end_balances(self, ledger_df: pd.DataFrame, date_col, balance_col, month_ends, broker_name):
-        ledger_df[date_col] = pd.to_datetime(ledger_df[date_col])
-        ledger_df = ledger_df.sort_values(by=date_col, kind='mergesort')  
-        month_ends = [pd.to_datetime(me) for me in month_ends]
-        dates = ledger_df[date_col].values
-        dates = [pd.Timestamp(date) for date in dates]
-        balances = ledger_df[balance_col].values
-
-        result = {}
-        for monthend_date in month_ends:
-            idx = np.searchsorted(dates, monthend_date, side='right')
-            if idx > 0:
-                balance = balances[idx - 1]
-            else:
-                balance = 0.0
-            result[monthend_date.date()] = balance
-        return result
-
     async def calculate_invested_amt(self, account_id: str, account_type: str) -> float:
         """Calculate the total invested amount as the sum of all cashflows."""
         try:
@@ -315,6 +319,29 @@ class CashflowProcessor:
             logger.error(f"Error calculating invested_amt for {account_type} account {account_id}: {e}")
             return 0.0
 
+    async def calculate_invested_amts(self) -> Dict[Tuple[str, str], float]:
+        """
+        Calculate the invested amount of every single and joint owner in one query.
+
+        Returns:
+            Dict[Tuple[str, str], float]: (owner_id, owner_type) -> sum of cashflows excluding
+            fees, as calculate_invested_amt computes it. Owners without cashflows are absent.
+        """
+        try:
+            sum_query = select(
+                AccountCashflow.owner_id,
+                AccountCashflow.owner_type,
+                func.sum(AccountCashflow.cashflow)
+            ).where(
+                AccountCashflow.tag != "fees"
+            ).group_by(AccountCashflow.owner_id, AccountCashflow.owner_type)
+            result = await self.db.execute(sum_query)
+            return {(owner_id, owner_type): total or 0.0 for owner_id, owner_type, total in result.all()}
+        except Exception as e:
+            logger.error(f"Error calculating invested_amt for all accounts: {e}")
+            await self.db.rollback()
+            return {}
+
     async def calculate_cash_value(self, account: dict, month_ends: list) -> float:
         """Calculate the latest cash balance for the account."""
         try:
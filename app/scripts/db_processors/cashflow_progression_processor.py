@@ -2,7 +2,6 @@ import sys
 import logging
 import calendar
 import pandas as pd
-from functools import reduce
 from datetime import datetime, timedelta, date
 from sqlalchemy import select, func, delete
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -12,68 +11,69 @@ from app.models.accounts.account_actual_portfolio import AccountActualPortfolio
 from app.models.accounts.account_time_periods import AccountTimePeriods
 from app.models.accounts.account_cashflow_progression import AccountCashflowProgression
 from app.scripts.db_processors.cashflow_processor import CashflowProcessor
+from app.scripts.db_processors.returns_engine import get_time_periods
+from app.scripts.db_processors.sync_state import sync_tail
+from app.scripts.db_processors.member_series import MemberSeriesStore, sum_member_progressions
+from app.config import settings
 from app.scripts.db_processors.helper_functions import (
     _generate_historical_month_ends, _get_existing_snapshot_dates
 )
 from app.logger import logger
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+
+PROGRESSION_COMPONENT = "progression"
+TIME_PERIODS_COMPONENT = "time_periods"
 
 
 class CashflowProgressionProcessor:
-    def __init__(self, db: AsyncSession, cashflow_processor: CashflowProcessor):
+    def __init__(
+            self,
+            db: AsyncSession,
+            cashflow_processor: CashflowProcessor,
+            member_series: Optional[MemberSeriesStore] = None
+        ):
         self.db = db
         self.cashflow_processor = cashflow_processor
+        self.member_series = member_series
+
+    async def _get_linked_single_accounts(self, account: dict) -> list:
+        """The member single accounts of a joint account, from the account dict when it has them."""
+        if account.get('single_accounts'):
+            return account['single_accounts']
+        return await JointAccountService.get_linked_single_accounts(self.db, account['account_id'])
 
     async def get_month_end_portfolio_df(self, account: dict, month_ends: list) -> pd.DataFrame:
-        """Generate a DataFrame with month-end portfolio values (portfolio + cash balance) for an account."""
+        """
+        Generate a DataFrame with month-end portfolio values (portfolio + cash balance) for a
+        single account. The holdings values come from the run's member series when the
+        account's handler already stored them, and from the database otherwise.
+
+        Joint accounts are not supported: their progression is summed from the member
+        progressions in get_cashflow_progression_df.
+        """
         account_id = account['account_id']
         account_type = account['account_type']
-        today = datetime.now().date()
+        if account_type != 'single':
+            raise ValueError(f"Invalid account_type: {account_type}")
 
-        if account_type == 'single':
-            acc_start_date = account['acc_start_date']
-            if not month_ends:
-                logger.warning(f"No month-end dates for account {account_id}")
-                return pd.DataFrame(columns=['event_date', 'portfolio'])
+        if not month_ends:
+            logger.warning(f"No month-end dates for account {account_id}")
+            return pd.DataFrame(columns=['event_date', 'portfolio'])
 
+        member = self.member_series.get(account_id) if self.member_series is not None else None
+        if member is not None:
+            portfolio_values, month_ends = member.portfolio_values, member.month_ends
+        else:
             portfolio_values, month_ends = await self.get_portfolio_values(account_id, 'single')
-            cash_balances = await self.cashflow_processor.get_month_end_cash_balances(account, month_ends)
-
-            data = []
-            for month_end in month_ends:
-                portfolio_value = portfolio_values.get(month_end, 0)
-                cash_balance = cash_balances.get(month_end, 0) if cash_balances else 0
-                total_portfolio = portfolio_value + cash_balance
-                data.append({'event_date': month_end, 'portfolio': total_portfolio})
-            return pd.DataFrame(data)
-
-        elif account_type == 'joint':
-            single_accounts = await JointAccountService.get_linked_single_accounts(self.db, account_id)
-            if not single_accounts:
-                logger.warning(f"No linked single accounts for joint account {account_id}")
-                return pd.DataFrame(columns=['event_date', 'portfolio'])
-
-            earliest_start_date = min(acc['acc_start_date'] for acc in single_accounts)
-
-            if not month_ends:
-                logger.warning(f"No month-end dates for joint account {account_id}")
-                return pd.DataFrame(columns=['event_date', 'portfolio'])
-
-            data = []
-            for month_end in month_ends:
-                total_portfolio = 0
-                for single_acc in single_accounts:
-                    single_id = single_acc['account_id']
-                    portfolio_values, temp_month_end = await self.get_portfolio_values(single_id, 'single', [month_end])
-                    cash_balances = await self.cashflow_processor.get_month_end_cash_balances(single_acc, temp_month_end)
-                    portfolio_value = portfolio_values.get(month_end, 0)
-                    cash_balance = cash_balances.get(month_end, 0) if cash_balances else 0
-                    total_portfolio += portfolio_value + cash_balance
-                data.append({'event_date': month_end, 'portfolio': total_portfolio})
-            return pd.DataFrame(data)
+        cash_balances = await self.cashflow_processor.get_month_end_cash_balances(account, month_ends)
 
-        else:
-            raise ValueError(f"Invalid account_type: {account_type}")
+        data = []
+        for month_end in month_ends:
+            portfolio_value = portfolio_values.get(month_end, 0)
+            cash_balance = cash_balances.get(month_end, 0) if cash_balances else 0
+            total_portfolio = portfolio_value + cash_balance
+            data.append({'event_date': month_end, 'portfolio': total_portfolio})
+        return pd.DataFrame(data)
 
     async def get_portfolio_values(self, owner_id: str, owner_type: str, month_ends: list = None) -> Tuple[Dict[date, float], List[date]]:
         """
@@ -168,15 +168,19 @@ class CashflowProgressionProcessor:
             return combined_df[['event_date', 'cashflow', 'portfolio', 'portfolio_plus_cash']]
 
         elif account_type == 'joint':
-            single_accounts = await JointAccountService.get_linked_single_accounts(self.db, account_id)
+            single_accounts = await self._get_linked_single_accounts(account)
             if not single_accounts:
                 logger.warning(f"No linked single accounts for joint account {account_id}")
                 return pd.DataFrame(columns=['event_date', 'cashflow', 'portfolio'])
 
             progression_dfs = []
             for single_acc in single_accounts:
-                single_acc['account_type'] = 'single'
-                df = await self.get_cashflow_progression_df(single_acc, month_ends_dict)
+                member = self.member_series.get(single_acc['account_id']) if self.member_series is not None else None
+                if member is not None and member.progression is not None:
+                    df = member.progression
+                else:
+                    single_acc['account_type'] = 'single'
+                    df = await self.get_cashflow_progression_df(single_acc, month_ends_dict)
                 if not df.empty:
                     progression_dfs.append(df)
             
@@ -184,11 +188,7 @@ class CashflowProgressionProcessor:
                 logger.warning(f"No progression data for joint account {account_id}")
                 return pd.DataFrame(columns=['event_date', 'cashflow', 'portfolio'])
             
-            combined_df = pd.concat(progression_dfs, ignore_index=True)
-            aggregated_df = combined_df.groupby('event_date').agg({
-                'cashflow': 'sum',
-                'portfolio': lambda x: x.sum(min_count=1)
-            }).reset_index().fillna(0)
+            aggregated_df = sum_member_progressions(progression_dfs)
 
             progression_df = self.get_main_cashflow_progression_df(aggregated_df)
             return progression_df[['event_date', 'cashflow', 'portfolio', 'portfolio_plus_cash']]
@@ -208,84 +208,91 @@ class CashflowProgressionProcessor:
                 logger.warning(f"Skipping cashflow progression update for {account_type} account {account_id}: no meaningful data")
                 return
 
-        await self.db.execute(
-            delete(AccountCashflowProgression).where(
-                (AccountCashflowProgression.owner_id == account_id) &
-                (AccountCashflowProgression.owner_type == account_type)
+        if 'portfolio_plus_cash' in cashflow_progression_df:
+            portfolio_plus_cash = cashflow_progression_df['portfolio_plus_cash'].tolist()
+        else:
+            portfolio_plus_cash = [0.0] * len(cashflow_progression_df)
+
+        new_records = [
+            {
+                'owner_id': account_id,
+                'owner_type': account_type,
+                'event_date': event_date,
+                'cashflow': cashflow,
+                'portfolio_value': portfolio,
+                'portfolio_plus_cash': ppc
+            }
+            for event_date, cashflow, portfolio, ppc in zip(
+                pd.to_datetime(cashflow_progression_df['event_date']).dt.date,
+                cashflow_progression_df['cashflow'].tolist(),
+                cashflow_progression_df['portfolio'].tolist(),
+                portfolio_plus_cash
             )
+        ]
+        written = await sync_tail(
+            self.db,
+            AccountCashflowProgression,
+            account_id,
+            account_type,
+            PROGRESSION_COMPONENT,
+            AccountCashflowProgression.event_date,
+            new_records,
+            ('event_date', 'cashflow', 'portfolio_value', 'portfolio_plus_cash'),
+            incremental=settings.PROGRESSION_INCREMENTAL_SYNC
         )
 
-        new_records = []
-        for _, row in cashflow_progression_df.iterrows():
-            new_record = AccountCashflowProgression(
-                owner_id=account_id,
-                owner_type=account_type,
-                event_date=row['event_date'],
-                cashflow=row['cashflow'],
-                portfolio_value=row['portfolio'],
-                portfolio_plus_cash=row.get('portfolio_plus_cash', 0.0)
-            )
-            new_records.append(new_record)
-
-        self.db.add_all(new_records)
-        await self.db.commit()
-
-        logger.info(f"Updated cashflow progression for {account_type} account {account_id} with {len(new_records)} records")
+        logger.info(
+            f"Updated cashflow progression for {account_type} account {account_id} with {len(new_records)} records "
+            f"({'rebuilt' if written['rebuilt'] else 'incremental'}, {written['inserted']} written)"
+        )
 
     async def update_time_periods_table(self, account: dict, time_periods_df: pd.DataFrame):
         """Update the AccountTimePeriods table with calculated time periods."""
         account_id = account['account_id']
         account_type = account['account_type']
         try:
-            await self.db.execute(
-                delete(AccountTimePeriods).where(
-                    AccountTimePeriods.owner_id == account_id,
-                    AccountTimePeriods.owner_type == account_type
+            new_records = [
+                {
+                    'owner_id': account_id,
+                    'owner_type': account_type,
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'start_value': start_value,
+                    'end_value': end_value,
+                    'returns': returns,
+                    'returns_1': returns_1
+                }
+                for start_date, end_date, start_value, end_value, returns, returns_1 in zip(
+                    pd.to_datetime(time_periods_df['start_date']).dt.date,
+                    pd.to_datetime(time_periods_df['end_date']).dt.date,
+                    time_periods_df['start_value'].tolist(),
+                    time_periods_df['end_value'].tolist(),
+                    time_periods_df['returns'].tolist(),
+                    time_periods_df['returns_1'].tolist()
                 )
+            ] if not time_periods_df.empty else []
+            written = await sync_tail(
+                self.db,
+                AccountTimePeriods,
+                account_id,
+                account_type,
+                TIME_PERIODS_COMPONENT,
+                AccountTimePeriods.start_date,
+                new_records,
+                ('start_date', 'end_date', 'start_value', 'end_value', 'returns', 'returns_1'),
+                incremental=settings.PROGRESSION_INCREMENTAL_SYNC
+            )
+            logger.info(
+                f"Updated {len(new_records)} time periods for {account_type} account {account_id} "
+                f"({'rebuilt' if written['rebuilt'] else 'incremental'}, {written['inserted']} written)"
             )
-            new_records = [
-                AccountTimePeriods(
-                    owner_id=account_id,
-                    owner_type=account_type,
-                    start_date=row['start_date'],
-                    end_date=row['end_date'],
-                    start_value=row['start_value'],
-                    end_value=row['end_value'],
-                    returns=row['returns'],
-                    returns_1=row['returns_1']
-                ) for _, row in time_periods_df.iterrows()
-            ]
-            self.db.add_all(new_records)
-            await self.db.commit()
-            logger.info(f"Updated {len(new_records)} time periods for {account_type} account {account_id}")
         except Exception as e:
             logger.error(f"Error updating time periods for {account_type} account {account_id}: {e}")
             await self.db.rollback()
 
-    def get_time_periods_df(self, cashflow_progression_df: pd.DataFrame) -> pd.DataFrame:
-        cashflow_progression_df_v1 = cashflow_progression_df
-        abs_twrr_df, absolute_twrr = self._get_twrr(cashflow_progression_df)
-        if not absolute_twrr:
-            absolute_twrr = 0.0
-
-        financial_year_dfs = self._create_financial_year_dataframes(df=cashflow_progression_df_v1)
-
-        yearly_twrrs = []
-        for i, cashflow_progression_df in enumerate(financial_year_dfs):
-            cashflow_progression_df = cashflow_progression_df.reset_index(drop=True)
-            twrr_df, twrr = self._get_twrrs_for_cagr(cashflow_progression_df)
-            if not twrr:
-                twrr = 0.0
-            yearly_twrrs.append(twrr)
-
-        cagrs = [cagr + 1 for cagr in yearly_twrrs]
-        product = reduce(lambda x, y: x * y, cagrs)
-
-        cagr_value = 0
-        years_value = self._calculate_years(abs_twrr_df=abs_twrr_df)
-        if years_value > 1:
-            cagr_value = ((product ** (1 / years_value)) - 1) * 100
-        return abs_twrr_df, round(absolute_twrr * 100, 2), round(twrr * 100, 2), round(cagr_value, 2)
+    def get_time_periods_df(self, cashflow_progression_df: pd.DataFrame) -> Tuple[pd.DataFrame, float, float, float]:
+        """Calculate TWRR sub-periods, total TWRR, current year TWRR and CAGR (see returns_engine.get_time_periods)."""
+        return get_time_periods(cashflow_progression_df)
 
     def get_main_cashflow_progression_df(self, cashflow_progression_df: pd.DataFrame) -> pd.DataFrame:
         """Calculate portfolio_plus_cash for the progression DataFrame."""
@@ -354,287 +361,12 @@ class CashflowProgressionProcessor:
         final_cashflow_progression_df.sort_values('event_date', inplace=True)
         return cashflow_progression_df
 
-    def _get_twrr(self, cashflow_progression_df: pd.DataFrame) -> tuple[pd.DataFrame, float]:
-        if not cashflow_progression_df.empty and cashflow_progression_df['portfolio'].sum() != 0:
-            month_end_mask = cashflow_progression_df['portfolio'] > 0
-            month_ends = cashflow_progression_df[month_end_mask].copy()
-
-            for i in range(len(month_ends) - 1):
-                current_date = month_ends.iloc[i]['event_date']
-                next_date = month_ends.iloc[i + 1]['event_date']
-
-                next_month_start = current_date + pd.offsets.MonthBegin(1)
-                next_month_end = next_date
-
-                next_month_cashflow = cashflow_progression_df[
-                    (cashflow_progression_df['event_date'] > current_date) &
-                    (cashflow_progression_df['event_date'] <= next_date)
-                ]['cashflow']
-
-                next_month_cashflow_sum = next_month_cashflow.sum()
-
-                if next_month_cashflow_sum == 0:
-                    cashflow_progression_df.loc[
-                        cashflow_progression_df['event_date'] == current_date,
-                        'portfolio_plus_cash'
-                    ] = 0
-                else:
-                    cashflow_progression_df.loc[
-                        cashflow_progression_df['event_date'] == current_date,
-                        'portfolio_plus_cash'
-                    ] = month_ends.iloc[i]['portfolio'] + next_month_cashflow_sum
-
-                last_date = month_ends.iloc[-1]['event_date']
-                cashflow_progression_df.loc[
-                    cashflow_progression_df['event_date'] == last_date,
-                    'portfolio_plus_cash'
-                ] = 0
-
-            last_row = cashflow_progression_df.tail(1).copy()
-            oldest_date = cashflow_progression_df['event_date'].min()
-            oldest_year = oldest_date.year
-            oldest_month = oldest_date.month
-
-            first_month_mask = (cashflow_progression_df['event_date'].dt.year == oldest_year) & \
-                (cashflow_progression_df['event_date'].dt.month == oldest_month)
-            
-            first_month = cashflow_progression_df[first_month_mask]
-            first_month_cashflow_sum = first_month['cashflow'].sum()
-            
-            first_portfolio_idx = cashflow_progression_df[cashflow_progression_df['portfolio'] != 0].index[0]
-            first_portfolio_date = cashflow_progression_df.loc[first_portfolio_idx, 'event_date']
-            cashflow_before = cashflow_progression_df.loc[:first_portfolio_idx - 1]
-            non_zero_cashflows = cashflow_before[cashflow_before['cashflow'] != 0]
-
-            if not non_zero_cashflows.empty:
-                first_cashflow_idx = non_zero_cashflows.index[-1]
-                first_cashflow_date = cashflow_progression_df.loc[first_cashflow_idx, 'event_date']
-                total_cashflow = cashflow_before['cashflow'].sum()
-                new_cashflow_progression_df = cashflow_progression_df.loc[first_cashflow_idx:].copy()
-                new_cashflow_progression_df.loc[first_cashflow_idx, 'cashflow'] = total_cashflow
-            
-            else:
-                first_cashflow_idx = first_portfolio_idx
-                first_cashflow_date = first_portfolio_date
-                total_cashflow = 0
-                new_cashflow_progression_df = cashflow_progression_df.loc[first_cashflow_idx:].copy()
-                new_cashflow_progression_df.loc[first_cashflow_idx, 'cashflow'] = total_cashflow
-
-            new_cashflow_progression_df = new_cashflow_progression_df.reset_index(drop=True)
-            
-            first_row = new_cashflow_progression_df.iloc[0]
-            if first_row['portfolio_plus_cash'] == 0 and first_row['cashflow'] != 0:
-                new_cashflow_progression_df.loc[0, 'portfolio_plus_cash'] = first_row['cashflow']
-            elif first_row['portfolio_plus_cash'] != 0:
-                next_month_start = first_row['event_date'].replace(day=1) + pd.DateOffset(months=1)
-                next_month_end = next_month_start + pd.DateOffset(months=1) - pd.DateOffset(days=1)
-                next_month_cashflow = cashflow_progression_df[
-                    (cashflow_progression_df['event_date'] >= next_month_start) &
-                    (cashflow_progression_df['event_date'] <= next_month_end)
-                ]['cashflow'].sum()
-
-                expected_ppc = first_row['portfolio'] + next_month_cashflow
-                if abs(first_row['portfolio_plus_cash'] - expected_ppc) > 1e-2:
-                    new_cashflow_progression_df.loc[0, 'portfolio_plus_cash'] = expected_ppc
-            
-            month_end_mask = (
-                (new_cashflow_progression_df['event_date'] == new_cashflow_progression_df['event_date'] + pd.offsets.MonthEnd(0)) & 
-                (new_cashflow_progression_df['portfolio'] == 0)
-            )
-            new_cashflow_progression_df.loc[month_end_mask, 'portfolio'] = new_cashflow_progression_df.loc[month_end_mask, 'portfolio_plus_cash']
-        
-            cashflow_progression_df = new_cashflow_progression_df[new_cashflow_progression_df['portfolio_plus_cash'] != 0]
-            cashflow_progression_df = pd.concat([cashflow_progression_df, last_row], ignore_index=True)
-
-            if cashflow_progression_df.empty:
-                return pd.DataFrame(columns=["start_value", "start_date", "end_value", "end_date", "returns", "returns_1"]), 1
-            
-            start_value_list = list(cashflow_progression_df['portfolio_plus_cash'])
-            end_value_list = list(cashflow_progression_df['portfolio'])
-            start_date_list = list(cashflow_progression_df['event_date'])
-            end_date_list = list(cashflow_progression_df['event_date'])
-
-            start_value_list.pop(-1)
-            end_value_list.pop(0)
-            start_date_list.pop(-1)
-            end_date_list.pop(0)
-
-            twrr_data = {
-                'start_date' : start_date_list,
-                'start_value' : start_value_list,
-                'end_date': end_date_list,
-                'end_value' : end_value_list,
-            }
-
-            abs_twrr_df = pd.DataFrame(twrr_data)
-            abs_twrr_df['returns'] = (abs_twrr_df['end_value'] / abs_twrr_df['start_value']) - 1
-            abs_twrr_df['returns_1'] = abs_twrr_df['returns'] + 1
-            absolute_twrr = ((abs_twrr_df['returns_1'].prod()) - 1)
-            return abs_twrr_df, absolute_twrr
-
-        else:
-            return pd.DataFrame(columns=[['start_date', 'start_value', 'end_date', 'end_value', 'returns', 'returns_1']]), None
-
-    def _get_twrrs_for_cagr(self, cashflow_progression_df: pd.DataFrame) -> tuple[pd.DataFrame, float]:
-        if not cashflow_progression_df.empty and cashflow_progression_df['portfolio'].sum() != 0:
-            month_end_mask = cashflow_progression_df['portfolio'] > 0
-            month_ends = cashflow_progression_df[month_end_mask].copy()
-
-            for i in range(len(month_ends) - 1):
-                current_date = month_ends.iloc[i]['event_date']
-                next_date = month_ends.iloc[i + 1]['event_date']
-
-                next_month_start = current_date + pd.offsets.MonthBegin(1)
-                next_month_end = next_date
-
-                next_month_cashflow = cashflow_progression_df[
-                    (cashflow_progression_df['event_date'] > current_date) &
-                    (cashflow_progression_df['event_date'] <= next_date)
-                ]['cashflow']
-
-                next_month_cashflow_sum = next_month_cashflow.sum()
-                has_no_cashflows = (next_month_cashflow == 0).all()
-
-                if has_no_cashflows:
-                    cashflow_progression_df.loc[
-                        cashflow_progression_df['event_date'] == current_date,
-                        'portfolio_plus_cash'
-                    ] = 0
-                else:
-                    cashflow_progression_df.loc[
-                        cashflow_progression_df['event_date'] == current_date,
-                        'portfolio_plus_cash'
-                    ] = month_ends.iloc[i]['portfolio'] + next_month_cashflow_sum
-
-                last_date = month_ends.iloc[-1]['event_date']
-                cashflow_progression_df.loc[
-                    cashflow_progression_df['event_date'] == last_date,
-                    'portfolio_plus_cash'
-                ] = 0  
-            
-            last_row = cashflow_progression_df.tail(1).copy()
-            oldest_date = cashflow_progression_df['event_date'].min()
-            oldest_year = oldest_date.year
-            oldest_month = oldest_date.month
-
-            first_month_mask = (cashflow_progression_df['event_date'].dt.year == oldest_year) & \
-                (cashflow_progression_df['event_date'].dt.month == oldest_month)
-            
-            first_month = cashflow_progression_df[first_month_mask]
-            first_month_cashflow_sum = first_month['cashflow'].sum()
-            
-            first_portfolio_idx = cashflow_progression_df[cashflow_progression_df['portfolio'] != 0].index[0]
-            first_portfolio_date = cashflow_progression_df.loc[first_portfolio_idx, 'event_date']
-            cashflow_before = cashflow_progression_df.loc[:first_portfolio_idx - 1]
-            non_zero_cashflows = cashflow_before[cashflow_before['cashflow'] != 0]
-
-            if not non_zero_cashflows.empty:
-                first_cashflow_idx = non_zero_cashflows.index[-1]
-                first_cashflow_date = cashflow_progression_df.loc[first_cashflow_idx, 'event_date']
-                total_cashflow = cashflow_before['cashflow'].sum()
-                new_cashflow_progression_df = cashflow_progression_df.loc[first_cashflow_idx:].copy()
-                new_cashflow_progression_df.loc[first_cashflow_idx, 'cashflow'] = total_cashflow
-            
-            else:
-                first_cashflow_idx = first_portfolio_idx
-                first_cashflow_date = first_portfolio_date
-                total_cashflow = 0
-                new_cashflow_progression_df = cashflow_progression_df.loc[first_cashflow_idx:].copy()
-                new_cashflow_progression_df.loc[first_cashflow_idx, 'cashflow'] = total_cashflow
-
-            new_cashflow_progression_df = new_cashflow_progression_df.reset_index(drop=True)
-            
-            first_row = new_cashflow_progression_df.iloc[0]
-            if first_row['portfolio_plus_cash'] == 0 and first_row['cashflow'] != 0:
-                new_cashflow_progression_df.loc[0, 'portfolio_plus_cash'] = first_row['cashflow']
-            elif first_row['portfolio_plus_cash'] != 0:
-                next_month_start = first_row['event_date'].replace(day=1) + pd.DateOffset(months=1)
-                next_month_end = next_month_start + pd.DateOffset(months=1) - pd.DateOffset(days=1)
-                next_month_cashflow = cashflow_progression_df[
-                    (cashflow_progression_df['event_date'] >= next_month_start) &
-                    (cashflow_progression_df['event_date'] <= next_month_end)
-                ]['cashflow'].sum()
-
-                expected_ppc = first_row['portfolio'] + next_month_cashflow
-                if abs(first_row['portfolio_plus_cash'] - expected_ppc) > 1e-2:
-                    new_cashflow_progression_df.loc[0, 'portfolio_plus_cash'] = expected_ppc
-
-            if new_cashflow_progression_df['cashflow'].sum() == 0:
-                new_cashflow_progression_df['portfolio_plus_cash'].iloc[0] = new_cashflow_progression_df['portfolio'].iloc[0]
-
-            cashflow_progression_df = new_cashflow_progression_df[new_cashflow_progression_df['portfolio_plus_cash'] != 0]
-            cashflow_progression_df = pd.concat([cashflow_progression_df, last_row], ignore_index=True)
-
-            if cashflow_progression_df.empty:
-                return pd.DataFrame(columns=["start_value", "start_date", "end_value", "end_date", "returns", "returns_1"]), 1
-            
-            start_value_list = list(cashflow_progression_df['portfolio_plus_cash'])
-            end_value_list = list(cashflow_progression_df['portfolio'])
-            start_date_list = list(cashflow_progression_df['event_date'])
-            end_date_list = list(cashflow_progression_df['event_date'])
-
-            start_value_list.pop(-1)
-            end_value_list.pop(0)
-            start_date_list.pop(-1)
-            end_date_list.pop(0)
-
-            twrr_data = {
-                'start_date' : start_date_list,
-                'start_value' : start_value_list,
-                'end_date': end_date_list,
-                'end_value' : end_value_list,
-            }
-
-            abs_twrr_df = pd.DataFrame(twrr_data)
-            abs_twrr_df['returns'] = (abs_twrr_df['end_value'] / abs_twrr_df['start_value']) - 1
-            abs_twrr_df['returns_1'] = abs_twrr_df['returns'] + 1
-            absolute_twrr = ((abs_twrr_df['returns_1'].prod()) - 1)
-            return abs_twrr_df, absolute_twrr
-
-        else:
-            return pd.DataFrame(columns=[['start_date', 'start_value', 'end_date', 'end_value', 'returns', 'returns_1']]), None
-
-    def _create_financial_year_dataframes(self, df: pd.DataFrame) -> List[pd.DataFrame]:
-        df['event_date'] = pd.to_datetime(df['event_date'])
-        df = df.sort_values(by='event_date')
-        df['year'] = df['event_date'].dt.year
-        df['month'] = df['event_date'].dt.month
-        df['FinancialYear'] = df.apply(lambda x: x['year'] if x['month'] > 3 else x['year'] - 1, axis=1)
-        unique_financial_years = df['FinancialYear'].unique()
-
-        financial_year_dataframes = []
-        for year in unique_financial_years:
-            start_date_prev = pd.Timestamp(year, 3, 31)
-            end_date = pd.Timestamp(year+1, 3, 31)
-            if not df[df['event_date'] == start_date_prev].empty:
-                start_date = start_date_prev
-            else:
-                start_date = df[(df['FinancialYear'] == year)]['event_date'].min()
-            fy_df = df[(df['event_date'] >= start_date) & (df['event_date'] <= end_date)]
-            financial_year_dataframes.append(fy_df)
-        return financial_year_dataframes
-
-    def _calculate_years(self, abs_twrr_df: pd.DataFrame) -> float:
-        """
-        Calculate the total number of investment years based on the sub-periods in the TWRR DataFrame.
-
-        This function calculates the time difference (in years) for each sub-period by subtracting 
-        the `start_date` from the `end_date`. It then sums up the years for all rows where `returns` 
-        is not equal to 0.
 
-        Args:
-            abs_twrr_df (pd.DataFrame): A DataFrame containing sub-period data with the following columns:
-                - start_date: The start date of the sub-period.
-                - end_date: The end date of the sub-period.
-                - returns: The return for the sub-period.
+def compute_time_periods(cashflow_progression_df: pd.DataFrame):
+    """
+    Process-pool entry point for CashflowProgressionProcessor.get_time_periods_df.
 
-        Returns:
-            float: The total number of investment years for all sub-periods where `returns` != 0.
-        """
-        abs_twrr_df['start_date'] = pd.to_datetime(abs_twrr_df['start_date'])
-        abs_twrr_df['end_date'] = pd.to_datetime(abs_twrr_df['end_date'])
-
-        abs_twrr_df['years'] = (abs_twrr_df['end_date'] - abs_twrr_df['start_date']).dt.days / 365.25
-        years_value = abs_twrr_df.loc[abs_twrr_df['returns'] != 0, 'years'].sum()
-        return years_value
-        
+    The TWRR/CAGR computation needs no database session, so it can run in a worker
+    process while the event loop keeps serving other accounts.
+    """
+    return get_time_periods(cashflow_progression_df)
@@ -1,8 +1,12 @@
+import os
 import sys
 import time
 import asyncio
 import logging
-from sqlalchemy.orm import selectinload
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
 from app.database import AsyncSessionLocal
 from app.services.accounts.account_service import AccountService
 from app.services.accounts.joint_account_service import JointAccountService
@@ -10,21 +14,53 @@ from app.models.accounts.single_account import SingleAccount
 from app.models.accounts.joint_account import JointAccount
 from app.models.accounts.account_performance import AccountPerformance
 from app.scripts.data_fetchers.data_transformer import KeynoteDataTransformer, ZerodhaDataTransformer
-from app.scripts.data_fetchers.portfolio_data import KeynoteDataProcessor, ZerodhaDataFetcher
+from app.scripts.data_fetchers.portfolio_data import get_keynote_data_processor
+from app.scripts.data_fetchers.ledger_cache import LedgerCache
+from app.scripts.data_fetchers.s3_listing_index import s3_listing_index
+from app.scripts.data_fetchers.storage import get_storage
 from app.scripts.db_processors.cashflow_processor import CashflowProcessor
 from app.scripts.db_processors.actual_portfolio_processor import ActualPortfolioProcessor
-from app.scripts.db_processors.cashflow_progression_processor import CashflowProgressionProcessor
+from app.scripts.db_processors.cashflow_progression_processor import (
+    CashflowProgressionProcessor, compute_time_periods
+)
 from app.scripts.db_processors.ltp_processor import LtpProcessor
+from app.scripts.db_processors.bulk_writer import bulk_update, upsert
+from app.scripts.db_processors.member_series import MemberSeries, MemberSeriesStore
 from app.logger import logger
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+SUMMARY_COLUMNS = ["invested_amt", "pf_value", "cash_value", "total_holdings"]
+PERFORMANCE_COLUMNS = ["total_twrr", "current_yr_twrr", "cagr"]
+SUMMARY_MODELS = {
+    "single": (SingleAccount, "single_account_id"),
+    "joint": (JointAccount, "joint_account_id"),
+}
+
+
+@dataclass
+class AccountRun:
+    """
+    Run-wide state shared by the account handlers: the process pool for CPU-bound work,
+    the invested amounts and portfolio values computed for all owners up front, the
+    summary rows not yet written by flush_summaries, and the single accounts' series the
+    joint accounts are built from.
+    """
+    process_pool: ProcessPoolExecutor
+    invested_amts: Dict[Tuple[str, str], float]
+    pf_values: Dict[Tuple[str, str], float]
+    summaries: List[Dict] = field(default_factory=list)
+    member_series: MemberSeriesStore = field(default_factory=MemberSeriesStore)
 
-keynote_portfolio = KeynoteDataProcessor()
-zerodha_portfolio = ZerodhaDataFetcher()
 
 async def runner():
-    list_of_accounts = []
     """Main function to process accounts and update all required fields."""
     try:
-        keynote_portfolio.process_all_bulk_holdings_to_s3()
+        get_keynote_data_processor().process_all_bulk_holdings_to_s3()
+        await asyncio.to_thread(s3_listing_index.load)
+
+        ledger_cache = LedgerCache()
+        keynote_transformer = KeynoteDataTransformer(ledger_cache)
+        zerodha_transformer = ZerodhaDataTransformer(ledger_cache)
 
         async with AsyncSessionLocal() as db:
             accounts_data = await AccountService.get_single_accounts_with_broker_info(db)
@@ -35,133 +71,249 @@ async def runner():
             joint_accounts = await JointAccountService.get_joint_accounts_with_single_accounts(db)
             if not joint_accounts:
                 logger.warning("No joint accounts found.")
-            joint_accounts = []
-            cashflow_processor = CashflowProcessor(db, KeynoteDataTransformer(), ZerodhaDataTransformer())
-            portfolio_processor = ActualPortfolioProcessor(db, KeynoteDataTransformer(), ZerodhaDataTransformer())
-            progression_processor = CashflowProgressionProcessor(db, cashflow_processor)
+            cashflow_processor = CashflowProcessor(db, keynote_transformer, zerodha_transformer)
+            portfolio_processor = ActualPortfolioProcessor(db, keynote_transformer, zerodha_transformer)
 
             await cashflow_processor.initialize(accounts_data, joint_accounts)
             await portfolio_processor.initialize(accounts_data, joint_accounts)
 
-            for acc in accounts_data:
-                acc['account_type'] = 'single'
-                invested_amt = await cashflow_processor.calculate_invested_amt(acc['account_id'], 'single')
-                pf_value = await portfolio_processor.calculate_pf_value(acc['account_id'], 'single')
-                portfolio_values, month_ends = await progression_processor.get_portfolio_values(acc['account_id'], 'single')
-                cash_value = await cashflow_processor.calculate_cash_value(acc, month_ends)
-                total_holdings = pf_value + cash_value
-
-                month_ends_dict = {}
-                month_ends_dict[acc['account_id']] = month_ends
-                
-                if month_ends:
-                    df_single = await progression_processor.get_cashflow_progression_df(acc, month_ends_dict)
-
-                    if not df_single.empty:
-                        await progression_processor.update_cashflow_progression_table(acc, df_single)
-                        logger.info(f"Updated cashflow progression for single account {acc['account_id']}")
-
-                        time_periods_df, total_twrr, current_yr_twrr, cagr = progression_processor.get_time_periods_df(df_single)
-                        await progression_processor.update_time_periods_table(acc, time_periods_df)
-                        account_model = await db.get(
-                            SingleAccount,
-                            acc['account_id'],
-                            options=[selectinload(SingleAccount.performance)]
-                            )
-                        if account_model:
-                            account_model.invested_amt = invested_amt
-                            account_model.pf_value = pf_value
-                            account_model.cash_value = cash_value
-                            account_model.total_holdings = total_holdings
-                            if account_model.performance:
-                                account_model.performance.total_twrr = total_twrr
-                                account_model.performance.current_yr_twrr = current_yr_twrr
-                                account_model.performance.cagr = cagr
-                            else:
-                                new_perf = AccountPerformance(
-                                    performance_id=f"PERF_{acc['account_id']}",
-                                    owner_id=acc['account_id'],
-                                    owner_type='single',
-                                    total_twrr=total_twrr,
-                                    current_yr_twrr=current_yr_twrr,
-                                    cagr=cagr
-                                )
-                                db.add(new_perf)
-                                account_model.performance = new_perf
-                            
-                            await db.commit()
-                            logger.info(f"Updated single account {acc['account_id']}: "
-                                        f"invested_amt={invested_amt}, pf_value={pf_value}, "
-                                        f"cash_value={cash_value}, total_holdings={total_holdings}, "
-                                        f"total_twrr={total_twrr}")
-
-            for joint_acc in joint_accounts:
-                joint_acc_dict = {
-                    'account_id': joint_acc['joint_account_id'],
-                    'account_type': 'joint'
-                }
-                invested_amt = await cashflow_processor.calculate_invested_amt(joint_acc['joint_account_id'], 'joint')
-                pf_value = await portfolio_processor.calculate_pf_value(joint_acc['joint_account_id'], 'joint')
-                
-                month_ends_dict = {}
-                cash_value = 0.0
-                for single_acc in joint_acc['single_accounts']:
-                    portfolio_values, month_ends = await progression_processor.get_portfolio_values(single_acc['account_id'], 'single')
-                    cash_value += await cashflow_processor.calculate_cash_value(single_acc, month_ends)
-                    month_ends_dict[single_acc['account_id']] = month_ends
-                total_holdings = pf_value + cash_value
-    
-                if month_ends_dict:
-                    df_joint = await progression_processor.get_cashflow_progression_df(joint_acc_dict, month_ends_dict)
-
-                    if not df_joint.empty:
-                        await progression_processor.update_cashflow_progression_table(joint_acc_dict, df_joint)
-                        logger.info(f"Updated cashflow progression for joint account {joint_acc['joint_account_id']}")
-
-                        time_periods_df, total_twrr, current_yr_twrr, cagr = progression_processor.get_time_periods_df(df_joint)
-                        await progression_processor.update_time_periods_table(joint_acc_dict, time_periods_df)
-
-                        try:
-                            account_model = await db.get(
-                                JointAccount, 
-                                joint_acc['joint_account_id'],
-                                options=[selectinload(JointAccount.performance)])
-                            if account_model:
-                                account_model.invested_amt = round(invested_amt, 2)
-                                account_model.pf_value = round(pf_value, 2)
-                                account_model.cash_value = round(cash_value, 2)
-                                account_model.total_holdings = round(total_holdings, 2)
-
-                                if account_model.performance:
-                                    account_model.performance.total_twrr = round(total_twrr, 2)
-                                    account_model.performance.current_yr_twrr = round(current_yr_twrr, 2)
-                                    account_model.performance.cagr = round(cagr, 2)
-                                else:
-                                    new_perf = AccountPerformance(
-                                        performance_id=f"PERF_{joint_acc['joint_account_id']}",
-                                        owner_id=joint_acc['joint_account_id'],
-                                        owner_type='joint',
-                                        total_twrr=total_twrr,
-                                        current_yr_twrr=current_yr_twrr,
-                                        cagr=cagr
-                                    )
-                                    db.add(new_perf)
-                                    account_model.performance = new_perf
-                                
-                                logger.info(f"Attempting to commit updates for joint account {joint_acc['joint_account_id']}")
-                                await db.commit()
-                                logger.info(f"Updated joint account {joint_acc['joint_account_id']}: "
-                                            f"invested_amt={invested_amt}, pf_value={pf_value}, "
-                                            f"cash_value={cash_value}, total_holdings={total_holdings}, "
-                                            f"total_twrr={total_twrr}")
-                        except Exception as e:
-                            logger.error(f"Error updating joint account {joint_acc['joint_account_id']}: {e}", exc_info=True)
-                            await db.rollback()
-                else:
-                    logger.warning(f"Month ends dict is empty for joint account {joint_acc['joint_account_id']}, skipping df_joint generation.") # Log if month_ends_dict is empty
+            invested_amts = await cashflow_processor.calculate_invested_amts()
+            pf_values = await portfolio_processor.calculate_pf_values()
+
+        workers = max(1, settings.DB_RUNNER_WORKERS)
+        with ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1)) as process_pool:
+            run = AccountRun(process_pool, invested_amts, pf_values)
+            await _run_accounts(
+                accounts_data, _process_single_account, workers,
+                keynote_transformer, zerodha_transformer, run
+            )
+            await _run_accounts(
+                joint_accounts, _process_joint_account, workers,
+                keynote_transformer, zerodha_transformer, run
+            )
+
+            await flush_summaries(run, force=True)
+        ledger_cache.log_stats()
+        get_storage().log_stats()
 
     except Exception as e:
         logger.error(f"Error in run function: {e}")
 
+async def _run_accounts(
+        accounts: List[Dict],
+        handler: Callable[..., Awaitable[None]],
+        workers: int,
+        keynote_transformer: KeynoteDataTransformer,
+        zerodha_transformer: ZerodhaDataTransformer,
+        run: AccountRun
+    ):
+    """
+    Process accounts concurrently with at most `workers` accounts in flight.
+
+    Each worker holds its own session from AsyncSessionLocal and its own processors,
+    and pulls accounts from a shared queue. The blocking parts of an account (loading and
+    parsing its ledgers and snapshots) run in threads via asyncio.to_thread, so they overlap
+    with the other workers' I/O as well as the database round-trips. A failing account is
+    rolled back and logged without affecting the other accounts. Collected summaries are
+    written every DB_RUNNER_SUMMARY_FLUSH_SIZE accounts (see flush_summaries).
+    """
+    if not accounts:
+        return
+
+    queue = asyncio.Queue()
+    for account in accounts:
+        queue.put_nowait(account)
+
+    async def worker():
+        async with AsyncSessionLocal() as db:
+            cashflow_processor = CashflowProcessor(db, keynote_transformer, zerodha_transformer)
+            portfolio_processor = ActualPortfolioProcessor(db, keynote_transformer, zerodha_transformer)
+            progression_processor = CashflowProgressionProcessor(db, cashflow_processor, run.member_series)
+            while True:
+                try:
+                    account = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                account_id = account.get('account_id') or account.get('joint_account_id')
+                try:
+                    await handler(
+                        db, account, cashflow_processor, portfolio_processor,
+                        progression_processor, run
+                    )
+                except Exception as e:
+                    logger.error(f"Error processing account {account_id}: {e}", exc_info=True)
+                    await db.rollback()
+                await flush_summaries(run)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(workers, len(accounts)))))
+    logger.info(f"Processed {len(accounts)} accounts with {workers} workers in {time.perf_counter() - start:.1f}s")
+
+async def flush_summaries(run: AccountRun, force: bool = False):
+    """
+    Writes the summaries collected in run.summaries once DB_RUNNER_SUMMARY_FLUSH_SIZE of
+    them are pending (or any pending ones if force is set), so an interrupted run keeps
+    the summaries of the accounts it finished.
+
+    The pending rows are taken from run.summaries before the first await, so concurrent
+    workers never write the same rows twice.
+    """
+    if not run.summaries or (not force and len(run.summaries) < max(1, settings.DB_RUNNER_SUMMARY_FLUSH_SIZE)):
+        return
+    batch, run.summaries = run.summaries, []
+    async with AsyncSessionLocal() as db:
+        await write_account_summaries(db, batch)
+
+async def write_account_summaries(db: AsyncSession, summaries: List[Dict]):
+    """
+    Writes the summary values collected by the account handlers in one transaction: a
+    bulk UPDATE of the single and joint account rows and an upsert of their
+    account_performance rows (keyed by performance_id "PERF_{owner_id}").
+
+    Args:
+        db (AsyncSession): The session to write with.
+        summaries (List[Dict]): One record per account with owner_id, owner_type and the
+            SUMMARY_COLUMNS and PERFORMANCE_COLUMNS values.
+    """
+    if not summaries:
+        return
+    try:
+        for owner_type, (model, key) in SUMMARY_MODELS.items():
+            await bulk_update(db, model, key, [
+                {key: summary["owner_id"], **{name: summary[name] for name in SUMMARY_COLUMNS}}
+                for summary in summaries if summary["owner_type"] == owner_type
+            ])
+        await upsert(db, AccountPerformance, [
+            {
+                "performance_id": f"PERF_{summary['owner_id']}",
+                "owner_id": summary["owner_id"],
+                "owner_type": summary["owner_type"],
+                **{name: summary[name] for name in PERFORMANCE_COLUMNS}
+            }
+            for summary in summaries
+        ], conflict_columns=["performance_id"], update_columns=PERFORMANCE_COLUMNS)
+        await db.commit()
+        logger.info(f"Updated summary values of {len(summaries)} accounts")
+    except Exception as e:
+        logger.error(f"Error writing account summaries: {e}", exc_info=True)
+        await db.rollback()
+
+async def _process_single_account(
+        db: AsyncSession,
+        acc: Dict,
+        cashflow_processor: CashflowProcessor,
+        portfolio_processor: ActualPortfolioProcessor,
+        progression_processor: CashflowProgressionProcessor,
+        run: AccountRun
+    ):
+    """
+    Compute and store cashflow progression and time periods for a single account, and
+    collect its summary values in run.summaries and its series in run.member_series.
+    """
+    acc['account_type'] = 'single'
+    invested_amt = run.invested_amts.get((acc['account_id'], 'single'), 0.0)
+    pf_value = run.pf_values.get((acc['account_id'], 'single'), 0.0)
+    portfolio_values, month_ends = await progression_processor.get_portfolio_values(acc['account_id'], 'single')
+    cash_value = await cashflow_processor.calculate_cash_value(acc, month_ends)
+    total_holdings = pf_value + cash_value
+
+    month_ends_dict = {}
+    month_ends_dict[acc['account_id']] = month_ends
+    member = MemberSeries(month_ends, portfolio_values, cash_value)
+    run.member_series.put(acc['account_id'], member)
+
+    if month_ends:
+        df_single = await progression_processor.get_cashflow_progression_df(acc, month_ends_dict)
+        member.progression = df_single
+
+        if not df_single.empty:
+            await progression_processor.update_cashflow_progression_table(acc, df_single)
+            logger.info(f"Updated cashflow progression for single account {acc['account_id']}")
+
+            time_periods_df, total_twrr, current_yr_twrr, cagr = await asyncio.get_running_loop().run_in_executor(
+                run.process_pool, compute_time_periods, df_single
+            )
+            await progression_processor.update_time_periods_table(acc, time_periods_df)
+            run.summaries.append({
+                "owner_id": acc['account_id'],
+                "owner_type": 'single',
+                "invested_amt": invested_amt,
+                "pf_value": pf_value,
+                "cash_value": cash_value,
+                "total_holdings": total_holdings,
+                "total_twrr": total_twrr,
+                "current_yr_twrr": current_yr_twrr,
+                "cagr": cagr
+            })
+            logger.info(f"Computed single account {acc['account_id']}: "
+                        f"invested_amt={invested_amt}, pf_value={pf_value}, "
+                        f"cash_value={cash_value}, total_holdings={total_holdings}, "
+                        f"total_twrr={total_twrr}")
+
+async def _process_joint_account(
+        db: AsyncSession,
+        joint_acc: Dict,
+        cashflow_processor: CashflowProcessor,
+        portfolio_processor: ActualPortfolioProcessor,
+        progression_processor: CashflowProgressionProcessor,
+        run: AccountRun
+    ):
+    """
+    Compute and store cashflow progression and time periods for a joint account, and
+    collect its summary values (rounded to 2 decimals) in run.summaries.
+
+    Member month ends, cash values and progressions come from run.member_series; only
+    members missing from it are computed again.
+    """
+    joint_acc_dict = {
+        'account_id': joint_acc['joint_account_id'],
+        'account_type': 'joint',
+        'single_accounts': joint_acc['single_accounts']
+    }
+    invested_amt = run.invested_amts.get((joint_acc['joint_account_id'], 'joint'), 0.0)
+    pf_value = run.pf_values.get((joint_acc['joint_account_id'], 'joint'), 0.0)
+
+    month_ends_dict = {}
+    cash_value = 0.0
+    for single_acc in joint_acc['single_accounts']:
+        member = run.member_series.get(single_acc['account_id'])
+        if member is not None:
+            month_ends = member.month_ends
+            cash_value += member.cash_value
+        else:
+            portfolio_values, month_ends = await progression_processor.get_portfolio_values(single_acc['account_id'], 'single')
+            cash_value += await cashflow_processor.calculate_cash_value(single_acc, month_ends)
+        month_ends_dict[single_acc['account_id']] = month_ends
+    total_holdings = pf_value + cash_value
+
+    if month_ends_dict:
+        df_joint = await progression_processor.get_cashflow_progression_df(joint_acc_dict, month_ends_dict)
+
+        if not df_joint.empty:
+            await progression_processor.update_cashflow_progression_table(joint_acc_dict, df_joint)
+            logger.info(f"Updated cashflow progression for joint account {joint_acc['joint_account_id']}")
+
+            time_periods_df, total_twrr, current_yr_twrr, cagr = await asyncio.get_running_loop().run_in_executor(
+                run.process_pool, compute_time_periods, df_joint
+            )
+            await progression_processor.update_time_periods_table(joint_acc_dict, time_periods_df)
+            run.summaries.append({
+                "owner_id": joint_acc['joint_account_id'],
+                "owner_type": 'joint',
+                "invested_amt": round(invested_amt, 2),
+                "pf_value": round(pf_value, 2),
+                "cash_value": round(cash_value, 2),
+                "total_holdings": round(total_holdings, 2),
+                "total_twrr": round(total_twrr, 2),
+                "current_yr_twrr": round(current_yr_twrr, 2),
+                "cagr": round(cagr, 2)
+            })
+            logger.info(f"Computed joint account {joint_acc['joint_account_id']}: "
+                        f"invested_amt={invested_amt}, pf_value={pf_value}, "
+                        f"cash_value={cash_value}, total_holdings={total_holdings}, "
+                        f"total_twrr={total_twrr}")
+    else:
+        logger.warning(f"Month ends dict is empty for joint account {joint_acc['joint_account_id']}, skipping df_joint generation.") # Log if month_ends_dict is empty
+
 if __name__ == "__main__":
-    asyncio.run(runner())
\ No newline at end of file
+    asyncio.run(runner())
@@ -22,6 +22,8 @@ from app.models.accounts import (
 from app.models.clients.client_details import Client
 from app.logger import logger
 from app.database import AsyncSessionLocal
+from app.scripts.db_processors.bulk_writer import bulk_insert
+from app.scripts.data_fetchers.reference_data import reference_data, ReferenceTable, RECO_EXCEPTIONS_PATH
 
 
 class IdealPfProcessor:
@@ -38,28 +40,30 @@ class IdealPfProcessor:
             db (AsyncSession): SQLAlchemy async database session
         """
         self.db = db
-        self.exceptions_df = self._load_exceptions()
+        self.exceptions = self._load_exceptions()
         self.client_broker_cache = {} 
 
-    def _load_exceptions(self) -> pd.DataFrame:
-        """Load exceptions from the Excel file.
+    def _load_exceptions(self) -> ReferenceTable:
+        """Load exceptions from the Excel file through the shared reference data registry,
+        grouped by broker_code and trading_symbol.
         
         Returns:
-            pd.DataFrame: DataFrame containing exceptions
+            ReferenceTable: The exceptions, or an empty table if the file doesn't exist
         """
+        group_by = ['broker_code', 'trading_symbol']
         try:
-            file_path = '/home/admin/Plus91Backoffice/Plus91_Backend/data/cashflow_data/plus91_reco_exceptions.xlsx'
+            file_path = RECO_EXCEPTIONS_PATH
             if os.path.exists(file_path):
                 # Specifically load data from the 'exception sheet' 
-                df = pd.read_excel(file_path, sheet_name='exception sheet')
-                logger.info(f"Loaded {len(df)} exceptions from {file_path}, sheet 'exception sheet'")
-                return df
+                exceptions = reference_data.get(file_path, sheet_name='exception sheet', group_by=group_by)
+                logger.info(f"Loaded {len(exceptions.frame)} exceptions from {file_path}, sheet 'exception sheet'")
+                return exceptions
             else:
                 logger.warning(f"Exceptions file not found: {file_path}")
-                return pd.DataFrame(columns=['trading_symbol', 'quantity', 'broker_code'])
+                return ReferenceTable(pd.DataFrame(columns=['trading_symbol', 'quantity', 'broker_code']), group_by)
         except Exception as e:
             logger.error(f"Error loading exceptions: {e}")
-            return pd.DataFrame(columns=['trading_symbol', 'quantity', 'broker_code'])
+            return ReferenceTable(pd.DataFrame(columns=['trading_symbol', 'quantity', 'broker_code']), group_by)
 
     async def _get_bracket_for_amount(self, amount: float) -> Optional[Dict]:
         """Get the appropriate bracket based on investment amount.
@@ -280,16 +284,17 @@ class IdealPfProcessor:
                 standard_allocations = await self._get_standard_allocations(bracket_id)
                 
                 # Insert new allocations
-                for alloc in standard_allocations:
-                    new_allocation = AccountBracketBasketAllocation(
-                        owner_id=owner_id,
-                        owner_type=owner_type,
-                        bracket_id=bracket_id,
-                        basket_id=alloc["basket_id"],
-                        allocation_pct=alloc["allocation_pct"],
-                        is_custom=False
-                    )
-                    self.db.add(new_allocation)
+                await bulk_insert(self.db, AccountBracketBasketAllocation, [
+                    {
+                        "owner_id": owner_id,
+                        "owner_type": owner_type,
+                        "bracket_id": bracket_id,
+                        "basket_id": alloc["basket_id"],
+                        "allocation_pct": alloc["allocation_pct"],
+                        "is_custom": False
+                    }
+                    for alloc in standard_allocations
+                ])
             
             await self.db.commit()
             
@@ -447,7 +452,7 @@ class IdealPfProcessor:
         if holdings_df.empty:
             return holdings_df
             
-        if self.exceptions_df.empty:
+        if self.exceptions.empty:
             # If no exceptions are defined, keep all holdings
             return holdings_df
         
@@ -461,7 +466,7 @@ class IdealPfProcessor:
             
         holdings_symbols = set(result_df['trading_symbol'].unique())
         exception_symbols = set(
-            self.exceptions_df[self.exceptions_df['broker_code'] == broker_code]['trading_symbol'].unique()
+            self.exceptions.rows('broker_code', broker_code)['trading_symbol'].unique()
         )
         
         # Calculate the percentage of holdings that have exceptions
@@ -484,7 +489,7 @@ class IdealPfProcessor:
             trading_symbol = holding['trading_symbol']
             
             # Filter exceptions that match this trading symbol
-            exceptions = self.exceptions_df[self.exceptions_df['trading_symbol'] == trading_symbol]
+            exceptions = self.exceptions.rows('trading_symbol', trading_symbol)
             
             if exceptions.empty:
                 continue
@@ -648,6 +653,7 @@ class IdealPfProcessor:
             # Create a set to track processed stock-basket combinations to avoid duplicates
             # Key format: f"{trading_symbol}:{basket_name}"
             processed_entries = set()
+            portfolio_entries = []
 
             # Process each basket allocation separately
             for basket_alloc in basket_allocations:
@@ -678,17 +684,17 @@ class IdealPfProcessor:
                     stock_investment = weight * basket_amount
 
                     # Check if the stock is in the exceptions list                     
-                    portfolio_entry = AccountIdealPortfolio(
-                        owner_id=account_id,
-                        owner_type=account_type,
-                        snapshot_date=snapshot_date,
-                        basket=basket_name,
-                        trading_symbol=trading_symbol,
-                        allocation_pct=weight * basket_alloc["allocation_pct"], 
-                        investment_amount=stock_investment
-                    )
-                    self.db.add(portfolio_entry)
-
+                    portfolio_entries.append({
+                        "owner_id": account_id,
+                        "owner_type": account_type,
+                        "snapshot_date": snapshot_date,
+                        "basket": basket_name,
+                        "trading_symbol": trading_symbol,
+                        "allocation_pct": weight * basket_alloc["allocation_pct"],
+                        "investment_amount": stock_investment
+                    })
+
+            await bulk_insert(self.db, AccountIdealPortfolio, portfolio_entries)
             await self.db.commit()
             logger.info(
                 f"Updated ideal portfolio for {account_type} account {account_id} "
@@ -8,7 +8,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.stock_ltps import StockLTP
 from app.models.accounts.account_actual_portfolio import AccountActualPortfolio
 from app.models.portfolio.basket_stock_mapping import BasketStockMapping
-from app.scripts.data_fetchers.broker_data import BrokerData
+from app.scripts.data_fetchers.broker_data import AsyncBrokerData
+from app.scripts.data_fetchers.master_data import master_data_cache
 from typing import List, Dict, Any
 from app.database import AsyncSessionLocal
 from datetime import datetime
@@ -117,38 +118,16 @@ class LtpProcessor:
         """
         logger.info(f"Fetching LTPs for {len(trading_symbols)} trading symbols")
         try:
-            upstox_master_data = BrokerData.get_master_data(broker_type=self.broker)
-            if upstox_master_data.get("status") != "success":
-                logger.error("Failed to fetch master data from broker")
-                raise ValueError("Failed to fetch master data from broker")
-        
-            logger.debug("Processing master data into DataFrame")
-            upstox_master_df = pd.DataFrame(upstox_master_data["data"])
-            print(upstox_master_df)
-            upstox_master_df_slice = upstox_master_df[
-                (upstox_master_df["exchange"].isin(["NSE_EQ", "BSE_EQ"]))
-            ][["tradingsymbol", "exchange", "exchange_token"]]
-
-            upstox_master_df_slice_sorted = upstox_master_df_slice.sort_values(
-                by=["tradingsymbol", "exchange"],
-                ascending=[True, True]
-            )
-            upstox_master_df_slice = upstox_master_df_slice_sorted.drop_duplicates(
-                subset="tradingsymbol", keep="first"
-            )
-            mapping_data = upstox_master_df_slice[
-                upstox_master_df_slice["tradingsymbol"].isin(trading_symbols)
+            symbol_index = await asyncio.to_thread(master_data_cache.symbol_index)
+            ltp_request_data = [
+                {"exchange_token": exchange_token, "exchange": exchange, "instrument_type": instrument_type}
+                for exchange, exchange_token, instrument_type in (
+                    symbol_index[symbol] for symbol in sorted(set(trading_symbols)) if symbol in symbol_index
+                )
             ]
-            mapping_data[['exchange', 'instrument_type']] = mapping_data['exchange'].str.split('_', expand=True)
-            mapping_data["exchange"] = mapping_data["exchange"].astype(str)
-            mapping_data["instrument_type"] = mapping_data["instrument_type"].astype(str)
-            mapping_data["exchange_token"] = mapping_data["exchange_token"].astype(str)
-            mapping_data.reset_index(drop=True, inplace=True)
-
-            ltp_request_data = mapping_data[["exchange_token", "exchange", "instrument_type"]].to_dict(orient="records")
 
             logger.debug(f"Requesting LTP quotes for {len(ltp_request_data)} symbols")
-            ltp_response_data = BrokerData.get_ltp_quote(self.broker, ltp_request_data)
+            ltp_response_data = await AsyncBrokerData.get_ltp_quote(self.broker, ltp_request_data)
             if ltp_response_data.get("status") != "success":
                 logger.error("Failed to fetch LTP quotes from broker")
                 raise ValueError("Failed to fetch LTP quotes from broker")
@@ -241,6 +220,7 @@ async def main() -> None:
     async with AsyncSessionLocal() as db:
         processor = LtpProcessor(broker='upstox')
         await processor.process_ltps(db)
+    await AsyncBrokerData.aclose()
     logger.info("Main LTP processing script completed")
 
 
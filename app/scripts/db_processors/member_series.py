@@ -0,0 +1,69 @@
+import pandas as pd
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional
+
+PROGRESSION_SUM_COLUMNS = ['cashflow', 'portfolio']
+
+
+@dataclass
+class MemberSeries:
+    """
+    The month-end series of a single account as computed in the single-account pass.
+
+    Attributes:
+        month_ends (List[date]): The account's holdings snapshot dates, ascending.
+        portfolio_values (Dict[date, float]): Market value of the holdings per snapshot date.
+        cash_value (float): The account's latest cash balance.
+        progression (pd.DataFrame, optional): The account's cashflow progression
+            (event_date, cashflow, portfolio incl. cash, portfolio_plus_cash), or None if
+            it was not computed.
+    """
+    month_ends: List[date]
+    portfolio_values: Dict[date, float]
+    cash_value: float
+    progression: Optional[pd.DataFrame] = None
+
+
+class MemberSeriesStore:
+    """
+    Run-level store of MemberSeries by single account id.
+
+    The single-account pass puts every account's series here before computing its
+    progression, which then reads the portfolio values from the store instead of querying
+    the holdings again. The joint-account pass builds each joint progression from its
+    members' progressions; members missing from the store (e.g. because their single
+    account failed) are computed again by the caller.
+    """
+
+    def __init__(self):
+        self._series: Dict[str, MemberSeries] = {}
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def put(self, account_id: str, series: MemberSeries):
+        self._series[account_id] = series
+
+    def get(self, account_id: str) -> Optional[MemberSeries]:
+        return self._series.get(account_id)
+
+    def clear(self):
+        self._series.clear()
+
+
+def sum_member_progressions(progressions: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Aligns member progressions on event_date and sums their cashflow and portfolio
+    columns; a date missing from a member counts as 0 for that member.
+
+    Returns:
+        pd.DataFrame: event_date, cashflow and portfolio, sorted by event_date.
+    """
+    if not progressions:
+        return pd.DataFrame(columns=['event_date'] + PROGRESSION_SUM_COLUMNS)
+    combined = pd.concat(
+        [df[['event_date'] + PROGRESSION_SUM_COLUMNS] for df in progressions], ignore_index=True
+    )
+    combined['event_date'] = pd.to_datetime(combined['event_date'])
+    return combined.groupby('event_date', sort=True)[PROGRESSION_SUM_COLUMNS].sum().reset_index()
@@ -15,6 +15,7 @@ from app.models.accounts.joint_account import JointAccount
 from app.models.clients.client_details import Client
 from app.models.clients.broker_details import Broker
 from app.services.accounts.joint_account_service import JointAccountService
+from app.scripts.db_processors.bulk_writer import replace_rows
 from app.database import AsyncSessionLocal
 from app.logger import logger
 from typing import Dict, List, Tuple, Optional
@@ -173,29 +174,32 @@ class OutsideAccProcessor:
                 account_holdings = account_holdings.groupby('trading_symbol')['quantity'].sum().reset_index()
                 account_holdings = self.calculate_market_value(account_holdings)
                 
-                # Delete existing holdings for this account on this date
-                logger.debug(f"Deleting existing holdings for account {account.single_account_id} on {file_date.date()}")
-                stmt = AccountActualPortfolio.__table__.delete().where(
-                    and_(
+                # Replace existing holdings for this account on this date; committed with the account values below
+                logger.debug(f"Replacing holdings for account {account.single_account_id} on {file_date.date()} with {len(account_holdings)} rows")
+                await replace_rows(
+                    db,
+                    AccountActualPortfolio,
+                    [
                         AccountActualPortfolio.owner_id == account.single_account_id,
                         AccountActualPortfolio.snapshot_date == file_date.date()
-                    )
+                    ],
+                    [
+                        {
+                            'owner_id': account.single_account_id,
+                            'owner_type': 'single',
+                            'snapshot_date': file_date.date(),
+                            'trading_symbol': trading_symbol,
+                            'quantity': quantity,
+                            'market_value': market_value
+                        }
+                        for trading_symbol, quantity, market_value in zip(
+                            account_holdings['trading_symbol'].tolist(),
+                            account_holdings['quantity'].tolist(),
+                            account_holdings['market_value'].tolist()
+                        )
+                    ],
+                    commit=False
                 )
-                await db.execute(stmt)
-                await db.commit()
-                
-                # Insert new holdings
-                logger.debug(f"Inserting {len(account_holdings)} holdings for account {account.single_account_id}")
-                for _, row in account_holdings.iterrows():
-                    new_holding = AccountActualPortfolio(
-                        owner_id=account.single_account_id,
-                        owner_type='single',
-                        snapshot_date=file_date.date(),
-                        trading_symbol=row['trading_symbol'],
-                        quantity=row['quantity'],
-                        market_value=row['market_value']
-                    )
-                    db.add(new_holding)
             
             # Update account values - even if no holdings
             pf_value = account_holdings['market_value'].sum() if not account_holdings.empty else 0
@@ -237,29 +241,32 @@ class OutsideAccProcessor:
                 joint_holdings = joint_holdings.groupby('trading_symbol')['quantity'].sum().reset_index()
                 joint_holdings = self.calculate_market_value(joint_holdings)
                 
-                # Delete existing records for this account and date
-                logger.debug(f"Deleting existing holdings for joint account {joint_account.joint_account_id} on {file_date.date()}")
-                stmt = AccountActualPortfolio.__table__.delete().where(
-                    and_(
+                # Replace existing holdings for this account on this date; committed with the account values below
+                logger.debug(f"Replacing holdings for joint account {joint_account.joint_account_id} on {file_date.date()} with {len(joint_holdings)} rows")
+                await replace_rows(
+                    db,
+                    AccountActualPortfolio,
+                    [
                         AccountActualPortfolio.owner_id == joint_account.joint_account_id,
                         AccountActualPortfolio.snapshot_date == file_date.date()
-                    )
+                    ],
+                    [
+                        {
+                            'owner_id': joint_account.joint_account_id,
+                            'owner_type': 'joint',
+                            'snapshot_date': file_date.date(),
+                            'trading_symbol': trading_symbol,
+                            'quantity': quantity,
+                            'market_value': market_value
+                        }
+                        for trading_symbol, quantity, market_value in zip(
+                            joint_holdings['trading_symbol'].tolist(),
+                            joint_holdings['quantity'].tolist(),
+                            joint_holdings['market_value'].tolist()
+                        )
+                    ],
+                    commit=False
                 )
-                await db.execute(stmt)
-                await db.commit()
-                
-                # Insert new holdings
-                logger.debug(f"Inserting {len(joint_holdings)} holdings for joint account {joint_account.joint_account_id}")
-                for _, row in joint_holdings.iterrows():
-                    new_holding = AccountActualPortfolio(
-                        owner_id=joint_account.joint_account_id,
-                        owner_type='joint',
-                        snapshot_date=file_date.date(),
-                        trading_symbol=row['trading_symbol'],
-                        quantity=row['quantity'],
-                        market_value=row['market_value']
-                    )
-                    db.add(new_holding)
             
             # Update joint account values - even if no holdings
             pf_value = joint_holdings['market_value'].sum() if not joint_holdings.empty else 0
@@ -18,6 +18,15 @@ from app.models.accounts.joint_account import JointAccount
 from app.models.accounts.joint_account_mapping import JointAccountMapping
 from app.models.clients.client_details import Client
 from app.models.clients.broker_details import Broker
+from app.scripts.data_fetchers.reference_data import reference_data, ReferenceTable
+
+
+def _prepare_reco_exceptions(df: pd.DataFrame) -> pd.DataFrame:
+    """Default a missing quantity column to 0 and lowercase the column names."""
+    if 'quantity' not in df.columns:
+        df['quantity'] = 0
+    df.columns = [col.lower() for col in df.columns]
+    return df
 
 
 class RecoProcessor:
@@ -25,35 +34,33 @@ class RecoProcessor:
         """Initialize the RecoProcessor."""
         logger.info("Initializing RecoProcessor")
         # Load exceptions
-        self.exceptions_df = self._load_exceptions()
+        self.exceptions = self._load_exceptions()
 
-    def _load_exceptions(self) -> pd.DataFrame:
+    def _load_exceptions(self) -> ReferenceTable:
         """
-        Load reco exceptions from the Excel file.
+        Load reco exceptions from the Excel file through the shared reference data registry,
+        grouped by account_id.
         
         Returns:
-            pd.DataFrame: DataFrame with exceptions or empty DataFrame if file doesn't exist
+            ReferenceTable: The exceptions, or an empty table if the file doesn't exist
         """
         try:
             exceptions_path = "data/cashflow_data/plus91_reco_exceptions.xlsx"
             if os.path.exists(exceptions_path):
-                df = pd.read_excel(exceptions_path)
-                if 'account_id' in df.columns and 'trading_symbol' in df.columns:
-                    logger.info(f"Loaded {len(df)} reco exceptions from {exceptions_path}")
-                    # Ensure quantity column exists, default to 0 if not
-                    if 'quantity' not in df.columns:
-                        df['quantity'] = 0
-                    # Standardize column names to lowercase
-                    df.columns = [col.lower() for col in df.columns]
-                    return df
+                exceptions = reference_data.get(
+                    exceptions_path, group_by=['account_id'], prepare=_prepare_reco_exceptions
+                )
+                if 'account_id' in exceptions.frame.columns and 'trading_symbol' in exceptions.frame.columns:
+                    logger.info(f"Loaded {len(exceptions.frame)} reco exceptions from {exceptions_path}")
+                    return exceptions
                 else:
                     logger.warning(f"Exceptions file {exceptions_path} has invalid format, missing required columns")
             else:
                 logger.info(f"Exceptions file {exceptions_path} not found")
-            return pd.DataFrame(columns=['account_id', 'trading_symbol', 'quantity'])
+            return ReferenceTable(pd.DataFrame(columns=['account_id', 'trading_symbol', 'quantity']), ['account_id'])
         except Exception as e:
             logger.error(f"Error loading exceptions: {str(e)}")
-            return pd.DataFrame(columns=['account_id', 'trading_symbol', 'quantity'])
+            return ReferenceTable(pd.DataFrame(columns=['account_id', 'trading_symbol', 'quantity']), ['account_id'])
 
     def _get_account_exceptions(self, account_id: str) -> pd.DataFrame:
         """
@@ -65,11 +72,10 @@ class RecoProcessor:
         Returns:
             pd.DataFrame: DataFrame with exceptions for the account
         """
-        if self.exceptions_df.empty:
+        if self.exceptions.empty:
             return pd.DataFrame(columns=['account_id', 'trading_symbol', 'quantity'])
             
-        # Filter exceptions by account_id
-        account_exceptions = self.exceptions_df[self.exceptions_df['account_id'] == account_id]
+        account_exceptions = self.exceptions.rows('account_id', account_id)
         if not account_exceptions.empty:
             logger.info(f"Found {len(account_exceptions)} exceptions for account {account_id}")
         return account_exceptions
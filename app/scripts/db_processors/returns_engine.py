@@ -0,0 +1,215 @@
+import numpy as np
+import pandas as pd
+from functools import reduce
+from typing import List, Tuple
+
+TWRR_COLUMNS = ['start_date', 'start_value', 'end_date', 'end_value', 'returns', 'returns_1']
+
+
+def get_time_periods(cashflow_progression_df: pd.DataFrame) -> Tuple[pd.DataFrame, float, float, float]:
+    """
+    Computes the TWRR sub-periods, total TWRR, current financial year TWRR and CAGR
+    for a cashflow progression DataFrame.
+
+    The progression is converted to NumPy arrays once. Cashflows between consecutive
+    month-ends are summed per segment located with `searchsorted`, and every financial
+    year is a slice of the same sorted arrays, so the cost is linear in the number of rows.
+
+    Args:
+        cashflow_progression_df (pd.DataFrame): Progression with `event_date`, `cashflow`,
+            `portfolio` and `portfolio_plus_cash` columns, as returned by
+            CashflowProgressionProcessor.get_main_cashflow_progression_df.
+
+    Returns:
+        Tuple[pd.DataFrame, float, float, float]: The TWRR sub-periods DataFrame and the
+            total TWRR, current year TWRR and CAGR in percent, rounded to two decimals.
+    """
+    df = cashflow_progression_df.sort_values('event_date', kind='stable')
+    dates = pd.to_datetime(df['event_date']).to_numpy()
+    cashflow = df['cashflow'].to_numpy(dtype=float)
+    portfolio = df['portfolio'].to_numpy(dtype=float)
+    portfolio_plus_cash = df['portfolio_plus_cash'].to_numpy(dtype=float)
+
+    abs_twrr_df, absolute_twrr, portfolio_plus_cash = _twrr(
+        dates, cashflow, portfolio, portfolio_plus_cash, for_cagr=False
+    )
+    if not absolute_twrr:
+        absolute_twrr = 0.0
+
+    yearly_twrrs = []
+    twrr = 0.0
+    for start, end in financial_year_bounds(dates):
+        _, twrr, _ = _twrr(
+            dates[start:end], cashflow[start:end], portfolio[start:end],
+            portfolio_plus_cash[start:end], for_cagr=True
+        )
+        if not twrr:
+            twrr = 0.0
+        yearly_twrrs.append(twrr)
+
+    cagrs = [cagr + 1 for cagr in yearly_twrrs]
+    product = reduce(lambda x, y: x * y, cagrs)
+
+    cagr_value = 0
+    years_value = calculate_years(abs_twrr_df)
+    if years_value > 1:
+        cagr_value = ((product ** (1 / years_value)) - 1) * 100
+    return abs_twrr_df, round(absolute_twrr * 100, 2), round(twrr * 100, 2), round(cagr_value, 2)
+
+
+def financial_year_bounds(dates: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Returns [start, end) positions of every financial year (April to March) in sorted dates.
+
+    A year starts on the previous 31 March if that date is present, so consecutive years
+    share the month-end that closes one year and opens the next.
+    """
+    if len(dates) == 0:
+        return []
+
+    days = dates.astype('datetime64[D]')
+    months = dates.astype('datetime64[M]').astype(np.int64)
+    financial_years = months // 12 + 1970 - (months % 12 < 3)
+
+    bounds = []
+    for year in np.unique(financial_years):
+        start_date_prev = np.datetime64(f'{year}-03-31', 'D')
+        end_date = np.datetime64(f'{year + 1}-03-31', 'D')
+        first = np.searchsorted(days, start_date_prev, side='left')
+        if first < len(days) and dates[first] == start_date_prev:
+            start = first
+        else:
+            start = int(np.argmax(financial_years == year))
+        end = np.searchsorted(dates, end_date.astype(dates.dtype), side='right')
+        bounds.append((int(start), int(end)))
+    return bounds
+
+
+def calculate_years(abs_twrr_df: pd.DataFrame) -> float:
+    """
+    Calculate the total number of investment years over the sub-periods where `returns` != 0.
+
+    Adds a `years` column with each sub-period's length in years to abs_twrr_df.
+    """
+    abs_twrr_df['start_date'] = pd.to_datetime(abs_twrr_df['start_date'])
+    abs_twrr_df['end_date'] = pd.to_datetime(abs_twrr_df['end_date'])
+
+    abs_twrr_df['years'] = (abs_twrr_df['end_date'] - abs_twrr_df['start_date']).dt.days / 365.25
+    years_value = abs_twrr_df.loc[abs_twrr_df['returns'] != 0, 'years'].sum()
+    return years_value
+
+
+def _twrr(
+        dates: np.ndarray,
+        cashflow: np.ndarray,
+        portfolio: np.ndarray,
+        portfolio_plus_cash: np.ndarray,
+        for_cagr: bool
+    ) -> Tuple[pd.DataFrame, float, np.ndarray]:
+    """
+    Splits a sorted progression into sub-periods between month-ends and chains their returns.
+
+    Every month-end with a positive portfolio starts a sub-period whose start value is the
+    portfolio plus the cashflows up to the next such month-end. The first sub-period starts
+    at the last cashflow before the portfolio was funded, carrying all earlier cashflows.
+
+    With for_cagr=False this is the total TWRR, where month-ends without holdings take
+    their portfolio value from portfolio_plus_cash. With for_cagr=True this is the TWRR
+    of one financial year slice, where a year without cashflows starts from its first
+    portfolio value.
+
+    Returns:
+        Tuple[pd.DataFrame, float, np.ndarray]: The sub-periods DataFrame, the TWRR (None if
+            the portfolio is empty) and portfolio_plus_cash with the month-end start values
+            applied, which the financial year slices are computed from.
+    """
+    if len(dates) == 0 or portfolio.sum() == 0:
+        return pd.DataFrame(columns=[TWRR_COLUMNS]), None, portfolio_plus_cash
+
+    portfolio_plus_cash = portfolio_plus_cash.copy()
+    month_ends = np.flatnonzero(portfolio > 0)
+    if len(month_ends) > 1:
+        current_dates = dates[month_ends[:-1]]
+        start = np.searchsorted(dates, current_dates, side='right')
+        end = np.searchsorted(dates, dates[month_ends[1:]], side='right')
+        cashflow_sums = _segment_sums(cashflow, start, end)
+        if for_cagr:
+            nonzero_counts = np.concatenate(([0], np.cumsum(cashflow != 0)))
+            no_cashflows = nonzero_counts[end] == nonzero_counts[start]
+        else:
+            no_cashflows = cashflow_sums == 0
+        start_values = np.where(no_cashflows, 0.0, portfolio[month_ends[:-1]] + cashflow_sums)
+
+        # A month-end's value applies to every row on its date; the last one on a date wins.
+        last_on_or_before = np.searchsorted(current_dates, dates, side='right') - 1
+        on_month_end = last_on_or_before >= 0
+        on_month_end[on_month_end] = current_dates[last_on_or_before[on_month_end]] == dates[on_month_end]
+        portfolio_plus_cash[on_month_end] = start_values[last_on_or_before[on_month_end]]
+        portfolio_plus_cash[dates == dates[month_ends[-1]]] = 0
+
+    first_portfolio_idx = np.flatnonzero(portfolio != 0)[0]
+    cashflow_before = cashflow[:first_portfolio_idx]
+    non_zero_cashflows = np.flatnonzero(cashflow_before != 0)
+    if len(non_zero_cashflows):
+        first_cashflow_idx = non_zero_cashflows[-1]
+        total_cashflow = cashflow_before.sum()
+    else:
+        first_cashflow_idx = first_portfolio_idx
+        total_cashflow = 0
+
+    period_dates = dates[first_cashflow_idx:]
+    period_cashflow = cashflow[first_cashflow_idx:].copy()
+    period_cashflow[0] = total_cashflow
+    period_portfolio = portfolio[first_cashflow_idx:].copy()
+    period_ppc = portfolio_plus_cash[first_cashflow_idx:].copy()
+
+    if period_ppc[0] == 0 and period_cashflow[0] != 0:
+        period_ppc[0] = period_cashflow[0]
+    elif period_ppc[0] != 0:
+        first_month = period_dates[0].astype('datetime64[M]')
+        next_month_start = (first_month + 1).astype('datetime64[D]').astype(dates.dtype)
+        next_month_end = ((first_month + 2).astype('datetime64[D]') - 1).astype(dates.dtype)
+        next_month_cashflow = cashflow[
+            np.searchsorted(dates, next_month_start, side='left'):
+            np.searchsorted(dates, next_month_end, side='right')
+        ].sum()
+        expected_ppc = period_portfolio[0] + next_month_cashflow
+        if abs(period_ppc[0] - expected_ppc) > 1e-2:
+            period_ppc[0] = expected_ppc
+
+    if for_cagr:
+        if period_cashflow.sum() == 0:
+            period_ppc[0] = period_portfolio[0]
+    else:
+        days = period_dates.astype('datetime64[D]')
+        is_month_end = (days + 1).astype('datetime64[M]') != days.astype('datetime64[M]')
+        empty_month_end = is_month_end & (period_portfolio == 0)
+        period_portfolio[empty_month_end] = period_ppc[empty_month_end]
+
+    # Sub-periods run between rows with a start value, closed by the last progression row.
+    keep = period_ppc != 0
+    chain_dates = np.append(period_dates[keep], dates[-1])
+    chain_starts = np.append(period_ppc[keep], portfolio_plus_cash[-1])
+    chain_ends = np.append(period_portfolio[keep], portfolio[-1])
+
+    abs_twrr_df = pd.DataFrame({
+        'start_date': chain_dates[:-1],
+        'start_value': chain_starts[:-1],
+        'end_date': chain_dates[1:],
+        'end_value': chain_ends[1:],
+    })
+    abs_twrr_df['returns'] = (abs_twrr_df['end_value'] / abs_twrr_df['start_value']) - 1
+    abs_twrr_df['returns_1'] = abs_twrr_df['returns'] + 1
+    absolute_twrr = ((abs_twrr_df['returns_1'].prod()) - 1)
+    return abs_twrr_df, absolute_twrr, portfolio_plus_cash
+
+
+def _segment_sums(values: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """
+    Sums values[start[i]:end[i]] for every i; empty segments sum to 0.
+
+    Each segment is summed as its own contiguous slice rather than as a difference of a
+    running cumsum, so the results match pandas' (pairwise) Series.sum bit for bit and
+    offsetting cashflows still cancel to exactly 0.
+    """
+    return np.array([values[s:e].sum() for s, e in zip(start, end)], dtype=float)
@@ -0,0 +1,173 @@
+import hashlib
+from datetime import date, timedelta
+from sqlalchemy import select, func, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.accounts.account_sync_state import AccountSyncState
+from app.scripts.db_processors.bulk_writer import bulk_insert, replace_rows
+from app.logger import logger
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+def hash_records(records: Iterable[Dict], keys: Sequence[str]) -> str:
+    """
+    Returns an order-independent sha1 of the given fields of each record.
+
+    Records are serialized as `repr` tuples and sorted, so the same rows in a different
+    order produce the same hash.
+    """
+    rows = sorted(repr(tuple(record[key] for key in keys)) for record in records)
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update(row.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+async def get_sync_state(
+        db: AsyncSession,
+        owner_id: str,
+        owner_type: str,
+        component: str
+    ) -> Optional[AccountSyncState]:
+    """Fetch the stored sync watermark for an owner and component, if any."""
+    result = await db.execute(
+        select(AccountSyncState).where(
+            AccountSyncState.owner_id == owner_id,
+            AccountSyncState.owner_type == owner_type,
+            AccountSyncState.component == component
+        )
+    )
+    return result.scalars().first()
+
+
+async def get_sync_states(
+        db: AsyncSession,
+        owner_ids: List[str],
+        owner_type: str,
+        component: str
+    ) -> Dict[str, AccountSyncState]:
+    """Fetch the stored sync watermarks for several owners of one type, keyed by owner_id."""
+    if not owner_ids:
+        return {}
+    result = await db.execute(
+        select(AccountSyncState).where(
+            AccountSyncState.owner_id.in_(owner_ids),
+            AccountSyncState.owner_type == owner_type,
+            AccountSyncState.component == component
+        )
+    )
+    return {state.owner_id: state for state in result.scalars().all()}
+
+
+async def save_sync_state(
+        db: AsyncSession,
+        owner_id: str,
+        owner_type: str,
+        component: str,
+        content_hash: str = None,
+        last_event_date: date = None,
+        source_version: str = None,
+        state: Dict = None
+    ):
+    """
+    Upserts the sync watermark for an owner and component. Not committed here, so the
+    watermark is written in the same transaction as the rows it describes.
+    """
+    values = {
+        "source_version": source_version,
+        "content_hash": content_hash,
+        "last_event_date": last_event_date,
+        "state": state,
+    }
+    stmt = insert(AccountSyncState).values(
+        owner_id=owner_id,
+        owner_type=owner_type,
+        component=component,
+        **values
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AccountSyncState.owner_id, AccountSyncState.owner_type, AccountSyncState.component],
+        set_={**values, "updated_at": func.now()}
+    )
+    await db.execute(stmt)
+
+
+async def sync_tail(
+        db: AsyncSession,
+        model,
+        owner_id: str,
+        owner_type: str,
+        component: str,
+        date_column,
+        records: List[Dict],
+        keys: Sequence[str],
+        incremental: bool = True
+    ) -> Dict[str, int]:
+    """
+    Writes an owner's date-ordered derived rows (progression, time periods), rewriting only
+    the recent tail when the older rows are unchanged.
+
+    Nothing is written if the records hash to the stored watermark. Otherwise rows dated
+    before the first day of the month preceding the latest row are treated as settled:
+    their hash and that cutoff are stored in the watermark's state. On the next run, if
+    the new records before the stored cutoff hash to the same value, only rows from the
+    cutoff on are deleted and inserted. Any difference in the settled rows
+    (backdated cashflows, restated month-end values) falls back to replacing all rows,
+    so the table always matches a full rebuild. Rows and watermark commit together.
+
+    Args:
+        db (AsyncSession): The session to write with.
+        model: The mapped model class of the rows.
+        owner_id (str): The owner of the rows.
+        owner_type (str): 'single' or 'joint'.
+        component (str): The watermark component name.
+        date_column: The model column the rows are ordered by (e.g. AccountTimePeriods.start_date).
+        records (List[Dict]): All rows of the owner, keyed by column name.
+        keys (Sequence[str]): The record fields compared when hashing settled rows.
+        incremental (bool): Set False to always replace all rows.
+
+    Returns:
+        Dict[str, int]: 'rebuilt' (1 if all rows were replaced, else 0) and the number of
+            'inserted' rows.
+    """
+    date_key = date_column.key
+    owner_where = [model.owner_id == owner_id, model.owner_type == owner_type]
+    content_hash = hash_records(records, keys)
+
+    previous = await get_sync_state(db, owner_id, owner_type, component) if incremental else None
+    if previous and previous.content_hash == content_hash:
+        return {"rebuilt": 0, "inserted": 0}
+    previous_state = previous.state if previous and previous.state else None
+    cutoff = None
+    if previous_state:
+        cutoff = date.fromisoformat(previous_state["stable_before"])
+        settled_hash = hash_records([r for r in records if r[date_key] < cutoff], keys)
+        if settled_hash != previous_state["stable_hash"]:
+            logger.info(f"Settled {component} rows changed for {owner_type} account {owner_id} before {cutoff}, rebuilding")
+            cutoff = None
+
+    if cutoff is None:
+        tail = records
+        await replace_rows(db, model, owner_where, tail, commit=False)
+    else:
+        tail = [r for r in records if r[date_key] >= cutoff]
+        await db.execute(delete(model.__table__).where(*owner_where, date_column >= cutoff))
+        await bulk_insert(db, model, tail)
+
+    state = None
+    last_event_date = max((r[date_key] for r in records), default=None)
+    if last_event_date is not None:
+        stable_before = (last_event_date.replace(day=1) - timedelta(days=1)).replace(day=1)
+        state = {
+            "stable_before": stable_before.isoformat(),
+            "stable_hash": hash_records([r for r in records if r[date_key] < stable_before], keys),
+        }
+    await save_sync_state(
+        db, owner_id, owner_type, component,
+        content_hash=content_hash,
+        last_event_date=last_event_date,
+        state=state
+    )
+    await db.commit()
+    return {"rebuilt": int(cutoff is None), "inserted": len(tail)}
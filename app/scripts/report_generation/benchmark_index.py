@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from functools import reduce
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+def calculate_years(start_date: str, end_date: str):
+    start_date = datetime.strptime(start_date, "%Y-%m-%d")
+    end_date = datetime.strptime(end_date, "%Y-%m-%d")
+    years = end_date.year - start_date.year
+    months_diff = end_date.month - start_date.month
+    days_diff = end_date.day - start_date.day
+
+    if months_diff < 0 or (months_diff == 0 and days_diff < 0):
+        years -= 1
+        months_diff += 12
+    fraction_of_year = months_diff / 12 + days_diff / 365.25
+    return years + fraction_of_year
+
+
+class BenchmarkIndex:
+    """
+    Daily closes of a benchmark, prepared once per run for per-account return lookups.
+
+    Holds the sorted dates and closes as arrays together with the position of the last
+    March close of every year (the financial year ends). `twrr_cagr` locates an account's
+    start and snapshot dates with binary search and chains the returns between the
+    financial year ends in between, so each account costs a couple of `searchsorted`
+    calls and a product over a handful of years instead of a pandas groupby.
+    """
+
+    def __init__(self, dates: np.ndarray, closes: np.ndarray):
+        order = np.argsort(dates, kind='stable')
+        self.dates = dates[order].astype('datetime64[ns]')
+        self.closes = closes[order].astype(float)
+
+        months = self.dates.astype('datetime64[M]').astype(np.int64)
+        self.is_march = months % 12 == 2
+        years = months // 12
+        last_of_run = np.ones(len(self.dates), dtype=bool)
+        last_of_run[:-1] = ~self.is_march[1:] | (years[1:] != years[:-1])
+        self.year_end_positions = np.flatnonzero(self.is_march & last_of_run)
+
+    @classmethod
+    def from_prices(cls, prices: pd.DataFrame) -> "BenchmarkIndex":
+        """Build the index from a frame with `datetime` and `close` columns, as load_bse500_data returns."""
+        if prices.empty:
+            return cls(np.array([], dtype='datetime64[ns]'), np.array([], dtype=float))
+        return cls(
+            pd.to_datetime(prices['datetime']).to_numpy(dtype='datetime64[ns]'),
+            prices['close'].to_numpy(dtype=float)
+        )
+
+    @property
+    def empty(self) -> bool:
+        return len(self.dates) == 0
+
+    def twrr_cagr(self, start_date: str, end_date: str) -> Optional[Tuple[float, float, float]]:
+        """
+        The benchmark's current financial year TWRR, absolute TWRR and CAGR in percent
+        (rounded to two decimals) between two dates, inclusive.
+
+        Returns are chained from the first close on or after start_date, through the last
+        March close of every year in range, to the last close on or before end_date.
+
+        Returns:
+            Optional[Tuple[float, float, float]]: None if there are no closes in range,
+                (0, 0, 0) if no return can be computed.
+        """
+        start_ts = pd.to_datetime(start_date)
+        end_ts = pd.to_datetime(end_date)
+        first = int(np.searchsorted(self.dates, start_ts.to_datetime64(), side='left'))
+        last = int(np.searchsorted(self.dates, end_ts.to_datetime64(), side='right')) - 1
+        if last < first:
+            return None
+
+        year_ends = self.year_end_positions[
+            np.searchsorted(self.year_end_positions, first, side='left'):
+            np.searchsorted(self.year_end_positions, last, side='right')
+        ]
+        # A range ending in March closes that year's March on its last date.
+        if self.is_march[last] and (len(year_ends) == 0 or year_ends[-1] != last):
+            year_ends = np.append(year_ends, last)
+
+        points = np.sort(np.concatenate(([first, last], year_ends)))
+        closes = self.closes[points]
+        start_values = closes[:-1]
+        end_values = closes[1:]
+        keep = end_values != 0
+        start_values = start_values[keep]
+        end_values = end_values[keep]
+        if len(end_values) == 0:
+            return 0, 0, 0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = (end_values / start_values) - 1
+            absolute_twrr = ((end_values[-1] / start_values[0]) - 1) * 100
+        current_year_twrr = returns[-1] * 100
+        product = reduce(lambda x, y: x * y, list(returns + 1))
+        absolute_cagr = 0
+        years_value = calculate_years(start_date=str(start_ts.date()), end_date=str(end_ts.date()))
+        if years_value > 1:
+            absolute_cagr = ((product ** (1/years_value)) - 1) * 100
+        return round(current_year_twrr, 2), round(absolute_twrr, 2), round(absolute_cagr, 2)
@@ -0,0 +1,150 @@
+import os
+import time
+import sqlite3
+import pandas as pd
+from datetime import date, datetime, timedelta
+from app.scripts.data_fetchers.broker_data import BrokerData
+from app.logger import logger
+from typing import List, Optional
+
+BENCHMARK_STORE_PATH = "/home/admin/Plus91Backoffice/Plus91_Backend/data/benchmarks/benchmark_prices.sqlite3"
+BENCHMARK_HISTORY_START = date(2020, 1, 1)
+FETCH_WINDOW_DAYS = 2000
+
+# Instruments requested from the historical-data endpoint, by benchmark name.
+BENCHMARKS = {
+    "BSE500": {"exchange": "BSE", "exchange_token": "4", "instrument_type": "INDEX"},
+}
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class BenchmarkStore:
+    """
+    Local daily price store for benchmark indices, kept in a SQLite file.
+
+    Prices are only ever appended: `sync` fetches from the last stored date up to today
+    and writes those days, so a report run makes one small request per benchmark instead
+    of downloading the whole history. The last stored day is fetched again because it
+    may have been stored before the close. Lookups by date range read from the local
+    file, so reports can be regenerated offline from the same prices.
+    """
+
+    def __init__(self, db_path: str = BENCHMARK_STORE_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS benchmark_prices (
+                    benchmark TEXT NOT NULL,
+                    price_date TEXT NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL NOT NULL,
+                    volume REAL,
+                    PRIMARY KEY (benchmark, price_date)
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def last_date(self, benchmark: str) -> Optional[date]:
+        """The latest stored price date of a benchmark, or None if nothing is stored."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT MAX(price_date) FROM benchmark_prices WHERE benchmark = ?", (benchmark,)
+            ).fetchone()
+        return date.fromisoformat(row[0]) if row and row[0] else None
+
+    def append(self, benchmark: str, prices: pd.DataFrame) -> int:
+        """
+        Writes daily prices (a `datetime` column and price columns) for a benchmark. A day
+        that is already stored is overwritten. Returns the number of days written.
+        """
+        if prices.empty:
+            return 0
+        prices = prices.copy()
+        prices['price_date'] = pd.to_datetime(prices['datetime']).dt.date.astype(str)
+        for column in PRICE_COLUMNS:
+            if column not in prices:
+                prices[column] = None
+        prices = prices.drop_duplicates(subset='price_date', keep='last')
+        rows = [
+            (benchmark, row.price_date, row.open, row.high, row.low, row.close, row.volume)
+            for row in prices[['price_date'] + PRICE_COLUMNS].itertuples(index=False)
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO benchmark_prices "
+                "(benchmark, price_date, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def get_prices(self, benchmark: str, start: date = None, end: date = None) -> pd.DataFrame:
+        """
+        Stored prices of a benchmark between start and end (inclusive, either may be None),
+        sorted by date, with `datetime` as a date column like load_bse500_data returns.
+        """
+        query = "SELECT price_date, open, high, low, close, volume FROM benchmark_prices WHERE benchmark = ?"
+        params: List = [benchmark]
+        if start is not None:
+            query += " AND price_date >= ?"
+            params.append(str(start))
+        if end is not None:
+            query += " AND price_date <= ?"
+            params.append(str(end))
+        query += " ORDER BY price_date"
+        with self._connect() as conn:
+            prices = pd.read_sql_query(query, conn, params=params)
+        prices['datetime'] = pd.to_datetime(prices.pop('price_date')).dt.date
+        return prices[['datetime'] + PRICE_COLUMNS]
+
+    def sync(self, benchmark: str, until: date = None) -> int:
+        """
+        Fetches the days missing since the last stored date and appends them.
+
+        Returns:
+            int: The number of days written.
+        """
+        instrument_fields = BENCHMARKS[benchmark]
+        until = until or datetime.now().date()
+        since = self.last_date(benchmark) or BENCHMARK_HISTORY_START
+
+        written = 0
+        for window_index, (from_date, to_date) in enumerate(_fetch_windows(since, until)):
+            if window_index:
+                time.sleep(1)
+            instrument = {
+                "from_date": str(from_date),
+                "to_date": str(to_date),
+                "interval": "day",
+                **instrument_fields
+            }
+            data = BrokerData.historical_data(broker_type='upstox', instrument=instrument)
+            if not data or 'data' not in data:
+                logger.warning(f"No {benchmark} data received for period {from_date} to {to_date}")
+                continue
+            prices = pd.DataFrame(data['data'])
+            if prices.empty:
+                logger.warning(f"Empty {benchmark} dataset for period {from_date} to {to_date}")
+                continue
+            written += self.append(benchmark, prices.fillna(0))
+
+        logger.info(f"Synced {benchmark} prices from {since} to {until}: {written} days written")
+        return written
+
+
+def _fetch_windows(since: date, until: date) -> List[tuple]:
+    """Splits [since, until] into consecutive (from_date, to_date) windows the API accepts."""
+    windows = []
+    from_date = since
+    while from_date <= until:
+        to_date = min(from_date + timedelta(days=FETCH_WINDOW_DAYS), until)
+        windows.append((from_date, to_date))
+        from_date = to_date + timedelta(days=1)
+    return windows
@@ -0,0 +1,154 @@
+import os
+import time
+import hashlib
+import pandas as pd
+import plotly.graph_objects as go
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app.scripts.report_generation.report_generator import (
+    generate_plus91_report,
+    generate_etico_report,
+    read_image_as_base64,
+)
+from app.scripts.data_fetchers.storage import Storage
+from app.logger import logger
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+ASSETS_DIR = "/home/admin/Plus91Backoffice/Plus91_Backend/app/scripts/report_generation/assets"
+PLUS91_LOGO_PATH = f"{ASSETS_DIR}/Plus91_logo.jpeg"
+DOWN_DESIGN_PATH = f"{ASSETS_DIR}/Down_design.jpeg"
+ETICO_LOGO_PATH = f"{ASSETS_DIR}/Etico_logo.jpg"
+
+# Bump when the report layout changes so every report is rendered again.
+REPORT_LAYOUT_VERSION = "1"
+INPUT_HASH_METADATA_KEY = "input-hash"
+
+REPORT_GENERATORS = {
+    "plus91": generate_plus91_report,
+    "etico": generate_etico_report,
+}
+
+
+@dataclass
+class ReportJob:
+    """One account's report: the generator to use, its keyword arguments and the S3 key."""
+    account_id: str
+    kind: str
+    kwargs: Dict[str, Any]
+    s3_key: str
+    input_hash: str = None
+
+    def __post_init__(self):
+        if self.input_hash is None:
+            self.input_hash = report_input_hash(self.kind, self.kwargs)
+
+
+def report_input_hash(kind: str, kwargs: Dict[str, Any]) -> str:
+    """
+    Returns a sha1 of everything that ends up in a report: the generator, its DataFrames
+    and strings, the image assets and REPORT_LAYOUT_VERSION.
+    """
+    digest = hashlib.sha1()
+    digest.update(f"{REPORT_LAYOUT_VERSION}|{kind}".encode())
+    for name in sorted(kwargs):
+        value = kwargs[name]
+        digest.update(f"|{name}=".encode())
+        if isinstance(value, pd.DataFrame):
+            digest.update(value.to_json(orient="split", date_format="iso").encode())
+        elif name.endswith("_path"):
+            digest.update(read_image_as_base64(value).encode())
+        else:
+            digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+
+def _warm_kaleido():
+    """
+    Pool initializer: renders an empty figure so each worker starts kaleido's Chromium
+    process once and keeps it for every report the worker renders.
+    """
+    try:
+        go.Figure().to_image(format="pdf", engine="kaleido")
+    except Exception as e:
+        logger.warning(f"Could not warm up kaleido in worker {os.getpid()}: {e}")
+
+
+def render_report(kind: str, kwargs: Dict[str, Any]) -> bytes:
+    """Render one report to PDF bytes; runs inside a pool worker."""
+    return REPORT_GENERATORS[kind](**kwargs)
+
+
+class ReportRenderer:
+    """
+    Renders month-end report PDFs in a pool of warm kaleido worker processes.
+
+    Each uploaded report carries the hash of its inputs in its object metadata. Jobs whose
+    stored hash matches are skipped, so rerunning the month-end job only renders reports
+    whose account data, benchmark returns, assets or layout changed.
+    """
+
+    def __init__(self, storage: Storage, workers: int = None):
+        self.storage = storage
+        self.workers = max(1, min(workers or os.cpu_count() or 1, os.cpu_count() or 1))
+
+    def stored_input_hash(self, s3_key: str) -> Optional[str]:
+        """The input hash stored on an existing report, or None if there is no report."""
+        info = self.storage.head(s3_key)
+        if info is None:
+            return None
+        return info.metadata.get(INPUT_HASH_METADATA_KEY)
+
+    def pending_jobs(self, jobs: List[ReportJob]) -> List[ReportJob]:
+        """Drop the jobs whose stored report was rendered from the same inputs."""
+        pending = []
+        for job in jobs:
+            if self.stored_input_hash(job.s3_key) == job.input_hash:
+                logger.info(f"Report for account {job.account_id} is unchanged, skipping {job.s3_key}")
+                continue
+            pending.append(job)
+        return pending
+
+    def render(self, jobs: List[ReportJob]) -> Iterator[Tuple[ReportJob, Optional[bytes]]]:
+        """
+        Render the jobs in parallel and yield (job, pdf_bytes) as they complete. pdf_bytes is
+        None for a job whose rendering failed; the error is logged and other jobs continue.
+        """
+        if not jobs:
+            return
+        workers = min(self.workers, len(jobs))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_warm_kaleido) as pool:
+            futures = {pool.submit(render_report, job.kind, job.kwargs): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    yield job, future.result()
+                except Exception as e:
+                    logger.error(f"Error rendering report for account {job.account_id}: {e}", exc_info=True)
+                    yield job, None
+
+    def upload(self, job: ReportJob, pdf_bytes: bytes):
+        """Upload a rendered report along with the hash of the inputs it was rendered from."""
+        self.storage.put(
+            job.s3_key,
+            pdf_bytes,
+            content_type='application/pdf',
+            metadata={INPUT_HASH_METADATA_KEY: job.input_hash}
+        )
+
+    def run(self, jobs: List[ReportJob]) -> Dict[str, int]:
+        """Render and upload every job whose inputs changed. Returns counts per outcome."""
+        start = time.perf_counter()
+        pending = self.pending_jobs(jobs)
+        counts = {"skipped": len(jobs) - len(pending), "rendered": 0, "failed": 0}
+        for job, pdf_bytes in self.render(pending):
+            if pdf_bytes is None:
+                counts["failed"] += 1
+                continue
+            self.upload(job, pdf_bytes)
+            counts["rendered"] += 1
+            logger.info(f"Report generated for account {job.account_id} in S3 at: {job.s3_key}.")
+        logger.info(
+            f"Reports: {counts['rendered']} rendered, {counts['skipped']} unchanged, "
+            f"{counts['failed']} failed with {self.workers} workers in {time.perf_counter() - start:.1f}s"
+        )
+        return counts
@@ -1,13 +1,11 @@
 import sys
-import boto3
 import asyncio
 import logging
 import calendar
 import pandas as pd
+from app.config import settings
 from app.scripts.db_processors.db_runner import runner
 from app.scripts.report_generation.report_generator import (
-    generate_plus91_report,
-    generate_etico_report,
     load_bse500_data,
     get_portfolio_summary,
     get_returns_table,
@@ -15,13 +13,19 @@ from app.scripts.report_generation.report_generator import (
     get_portfolio_report,
 )
 from app.scripts.report_generation.data_feeder import report_datafeeder
+from app.scripts.data_fetchers.storage import get_storage
+from app.scripts.report_generation.benchmark_index import BenchmarkIndex
+from app.scripts.report_generation.report_renderer import (
+    ReportJob,
+    ReportRenderer,
+    PLUS91_LOGO_PATH,
+    DOWN_DESIGN_PATH,
+    ETICO_LOGO_PATH,
+)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-s3 = boto3.client('s3')
-bucket_name = 'plus91backoffice'
-
 async def main() -> None:
     """Main function to update database and generate reports."""
     try:
@@ -37,12 +41,13 @@ async def main() -> None:
 
         report_df = pd.DataFrame(data)
         report_df.loc[:, 'broker_codes'] = report_df['broker_codes'].apply(sort_broker_codes)
-        bse500_df = load_bse500_data()
+        bse500_index = BenchmarkIndex.from_prices(load_bse500_data())
 
+        jobs = []
         grouped_df = report_df.groupby('account_id')
         for account_id, group in grouped_df:
             if account_id in ['ACC_000545']:
-                logger.info(f"Generating report for account ID: {account_id}")
+                logger.info(f"Preparing report for account ID: {account_id}")
                 account_name = group['account_name'].iloc[0]
                 acc_start_date = group['acc_start_date'].iloc[0]
                 snapshot_date = group['snapshot_date'].iloc[0]
@@ -61,59 +66,42 @@ async def main() -> None:
                 portfolio_summary = get_portfolio_summary(str(acc_start_date), total_holdings, invested_amt)
                 portfolio_report = get_portfolio_report(actual_portfolio, cash_value, total_holdings)
                 bse500_current_yr_twrr, bse500_abs_twrr, bse500_abs_cagr = get_bse500_twrr_cagr(
-                    str(acc_start_date), str(snapshot_date), bse500_df
+                    str(acc_start_date), str(snapshot_date), bse500_index
                 )
                 returns_table = get_returns_table(
                     current_yr_twrr, total_twrr, cagr, bse500_current_yr_twrr, 
                     bse500_abs_twrr, bse500_abs_cagr, str(snapshot_date), 
                 )
-                 # Generate the report
-                plus91_logo_path = "/home/admin/Plus91Backoffice/Plus91_Backend/app/scripts/report_generation/assets/Plus91_logo.jpeg"
-                down_design_path = "/home/admin/Plus91Backoffice/Plus91_Backend/app/scripts/report_generation/assets/Down_design.jpeg"
-                etico_logo_path = "/home/admin/Plus91Backoffice/Plus91_Backend/app/scripts/report_generation/assets/Etico_logo.jpg"
+                snapshot_ts = pd.to_datetime(snapshot_date)
+                year = snapshot_ts.year
+                month_abbr = calendar.month_abbr[snapshot_ts.month].upper()
+                filename = f"{formatted_broker_code} {month_abbr} {year} Report.pdf"
+                s3_key = f"PLUS91_PMS/reports/{year}/{month_abbr}/{filename}"
 
-                pdf_bytes = None
+                report_kwargs = {
+                    "portfolio_report": portfolio_report,
+                    "portfolio_summary": portfolio_summary,
+                    "account_name": account_name,
+                    "broker_code": formatted_broker_code,
+                    "acc_start_date": str(acc_start_date),
+                    "snapshot_date": str(snapshot_date),
+                    "down_design_path": DOWN_DESIGN_PATH,
+                }
                 if distributor_name != "Etico":
-                    pdf_bytes = generate_plus91_report(
-                        portfolio_report,
-                        portfolio_summary,
-                        returns_table,
-                        plus91_logo_path,
-                        down_design_path,
-                        account_name,
-                        formatted_broker_code,
-                        str(acc_start_date),
-                        str(snapshot_date)
-                    )
+                    kind = "plus91"
+                    report_kwargs["returns_df"] = returns_table
+                    report_kwargs["logo_path"] = PLUS91_LOGO_PATH
                 else:
-                    returns_table = get_returns_table(
+                    kind = "etico"
+                    report_kwargs["returns_df"] = get_returns_table(
                         current_yr_twrr, total_twrr, cagr, bse500_current_yr_twrr, 
                         bse500_abs_twrr, bse500_abs_cagr, str(snapshot_date), "ETICO"
                     )
-                    pdf_bytes = generate_etico_report(
-                        portfolio_report,
-                        portfolio_summary,
-                        returns_table,
-                        etico_logo_path,
-                        down_design_path,
-                        account_name,
-                        formatted_broker_code,
-                        str(acc_start_date),
-                        str(snapshot_date)
-                    )
-                snapshot_date = pd.to_datetime(snapshot_date)
-                year = snapshot_date.year
-                month_abbr = calendar.month_abbr[snapshot_date.month].upper()
+                    report_kwargs["logo_path"] = ETICO_LOGO_PATH
+                jobs.append(ReportJob(account_id, kind, report_kwargs, s3_key))
 
-                filename = f"{formatted_broker_code} {month_abbr} {year} Report.pdf"
-                s3_key = f"PLUS91_PMS/reports/{year}/{month_abbr}/{filename}"
-                s3.put_object(
-                        Body=pdf_bytes,
-                        Bucket=bucket_name,
-                        Key=s3_key,
-                        ContentType='application/pdf'
-                    )
-                logger.info(f"Report generated for {account_name} in S3 at: {s3_key}.")
+        renderer = ReportRenderer(get_storage(), workers=settings.REPORT_RENDER_WORKERS)
+        renderer.run(jobs)
     except Exception as e:
         logger.error(f"Error in main process: {e}", exc_info=True)
 
@@ -1,12 +1,12 @@
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
-import boto3
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.clients.client_details import Client
 from app.models.accounts.single_account import SingleAccount
 from app.models.accounts.joint_account import JointAccount
 from app.models.accounts.joint_account_mapping import JointAccountMapping
+from app.scripts.data_fetchers.storage import Storage, ObjectNotFound
 from app.logger import logger
 
 import smtplib
@@ -16,10 +16,9 @@ from email.mime.application import MIMEApplication
 
 
 class ReportService:
-    def __init__(self, db: AsyncSession, s3_client):
+    def __init__(self, db: AsyncSession, storage: Storage):
         self.db = db
-        self.s3_client = s3_client
-        self.bucket_name = "plus91backoffice"
+        self.storage = storage
 
     async def verify_user(self, broker_code: str, pan_no: str) -> Client:
         """Verify the client based on broker_code and pan_no."""
@@ -57,7 +56,7 @@ class ReportService:
         return {"single": single_account, "joint": joint_accounts}
 
     def get_latest_report(self, broker_codes: list, is_joint: bool) -> bytes:
-        """Fetch the latest report from S3 based on broker codes."""
+        """Fetch the latest report from storage based on broker codes."""
         account_id = self._get_account_identifier(broker_codes, is_joint)
         current_date = datetime.now()
         for _ in range(60):
@@ -66,9 +65,8 @@ class ReportService:
             file_name = f"{account_id} {month} {year} Report.pdf"
             s3_key = f"PLUS91_PMS/reports/{year}/{month}/{file_name}"
             try:
-                obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
-                return obj['Body'].read()
-            except self.s3_client.exceptions.NoSuchKey:
+                return bytes(self.storage.get(s3_key))
+            except ObjectNotFound:
                 current_date = current_date - relativedelta(months=1)
         return None
 
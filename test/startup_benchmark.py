@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+# Modules imported by the API workers and by each script entry point.
+ENTRY_POINTS = [
+    "app.main",
+    "app.scripts.scripts_runner",
+    "app.scripts.db_processors.db_runner",
+    "app.scripts.db_processors.ltp_processor",
+    "app.scripts.report_generation.report_generator",
+    "app.scripts.bulk_pf_insertions",
+]
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import(module: str) -> float:
+    """Seconds taken by `python -c "import <module>"` in a fresh interpreter."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        last_line = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+        raise RuntimeError(last_line)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of the API and script entry points.")
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = statistics.median(time_import("sys") for _ in range(args.runs))
+    print(f"{'module':<50} {'median':>8} {'min':>8}   (interpreter start {baseline:.3f}s)")
+    for module in args.modules:
+        try:
+            timings = [time_import(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{module:<50} failed: {e}")
+            continue
+        print(f"{module:<50} {statistics.median(timings):>7.3f}s {min(timings):>7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Tests for the bulk holdings upload: its process-pool task and the Keynote processor must
+be picklable for Pool.map, and a client repeated in a workbook keeps its last block.
+"""
+import pickle
+import multiprocessing
+from datetime import datetime
+import openpyxl
+import pandas as pd
+import pytest
+from app.scripts.data_fetchers.ledger_store import KeynoteLedgerStore
+
+HOLDINGS_HEADER = ["Scrip", "ISIN", "Margin_x000D_\nQuantity", "Market_x000D_\nValue"]
+
+
+@pytest.fixture
+def master_data(monkeypatch):
+    from app.scripts.data_fetchers.master_data import master_data_cache
+    monkeypatch.setattr(master_data_cache, "_day", datetime.now().date().isoformat())
+    monkeypatch.setattr(master_data_cache, "_df", pd.DataFrame({"isin": ["INE1"], "trading_symbol": ["ABC"]}))
+    monkeypatch.setattr(master_data_cache, "_symbol_index", {})
+
+
+def test_ledger_store_pickles_without_its_lock(tmp_path):
+    store = KeynoteLedgerStore(str(tmp_path / "ledgers"), str(tmp_path / "store"))
+    copy = pickle.loads(pickle.dumps(store))
+    assert copy.ledger_location == store.ledger_location
+    assert copy.store_location == store.store_location
+    assert copy._indexes == {}
+
+
+def test_build_client_holdings_runs_in_a_process_pool(master_data):
+    from app.scripts.data_fetchers.portfolio_data import KeynoteDataProcessor, _build_client_holdings
+
+    pickle.dumps(KeynoteDataProcessor())
+    block = [HOLDINGS_HEADER, ["Client [AB1]", None, None, None], ["ABC EQ", "INE1", 10, 1000.0]]
+    args = [("AB1", block, "2025-03-31")]
+    pickle.dumps((_build_client_holdings, args))
+
+    with multiprocessing.Pool(1) as pool:
+        results = pool.map(_build_client_holdings, args)
+
+    client_code, s3_key, file_bytes = results[0]
+    assert client_code == "AB1"
+    assert s3_key.startswith("PLUS91_PMS/ledgers_and_holdings/keynote/single_accounts/AB1/holdings/2025-03-31")
+    assert file_bytes
+
+
+def test_repeated_client_keeps_its_last_block(tmp_path, master_data, monkeypatch):
+    from app.scripts.data_fetchers import portfolio_data
+    from app.scripts.data_fetchers.storage import LocalStorage
+    from app.scripts.data_fetchers.snapshot_format import decode_snapshot
+
+    storage = LocalStorage(str(tmp_path / "storage"))
+    monkeypatch.setattr(portfolio_data, "get_storage", lambda: storage)
+    path = tmp_path / "Bulk Holdings_31-03-25.xlsx"
+    workbook = openpyxl.Workbook()
+    for row in [
+        HOLDINGS_HEADER,
+        ["Client One [AB1]", None, None, None],
+        ["OLD EQ", "INE0", 1, 100.0],
+        ["Client Two [CD2]", None, None, None],
+        ["ABC EQ", "INE1", 2, 200.0],
+        ["Client One [AB1]", None, None, None],
+        ["ABC EQ", "INE1", 3, 300.0],
+    ]:
+        workbook.active.append(row)
+    workbook.save(path)
+
+    assert portfolio_data.KeynoteDataProcessor().process_bulk_holdings_to_s3(str(path))
+
+    key = "PLUS91_PMS/ledgers_and_holdings/keynote/single_accounts/AB1/holdings/2025-03-31.xlsx"
+    holdings = decode_snapshot(storage.get(key), key)
+    assert holdings["isin"].tolist() == ["INE1"]
+    assert holdings["quantity"].tolist() == [3]
@@ -0,0 +1,483 @@
+"""
+Golden-output tests for the vectorized returns engine.
+
+LegacyReturns is the row-by-row TWRR/CAGR implementation that
+CashflowProgressionProcessor used before returns_engine, kept verbatim so that
+every synthetic progression below is checked against the old path.
+"""
+import calendar
+import numpy as np
+import pandas as pd
+import pytest
+from functools import reduce
+from datetime import timedelta
+from typing import List
+from app.scripts.db_processors.returns_engine import get_time_periods
+
+
+class LegacyReturns:
+    def get_time_periods_df(self, cashflow_progression_df: pd.DataFrame) -> pd.DataFrame:
+        cashflow_progression_df_v1 = cashflow_progression_df
+        abs_twrr_df, absolute_twrr = self._get_twrr(cashflow_progression_df)
+        if not absolute_twrr:
+            absolute_twrr = 0.0
+
+        financial_year_dfs = self._create_financial_year_dataframes(df=cashflow_progression_df_v1)
+
+        yearly_twrrs = []
+        for i, cashflow_progression_df in enumerate(financial_year_dfs):
+            cashflow_progression_df = cashflow_progression_df.reset_index(drop=True)
+            twrr_df, twrr = self._get_twrrs_for_cagr(cashflow_progression_df)
+            if not twrr:
+                twrr = 0.0
+            yearly_twrrs.append(twrr)
+
+        cagrs = [cagr + 1 for cagr in yearly_twrrs]
+        product = reduce(lambda x, y: x * y, cagrs)
+
+        cagr_value = 0
+        years_value = self._calculate_years(abs_twrr_df=abs_twrr_df)
+        if years_value > 1:
+            cagr_value = ((product ** (1 / years_value)) - 1) * 100
+        return abs_twrr_df, round(absolute_twrr * 100, 2), round(twrr * 100, 2), round(cagr_value, 2)
+
+    def get_main_cashflow_progression_df(self, cashflow_progression_df: pd.DataFrame) -> pd.DataFrame:
+        """Calculate portfolio_plus_cash for the progression DataFrame."""
+        cashflow_progression_df['event_date'] = pd.to_datetime(cashflow_progression_df['event_date'])
+        cashflow_progression_df = cashflow_progression_df.sort_values('event_date').reset_index(drop=True)
+        cashflow_progression_df['month'] = cashflow_progression_df['event_date'].dt.month
+        cashflow_progression_df['year'] = cashflow_progression_df['event_date'].dt.year
+        cashflow_progression_df['portfolio_plus_cash'] = 0
+        grouped_df = cashflow_progression_df.groupby(['year', 'month'])
+
+        monthly_cashflow_list = []
+        index_list = []
+        for (year, month), group in grouped_df:
+            monthly_cashflow = group['cashflow'].sum()
+            last_day_of_current_month = calendar.monthrange(year, month)[1]
+            last_date_of_current_month = f'{year}-{month:02d}-{last_day_of_current_month:02d}'
+            last_date_of_current_month_date = pd.to_datetime(last_date_of_current_month)
+            first_date_of_current_month = last_date_of_current_month_date.replace(day=1)
+            last_date_of_previous_month = first_date_of_current_month - timedelta(days=1)
+            
+            index_of_previous_month = 0
+            if last_date_of_previous_month in cashflow_progression_df['event_date'].values:
+                indices_of_previous_month = cashflow_progression_df.index[
+                    cashflow_progression_df['event_date'] == last_date_of_previous_month
+                ].tolist()
+                index_of_previous_month = indices_of_previous_month[0]
+
+            monthly_cashflow_list.append(monthly_cashflow)
+            if index_of_previous_month == 0:
+                index_list.append(index_of_previous_month)
+            else:
+                index_list.append(index_of_previous_month)
+
+        cashflow_progression_df['portfolio_plus_cash'] = cashflow_progression_df['portfolio_plus_cash'].astype(float)
+      
+        for i in range(1, len(index_list)):
+            cashflow_progression_df.loc[index_list[i], 'portfolio_plus_cash'] = (
+                monthly_cashflow_list[i] + cashflow_progression_df.loc[index_list[i], 'portfolio']
+            )
+        cashflow_progression_df = cashflow_progression_df.drop(columns=['year', 'month'])
+        cashflow_progression_df = cashflow_progression_df[
+            (cashflow_progression_df['cashflow'] != 0) |
+            (cashflow_progression_df['portfolio'] != 0) |
+            (cashflow_progression_df['portfolio_plus_cash'] != 0)
+        ].sort_values('event_date').reset_index(drop=True)
+
+        first_portfolio_date = cashflow_progression_df[
+            cashflow_progression_df['portfolio'] > 0
+        ]['event_date'].min()
+ 
+        pre_invest_cashflows = cashflow_progression_df[
+            (cashflow_progression_df['event_date'] < first_portfolio_date) & 
+            (cashflow_progression_df['cashflow'] != 0)
+        ]
+        starting_cash = pre_invest_cashflows['cashflow'].sum()
+        starting_date = pre_invest_cashflows['event_date'].max()
+
+        starting_row = pd.DataFrame([{
+            'event_date': starting_date,
+            'cashflow': starting_cash,
+            'portfolio': 0.0,
+            'portfolio_plus_cash': starting_cash
+        }])
+        rest_cashflow_progression_df = cashflow_progression_df[cashflow_progression_df['event_date'] >= first_portfolio_date].copy()
+        final_cashflow_progression_df = pd.concat([starting_row, rest_cashflow_progression_df], ignore_index=True)
+        final_cashflow_progression_df.sort_values('event_date', inplace=True)
+        return cashflow_progression_df
+
+    def _get_twrr(self, cashflow_progression_df: pd.DataFrame) -> tuple[pd.DataFrame, float]:
+        if not cashflow_progression_df.empty and cashflow_progression_df['portfolio'].sum() != 0:
+            month_end_mask = cashflow_progression_df['portfolio'] > 0
+            month_ends = cashflow_progression_df[month_end_mask].copy()
+
+            for i in range(len(month_ends) - 1):
+                current_date = month_ends.iloc[i]['event_date']
+                next_date = month_ends.iloc[i + 1]['event_date']
+
+                next_month_start = current_date + pd.offsets.MonthBegin(1)
+                next_month_end = next_date
+
+                next_month_cashflow = cashflow_progression_df[
+                    (cashflow_progression_df['event_date'] > current_date) &
+                    (cashflow_progression_df['event_date'] <= next_date)
+                ]['cashflow']
+
+                next_month_cashflow_sum = next_month_cashflow.sum()
+
+                if next_month_cashflow_sum == 0:
+                    cashflow_progression_df.loc[
+                        cashflow_progression_df['event_date'] == current_date,
+                        'portfolio_plus_cash'
+                    ] = 0
+                else:
+                    cashflow_progression_df.loc[
+                        cashflow_progression_df['event_date'] == current_date,
+                        'portfolio_plus_cash'
+                    ] = month_ends.iloc[i]['portfolio'] + next_month_cashflow_sum
+
+                last_date = month_ends.iloc[-1]['event_date']
+                cashflow_progression_df.loc[
+                    cashflow_progression_df['event_date'] == last_date,
+                    'portfolio_plus_cash'
+                ] = 0
+
+            last_row = cashflow_progression_df.tail(1).copy()
+            oldest_date = cashflow_progression_df['event_date'].min()
+            oldest_year = oldest_date.year
+            oldest_month = oldest_date.month
+
+            first_month_mask = (cashflow_progression_df['event_date'].dt.year == oldest_year) & \
+                (cashflow_progression_df['event_date'].dt.month == oldest_month)
+            
+            first_month = cashflow_progression_df[first_month_mask]
+            first_month_cashflow_sum = first_month['cashflow'].sum()
+            
+            first_portfolio_idx = cashflow_progression_df[cashflow_progression_df['portfolio'] != 0].index[0]
+            first_portfolio_date = cashflow_progression_df.loc[first_portfolio_idx, 'event_date']
+            cashflow_before = cashflow_progression_df.loc[:first_portfolio_idx - 1]
+            non_zero_cashflows = cashflow_before[cashflow_before['cashflow'] != 0]
+
+            if not non_zero_cashflows.empty:
+                first_cashflow_idx = non_zero_cashflows.index[-1]
+                first_cashflow_date = cashflow_progression_df.loc[first_cashflow_idx, 'event_date']
+                total_cashflow = cashflow_before['cashflow'].sum()
+                new_cashflow_progression_df = cashflow_progression_df.loc[first_cashflow_idx:].copy()
+                new_cashflow_progression_df.loc[first_cashflow_idx, 'cashflow'] = total_cashflow
+            
+            else:
+                first_cashflow_idx = first_portfolio_idx
+                first_cashflow_date = first_portfolio_date
+                total_cashflow = 0
+                new_cashflow_progression_df = cashflow_progression_df.loc[first_cashflow_idx:].copy()
+                new_cashflow_progression_df.loc[first_cashflow_idx, 'cashflow'] = total_cashflow
+
+            new_cashflow_progression_df = new_cashflow_progression_df.reset_index(drop=True)
+            
+            first_row = new_cashflow_progression_df.iloc[0]
+            if first_row['portfolio_plus_cash'] == 0 and first_row['cashflow'] != 0:
+                new_cashflow_progression_df.loc[0, 'portfolio_plus_cash'] = first_row['cashflow']
+            elif first_row['portfolio_plus_cash'] != 0:
+                next_month_start = first_row['event_date'].replace(day=1) + pd.DateOffset(months=1)
+                next_month_end = next_month_start + pd.DateOffset(months=1) - pd.DateOffset(days=1)
+                next_month_cashflow = cashflow_progression_df[
+                    (cashflow_progression_df['event_date'] >= next_month_start) &
+                    (cashflow_progression_df['event_date'] <= next_month_end)
+                ]['cashflow'].sum()
+
+                expected_ppc = first_row['portfolio'] + next_month_cashflow
+                if abs(first_row['portfolio_plus_cash'] - expected_ppc) > 1e-2:
+                    new_cashflow_progression_df.loc[0, 'portfolio_plus_cash'] = expected_ppc
+            
+            month_end_mask = (
+                (new_cashflow_progression_df['event_date'] == new_cashflow_progression_df['event_date'] + pd.offsets.MonthEnd(0)) & 
+                (new_cashflow_progression_df['portfolio'] == 0)
+            )
+            new_cashflow_progression_df.loc[month_end_mask, 'portfolio'] = new_cashflow_progression_df.loc[month_end_mask, 'portfolio_plus_cash']
+        
+            cashflow_progression_df = new_cashflow_progression_df[new_cashflow_progression_df['portfolio_plus_cash'] != 0]
+            cashflow_progression_df = pd.concat([cashflow_progression_df, last_row], ignore_index=True)
+
+            if cashflow_progression_df.empty:
+                return pd.DataFrame(columns=["start_value", "start_date", "end_value", "end_date", "returns", "returns_1"]), 1
+            
+            start_value_list = list(cashflow_progression_df['portfolio_plus_cash'])
+            end_value_list = list(cashflow_progression_df['portfolio'])
+            start_date_list = list(cashflow_progression_df['event_date'])
+            end_date_list = list(cashflow_progression_df['event_date'])
+
+            start_value_list.pop(-1)
+            end_value_list.pop(0)
+            start_date_list.pop(-1)
+            end_date_list.pop(0)
+
+            twrr_data = {
+                'start_date' : start_date_list,
+                'start_value' : start_value_list,
+                'end_date': end_date_list,
+                'end_value' : end_value_list,
+            }
+
+            abs_twrr_df = pd.DataFrame(twrr_data)
+            abs_twrr_df['returns'] = (abs_twrr_df['end_value'] / abs_twrr_df['start_value']) - 1
+            abs_twrr_df['returns_1'] = abs_twrr_df['returns'] + 1
+            absolute_twrr = ((abs_twrr_df['returns_1'].prod()) - 1)
+            return abs_twrr_df, absolute_twrr
+
+        else:
+            return pd.DataFrame(columns=[['start_date', 'start_value', 'end_date', 'end_value', 'returns', 'returns_1']]), None
+
+    def _get_twrrs_for_cagr(self, cashflow_progression_df: pd.DataFrame) -> tuple[pd.DataFrame, float]:
+        if not cashflow_progression_df.empty and cashflow_progression_df['portfolio'].sum() != 0:
+            month_end_mask = cashflow_progression_df['portfolio'] > 0
+            month_ends = cashflow_progression_df[month_end_mask].copy()
+
+            for i in range(len(month_ends) - 1):
+                current_date = month_ends.iloc[i]['event_date']
+                next_date = month_ends.iloc[i + 1]['event_date']
+
+                next_month_start = current_date + pd.offsets.MonthBegin(1)
+                next_month_end = next_date
+
+                next_month_cashflow = cashflow_progression_df[
+                    (cashflow_progression_df['event_date'] > current_date) &
+                    (cashflow_progression_df['event_date'] <= next_date)
+                ]['cashflow']
+
+                next_month_cashflow_sum = next_month_cashflow.sum()
+                has_no_cashflows = (next_month_cashflow == 0).all()
+
+                if has_no_cashflows:
+                    cashflow_progression_df.loc[
+                        cashflow_progression_df['event_date'] == current_date,
+                        'portfolio_plus_cash'
+                    ] = 0
+                else:
+                    cashflow_progression_df.loc[
+                        cashflow_progression_df['event_date'] == current_date,
+                        'portfolio_plus_cash'
+                    ] = month_ends.iloc[i]['portfolio'] + next_month_cashflow_sum
+
+                last_date = month_ends.iloc[-1]['event_date']
+                cashflow_progression_df.loc[
+                    cashflow_progression_df['event_date'] == last_date,
+                    'portfolio_plus_cash'
+                ] = 0  
+            
+            last_row = cashflow_progression_df.tail(1).copy()
+            oldest_date = cashflow_progression_df['event_date'].min()
+            oldest_year = oldest_date.year
+            oldest_month = oldest_date.month
+
+            first_month_mask = (cashflow_progression_df['event_date'].dt.year == oldest_year) & \
+                (cashflow_progression_df['event_date'].dt.month == oldest_month)
+            
+            first_month = cashflow_progression_df[first_month_mask]
+            first_month_cashflow_sum = first_month['cashflow'].sum()
+            
+            first_portfolio_idx = cashflow_progression_df[cashflow_progression_df['portfolio'] != 0].index[0]
+            first_portfolio_date = cashflow_progression_df.loc[first_portfolio_idx, 'event_date']
+            cashflow_before = cashflow_progression_df.loc[:first_portfolio_idx - 1]
+            non_zero_cashflows = cashflow_before[cashflow_before['cashflow'] != 0]
+
+            if not non_zero_cashflows.empty:
+                first_cashflow_idx = non_zero_cashflows.index[-1]
+                first_cashflow_date = cashflow_progression_df.loc[first_cashflow_idx, 'event_date']
+                total_cashflow = cashflow_before['cashflow'].sum()
+                new_cashflow_progression_df = cashflow_progression_df.loc[first_cashflow_idx:].copy()
+                new_cashflow_progression_df.loc[first_cashflow_idx, 'cashflow'] = total_cashflow
+            
+            else:
+                first_cashflow_idx = first_portfolio_idx
+                first_cashflow_date = first_portfolio_date
+                total_cashflow = 0
+                new_cashflow_progression_df = cashflow_progression_df.loc[first_cashflow_idx:].copy()
+                new_cashflow_progression_df.loc[first_cashflow_idx, 'cashflow'] = total_cashflow
+
+            new_cashflow_progression_df = new_cashflow_progression_df.reset_index(drop=True)
+            
+            first_row = new_cashflow_progression_df.iloc[0]
+            if first_row['portfolio_plus_cash'] == 0 and first_row['cashflow'] != 0:
+                new_cashflow_progression_df.loc[0, 'portfolio_plus_cash'] = first_row['cashflow']
+            elif first_row['portfolio_plus_cash'] != 0:
+                next_month_start = first_row['event_date'].replace(day=1) + pd.DateOffset(months=1)
+                next_month_end = next_month_start + pd.DateOffset(months=1) - pd.DateOffset(days=1)
+                next_month_cashflow = cashflow_progression_df[
+                    (cashflow_progression_df['event_date'] >= next_month_start) &
+                    (cashflow_progression_df['event_date'] <= next_month_end)
+                ]['cashflow'].sum()
+
+                expected_ppc = first_row['portfolio'] + next_month_cashflow
+                if abs(first_row['portfolio_plus_cash'] - expected_ppc) > 1e-2:
+                    new_cashflow_progression_df.loc[0, 'portfolio_plus_cash'] = expected_ppc
+
+            if new_cashflow_progression_df['cashflow'].sum() == 0:
+                new_cashflow_progression_df['portfolio_plus_cash'].iloc[0] = new_cashflow_progression_df['portfolio'].iloc[0]
+
+            cashflow_progression_df = new_cashflow_progression_df[new_cashflow_progression_df['portfolio_plus_cash'] != 0]
+            cashflow_progression_df = pd.concat([cashflow_progression_df, last_row], ignore_index=True)
+
+            if cashflow_progression_df.empty:
+                return pd.DataFrame(columns=["start_value", "start_date", "end_value", "end_date", "returns", "returns_1"]), 1
+            
+            start_value_list = list(cashflow_progression_df['portfolio_plus_cash'])
+            end_value_list = list(cashflow_progression_df['portfolio'])
+            start_date_list = list(cashflow_progression_df['event_date'])
+            end_date_list = list(cashflow_progression_df['event_date'])
+
+            start_value_list.pop(-1)
+            end_value_list.pop(0)
+            start_date_list.pop(-1)
+            end_date_list.pop(0)
+
+            twrr_data = {
+                'start_date' : start_date_list,
+                'start_value' : start_value_list,
+                'end_date': end_date_list,
+                'end_value' : end_value_list,
+            }
+
+            abs_twrr_df = pd.DataFrame(twrr_data)
+            abs_twrr_df['returns'] = (abs_twrr_df['end_value'] / abs_twrr_df['start_value']) - 1
+            abs_twrr_df['returns_1'] = abs_twrr_df['returns'] + 1
+            absolute_twrr = ((abs_twrr_df['returns_1'].prod()) - 1)
+            return abs_twrr_df, absolute_twrr
+
+        else:
+            return pd.DataFrame(columns=[['start_date', 'start_value', 'end_date', 'end_value', 'returns', 'returns_1']]), None
+
+    def _create_financial_year_dataframes(self, df: pd.DataFrame) -> List[pd.DataFrame]:
+        df['event_date'] = pd.to_datetime(df['event_date'])
+        df = df.sort_values(by='event_date')
+        df['year'] = df['event_date'].dt.year
+        df['month'] = df['event_date'].dt.month
+        df['FinancialYear'] = df.apply(lambda x: x['year'] if x['month'] > 3 else x['year'] - 1, axis=1)
+        unique_financial_years = df['FinancialYear'].unique()
+
+        financial_year_dataframes = []
+        for year in unique_financial_years:
+            start_date_prev = pd.Timestamp(year, 3, 31)
+            end_date = pd.Timestamp(year+1, 3, 31)
+            if not df[df['event_date'] == start_date_prev].empty:
+                start_date = start_date_prev
+            else:
+                start_date = df[(df['FinancialYear'] == year)]['event_date'].min()
+            fy_df = df[(df['event_date'] >= start_date) & (df['event_date'] <= end_date)]
+            financial_year_dataframes.append(fy_df)
+        return financial_year_dataframes
+
+    def _calculate_years(self, abs_twrr_df: pd.DataFrame) -> float:
+        """
+        Calculate the total number of investment years based on the sub-periods in the TWRR DataFrame.
+
+        This function calculates the time difference (in years) for each sub-period by subtracting 
+        the `start_date` from the `end_date`. It then sums up the years for all rows where `returns` 
+        is not equal to 0.
+
+        Args:
+            abs_twrr_df (pd.DataFrame): A DataFrame containing sub-period data with the following columns:
+                - start_date: The start date of the sub-period.
+                - end_date: The end date of the sub-period.
+                - returns: The return for the sub-period.
+
+        Returns:
+            float: The total number of investment years for all sub-periods where `returns` != 0.
+        """
+        abs_twrr_df['start_date'] = pd.to_datetime(abs_twrr_df['start_date'])
+        abs_twrr_df['end_date'] = pd.to_datetime(abs_twrr_df['end_date'])
+
+        abs_twrr_df['years'] = (abs_twrr_df['end_date'] - abs_twrr_df['start_date']).dt.days / 365.25
+        years_value = abs_twrr_df.loc[abs_twrr_df['returns'] != 0, 'years'].sum()
+        return years_value
+
+
+def _synthetic_progression(
+        seed: int,
+        start: str,
+        months: int,
+        flow_probability: float = 0.2,
+        pre_invest_flows: int = 0,
+        gap_months: tuple = (),
+        offsetting_flows: bool = False
+    ) -> pd.DataFrame:
+    """
+    Builds a progression the way CashflowProgressionProcessor does: ledger cashflows on
+    arbitrary days merged with month-end portfolio values, then get_main_cashflow_progression_df.
+    """
+    rng = np.random.default_rng(seed)
+    first_day = pd.Timestamp(start)
+    month_ends = pd.date_range(first_day, periods=months, freq='ME')
+    days = pd.date_range(first_day, month_ends[-1], freq='D')
+
+    flow_days = days[rng.random(len(days)) < flow_probability]
+    flows = np.round(rng.normal(0, 50000, len(flow_days)), 2)
+    cashflows = pd.DataFrame({'event_date': flow_days, 'cashflow': flows})
+    cashflows = pd.concat([
+        pd.DataFrame({'event_date': [first_day], 'cashflow': [1000000.0]}),
+        cashflows[cashflows['event_date'] != first_day],
+    ])
+    if pre_invest_flows:
+        earlier = first_day - pd.to_timedelta(np.sort(rng.choice(np.arange(1, 60), pre_invest_flows, replace=False))[::-1], unit='D')
+        cashflows = pd.concat([
+            pd.DataFrame({'event_date': earlier, 'cashflow': np.round(rng.uniform(1000, 90000, pre_invest_flows), 2)}),
+            cashflows,
+        ])
+    if offsetting_flows:
+        mids = month_ends[::3] - pd.Timedelta(days=10)
+        cashflows = pd.concat([
+            cashflows[~cashflows['event_date'].isin(mids) & ~cashflows['event_date'].isin(mids + pd.Timedelta(days=1))],
+            pd.DataFrame({'event_date': mids, 'cashflow': 25000.1}),
+            pd.DataFrame({'event_date': mids + pd.Timedelta(days=1), 'cashflow': -25000.1}),
+        ])
+    cashflows = cashflows.groupby('event_date', as_index=False)['cashflow'].sum()
+
+    growth = np.cumprod(1 + rng.normal(0.01, 0.05, months))
+    portfolio = np.round(900000 * growth, 2)
+    for gap in gap_months:
+        portfolio[gap] = 0.0
+    portfolio_df = pd.DataFrame({'event_date': month_ends, 'portfolio': portfolio})
+
+    all_dates = pd.concat([cashflows['event_date'], portfolio_df['event_date']]).drop_duplicates().sort_values().reset_index(drop=True)
+    combined_df = pd.DataFrame({'event_date': all_dates})
+    combined_df = combined_df.merge(cashflows, on='event_date', how='left')
+    combined_df['cashflow'] = combined_df['cashflow'].fillna(0)
+    combined_df = combined_df.merge(portfolio_df, on='event_date', how='left').fillna(0)
+
+    combined_df = LegacyReturns().get_main_cashflow_progression_df(combined_df)
+    return combined_df[['event_date', 'cashflow', 'portfolio', 'portfolio_plus_cash']]
+
+
+GOLDEN_CORPUS = {
+    'monthly_flows': dict(seed=1, start='2019-06-01', months=48),
+    'pre_invest_cashflows': dict(seed=2, start='2020-01-15', months=30, pre_invest_flows=4),
+    'starts_on_march_end': dict(seed=3, start='2021-03-01', months=26, flow_probability=0.05),
+    'sparse_flows': dict(seed=4, start='2018-04-01', months=60, flow_probability=0.01),
+    'no_flows_after_funding': dict(seed=5, start='2022-07-01', months=20, flow_probability=0.0),
+    'liquidated_months': dict(seed=6, start='2019-11-01', months=40, gap_months=(7, 8, 21)),
+    'offsetting_flows': dict(seed=7, start='2020-05-01', months=36, offsetting_flows=True),
+    'single_month_end': dict(seed=8, start='2023-02-01', months=1),
+    'two_month_ends': dict(seed=9, start='2023-03-01', months=2, pre_invest_flows=2),
+    'daily_ledger_ten_years': dict(seed=10, start='2014-04-01', months=126, flow_probability=0.9),
+}
+
+
+@pytest.mark.parametrize('case', sorted(GOLDEN_CORPUS))
+def test_time_periods_match_legacy(case):
+    progression_df = _synthetic_progression(**GOLDEN_CORPUS[case])
+
+    legacy_df, legacy_total, legacy_current, legacy_cagr = LegacyReturns().get_time_periods_df(progression_df.copy())
+    abs_twrr_df, total_twrr, current_yr_twrr, cagr = get_time_periods(progression_df.copy())
+
+    pd.testing.assert_frame_equal(abs_twrr_df, legacy_df, check_exact=True)
+    assert total_twrr == legacy_total
+    assert current_yr_twrr == legacy_current
+    assert cagr == legacy_cagr
+
+
+def test_input_is_not_modified():
+    progression_df = _synthetic_progression(**GOLDEN_CORPUS['monthly_flows'])
+    original = progression_df.copy()
+    get_time_periods(progression_df)
+    pd.testing.assert_frame_equal(progression_df, original)
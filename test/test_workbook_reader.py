@@ -0,0 +1,90 @@
+"""
+Tests for the streaming workbook reader and the client block parsers that split bulk
+holdings and bulk ledger workbooks.
+"""
+import openpyxl
+import pytest
+from app.scripts.data_fetchers.workbook_reader import (
+    iter_workbook_rows, iter_holdings_blocks, iter_ledger_blocks, is_ledger_client_header
+)
+
+
+def test_iter_workbook_rows_keeps_openpyxl_values(tmp_path):
+    path = tmp_path / "book.xlsx"
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["Scrip", "Margin_x000D_\nQuantity"])
+    workbook.active.append(["ABC", 10])
+    workbook.save(path)
+
+    rows = list(iter_workbook_rows(str(path)))
+    assert rows == [("Scrip", "Margin_x000D_\nQuantity"), ("ABC", 10)]
+    assert isinstance(rows[1][1], int)
+
+
+def test_is_ledger_client_header():
+    assert is_ledger_client_header(("Client One [AB1]", None, " "))
+    assert not is_ledger_client_header(("Client One [AB1]", "AXIS BANK", None))
+    assert not is_ledger_client_header(("01-Apr-2024", None, None))
+
+
+def test_iter_holdings_blocks_splits_clients():
+    rows = [
+        (None, None),
+        ("Scrip", "ISIN"),
+        ("Client One [AB1]", None),
+        ("ABC", "INE1"),
+        ("Client Two [CD2]", None),
+        ("DEF", "INE2"),
+        ("GHI", "INE3"),
+    ]
+    blocks = list(iter_holdings_blocks(rows))
+    assert [code for code, _ in blocks] == ["AB1", "CD2"]
+    assert blocks[0][1] == [["Scrip", "ISIN"], ["Client One [AB1]", None], ["ABC", "INE1"]]
+    assert blocks[1][1][2:] == [["DEF", "INE2"], ["GHI", "INE3"]]
+
+
+def test_iter_holdings_blocks_yields_repeated_clients_in_file_order():
+    rows = [
+        ("Scrip", "ISIN"),
+        ("Client One [AB1]", None),
+        ("OLD", "INE1"),
+        ("Client Two [CD2]", None),
+        ("DEF", "INE2"),
+        ("Client One [AB1]", None),
+        ("NEW", "INE9"),
+    ]
+    blocks = list(iter_holdings_blocks(rows))
+    assert [code for code, _ in blocks] == ["AB1", "CD2", "AB1"]
+    # process_bulk_holdings_to_s3 keeps the last block of a repeated client.
+    last = {code: block for code, block in blocks}
+    assert last["AB1"][-1] == ["NEW", "INE9"]
+
+
+def test_iter_holdings_blocks_requires_a_header():
+    with pytest.raises(ValueError):
+        list(iter_holdings_blocks([(None, None), ("", " ")]))
+
+
+def test_iter_ledger_blocks_splits_clients():
+    rows = [
+        ("Ledger report", None, None),
+        ("Date", "Narration", "Amount"),
+        ("Client One [AB1] [AB1X]", None, " "),
+        ("01-Apr-2024", "AXIS BANK", 100),
+        ("Client Two [CD2]", None, None),
+        ("02-Apr-2024", "Charges", -5),
+        ("Client One [AB1]", None, None),
+        ("03-Apr-2024", "AXIS BANK", 50),
+    ]
+    header, blocks = iter_ledger_blocks(rows)
+    blocks = list(blocks)
+    assert header == ["Date", "Narration", "Amount"]
+    assert [codes for codes, _ in blocks] == [["AB1", "AB1X"], ["CD2"], ["AB1"]]
+    assert blocks[0][1] == [["Client One [AB1] [AB1X]", None, " "], ["01-Apr-2024", "AXIS BANK", 100]]
+    assert blocks[2][1][1] == ["03-Apr-2024", "AXIS BANK", 50]
+
+
+def test_iter_ledger_blocks_without_entries():
+    header, blocks = iter_ledger_blocks([("Ledger report",)])
+    assert header == ["Ledger report"]
+    assert list(blocks) == []